@@ -1,27 +1,27 @@
-import ccxt
 import redis
 import json
 import asyncio
 import logging
-import snscrape.modules.twitter as sntwitter
-from transformers import pipeline
+from itertools import islice
 from config import *
 from shared.async_utils import safe_request_async
+from shared.http_client import startup_http_client, shutdown_http_client
+from shared.streams import SENTIMENT_STREAM, TEXT_STREAM, publish
+from data_ingestor.kraken_feed import KrakenFeed
+from data_ingestor.market_snapshot import MarketSnapshot
+from shared.timeseries import OHLCVStore
 import feedparser
 
 logger = logging.getLogger(__name__)
 
 r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
-sentiment_pipeline = pipeline('sentiment-analysis')
+ohlcv_store = OHLCVStore(MARKET_DATA_PATH, r, OHLCV_HOT_BARS)
 
-async def fetch_kraken(symbol: str = 'BTC/USD') -> None:
-    """Fetch ticker data from Kraken with basic error handling."""
-    try:
-        kraken = ccxt.kraken({'apiKey': KRAKEN_API_KEY, 'secret': KRAKEN_API_SECRET})
-        ticker = await asyncio.to_thread(kraken.fetch_ticker, symbol)
-        r.set(f'kraken:{symbol}', json.dumps(ticker))
-    except Exception as e:
-        logger.error("Kraken fetch failed: %s", e)
+def publish_texts(source: str, texts: list[str]) -> None:
+    """Hand texts to the sentiment worker; it scores them per source and per token."""
+    texts = [t for t in texts if t and t.strip()]
+    if texts:
+        publish(r, TEXT_STREAM, 'texts', {'source': source, 'texts': texts})
 
 async def fetch_news() -> None:
     """Fetch cryptocurrency news with retries."""
@@ -32,6 +32,8 @@ async def fetch_news() -> None:
             params={"q": "crypto", "apiKey": NEWSAPI_KEY},
         )
         r.set('newsapi', text)
+        articles = json.loads(text).get('articles') or []
+        publish_texts('newsapi', [a.get('title') or '' for a in articles])
     except Exception as e:
         logger.error("News API fetch failed: %s", e)
 
@@ -57,44 +59,68 @@ async def fetch_rss_feeds() -> None:
             logger.error("RSS fetch failed for %s: %s", url, e)
     if feeds:
         r.set('rss_feeds', json.dumps(feeds))
+        publish(r, SENTIMENT_STREAM, 'news', {'feeds': feeds})
+        publish_texts('rss', [e['title'] for entries in feeds.values() for e in entries])
+
+def search_tweets(query: str, limit: int) -> list[str]:
+    # snscrape imports every scraper module; load it on first use, off the event loop.
+    import snscrape.modules.twitter as sntwitter
+
+    return [tweet.content for tweet in islice(sntwitter.TwitterSearchScraper(query).get_items(), limit)]
 
 async def scrape_twitter() -> None:
     """Scrape a few tweets containing the keyword 'crypto'."""
     tweets = []
     try:
-        for tweet in await asyncio.to_thread(lambda: list(sntwitter.TwitterSearchScraper('crypto').get_items())):
-            tweets.append(tweet.content)
-            if len(tweets) >= 10:
-                break
+        tweets = await asyncio.to_thread(search_tweets, 'crypto', 10)
     except Exception as e:
         logger.error("Twitter scrape failed: %s", e)
     r.set('twitter', json.dumps(tweets))
+    publish_texts('twitter', tweets)
 
-async def nlp_sentiment() -> None:
-    """Run sentiment analysis on scraped tweets."""
+async def run_market_feed() -> None:
+    """Stream Kraken market data; a finished replay is not restarted."""
+    feed = KrakenFeed(r, KRAKEN_SYMBOLS, KRAKEN_BOOK_DEPTH, store=ohlcv_store)
     try:
-        tweets = json.loads(r.get('twitter') or '[]')
-        scores = await asyncio.to_thread(sentiment_pipeline, tweets)
-        avg = sum([s['score'] for s in scores]) / len(scores) if scores else 0
-        r.set('nlp_sentiment_score', avg)
+        await feed.run(replay=KRAKEN_REPLAY_PATH)
+    except Exception:
+        logger.exception("Kraken feed crashed")
+
+async def run_market_snapshot(snapshot: MarketSnapshot) -> None:
+    """Bulk tickers and OHLCV for the wider Kraken universe."""
+    try:
+        counts = await snapshot.run_once()
+        logger.info("Kraken snapshot: %(tickers)d/%(symbols)d tickers, %(ohlcv)d OHLCV series", counts)
     except Exception as e:
-        logger.error("Sentiment analysis failed: %s", e)
+        logger.error("Kraken snapshot failed: %s", e)
 
 async def main() -> None:
-    """Continuously ingest data with delay."""
-    while True:
-        try:
-            await asyncio.gather(
-                fetch_kraken(),
-                fetch_news(),
-                fetch_rss_feeds(),
-                scrape_twitter(),
-            )
-            await nlp_sentiment()
-            logger.info("Ingested successfully")
-        except Exception:
-            logger.exception("Ingestion cycle failed")
-        await asyncio.sleep(INGEST_INTERVAL)
+    """Stream market data continuously and ingest the slower sources with delay."""
+    http = await startup_http_client()
+    market = asyncio.create_task(run_market_feed())
+    snapshot = MarketSnapshot(
+        r, ohlcv_store, KRAKEN_MARKETS_CACHE, KRAKEN_UNIVERSE, KRAKEN_UNIVERSE_QUOTE, exclude=KRAKEN_SYMBOLS,
+        timeframe=KRAKEN_OHLCV_TIMEFRAME,
+    )
+    try:
+        while True:
+            try:
+                await asyncio.gather(
+                    run_market_snapshot(snapshot),
+                    fetch_news(),
+                    fetch_rss_feeds(),
+                    scrape_twitter(),
+                )
+                logger.info("Ingested successfully")
+                http.log_stats()
+            except Exception:
+                logger.exception("Ingestion cycle failed")
+            await asyncio.sleep(INGEST_INTERVAL)
+    finally:
+        await snapshot.close()
+        market.cancel()
+        await asyncio.gather(market, return_exceptions=True)
+        await shutdown_http_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import redis
+
+from shared.http_client import get_http_client
+from shared.streams import MARKET_STREAM, publish
+from shared.timeseries import OHLCVStore
+
+logger = logging.getLogger(__name__)
+
+KRAKEN_WS_URL = "wss://ws.kraken.com/v2"
+
+
+class OrderBook:
+    """Top-of-book state for one symbol, maintained from snapshot and delta messages."""
+
+    __slots__ = ('depth', 'bids', 'asks', 'timestamp')
+
+    def __init__(self, depth: int = 10) -> None:
+        self.depth = depth
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.timestamp: Optional[str] = None
+
+    def apply(self, levels: Dict, snapshot: bool) -> None:
+        if snapshot:
+            self.bids.clear()
+            self.asks.clear()
+        for side, book in (('bids', self.bids), ('asks', self.asks)):
+            for level in levels.get(side, ()):
+                price, qty = float(level['price']), float(level['qty'])
+                if qty:
+                    book[price] = qty
+                else:
+                    book.pop(price, None)
+        # Kraken only sends deltas inside the subscribed depth; drop levels that fell out of it.
+        for book, best_first in ((self.bids, True), (self.asks, False)):
+            if len(book) > self.depth:
+                for price in sorted(book, reverse=best_first)[self.depth:]:
+                    del book[price]
+        self.timestamp = levels.get('timestamp', self.timestamp)
+
+    def top(self, n: Optional[int] = None) -> Tuple[List[Tuple[float, float]], List[Tuple[float, float]]]:
+        n = n or self.depth
+        bids = sorted(self.bids.items(), reverse=True)[:n]
+        asks = sorted(self.asks.items())[:n]
+        return bids, asks
+
+    def snapshot(self) -> Dict:
+        bids, asks = self.top()
+        best_bid = bids[0][0] if bids else None
+        best_ask = asks[0][0] if asks else None
+        return {
+            'bids': bids,
+            'asks': asks,
+            'mid': (best_bid + best_ask) / 2 if best_bid and best_ask else None,
+            'spread': best_ask - best_bid if best_bid and best_ask else None,
+            'timestamp': self.timestamp,
+        }
+
+
+def ticker_from_ws(data: Dict) -> Dict:
+    """Kraken v2 ticker payload in the ccxt field names the rest of the bot reads."""
+    return {
+        'symbol': data['symbol'],
+        'bid': data.get('bid'),
+        'bidVolume': data.get('bid_qty'),
+        'ask': data.get('ask'),
+        'askVolume': data.get('ask_qty'),
+        'last': data.get('last'),
+        'high': data.get('high'),
+        'low': data.get('low'),
+        'vwap': data.get('vwap'),
+        'baseVolume': data.get('volume'),
+        'change': data.get('change'),
+        'percentage': data.get('change_pct'),
+        'timestamp': int(time.time() * 1000),
+    }
+
+
+def bar_from_ws(data: Dict) -> List[float]:
+    """Kraken v2 1-minute ``ohlc`` payload as a ccxt-style ``[ts_ms, o, h, l, c, v]`` row."""
+    # interval_begin is RFC 3339 with nanoseconds, e.g. 2024-01-01T00:01:00.000000000Z.
+    opened = datetime.fromisoformat(data['interval_begin'][:19] + '+00:00')
+    return [int(opened.timestamp() * 1000), data['open'], data['high'], data['low'], data['close'], data['volume']]
+
+
+class KrakenFeed:
+    """Persistent Kraken WebSocket subscription to tickers and order books for ``symbols``.
+
+    Messages update in-memory ticker and book state.  A separate task
+    writes the latest state to Redis (``kraken:{symbol}`` and
+    ``kraken:book:{symbol}`` keys, plus ``ticker`` events on the market
+    stream) at most every ``flush_interval`` seconds.  Between flushes
+    updates for the same symbol are coalesced, so a slow Redis costs
+    staleness, never memory or a stalled socket; ``coalesced`` counts the
+    updates that were superseded before being written.
+
+    With a ``store``, the feed also subscribes to 1-minute candles and
+    appends them to it as ``1m`` bars in the same flush.  Candles are
+    buffered per open time, so a minute that closes between two flushes
+    is still written; only updates to the same open bar are coalesced.
+
+    ``record`` appends every raw message to a JSON-lines file, and
+    ``replay`` feeds such a file back through the same code path.
+    """
+
+    def __init__(self, r: redis.Redis, symbols: Sequence[str], depth: int = 10, flush_interval: float = 0.05,
+                 url: str = KRAKEN_WS_URL, record: Optional[str] = None, store: Optional[OHLCVStore] = None) -> None:
+        self.r = r
+        self.symbols = list(symbols)
+        self.depth = depth
+        self.flush_interval = flush_interval
+        self.url = url
+        self.record = record
+        self.store = store
+        self.tickers: Dict[str, Dict] = {}
+        # symbol -> open time (ms) -> latest candle for that minute, until flushed
+        self.bars: Dict[str, Dict[int, List[float]]] = {}
+        self.books: Dict[str, OrderBook] = {s: OrderBook(depth) for s in self.symbols}
+        self._dirty: Dict[Tuple[str, str], None] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self.messages = 0
+        self.coalesced = 0
+        self.published = 0
+
+    def handle(self, raw: str) -> None:
+        """Apply one raw WebSocket message to the in-memory state."""
+        message = json.loads(raw)
+        channel = message.get('channel')
+        if channel not in ('ticker', 'book', 'ohlc'):
+            if message.get('success') is False:
+                logger.error("Kraken subscription error: %s", message.get('error'))
+            return
+        self.messages += 1
+        snapshot = message.get('type') == 'snapshot'
+        for data in message.get('data', ()):
+            symbol = data['symbol']
+            key = (channel, symbol)
+            superseded = key in self._dirty
+            if channel == 'ticker':
+                self.tickers[symbol] = ticker_from_ws(data)
+            elif channel == 'ohlc':
+                bar = bar_from_ws(data)
+                pending = self.bars.setdefault(symbol, {})
+                superseded = bar[0] in pending
+                pending[bar[0]] = bar
+            else:
+                self.books.setdefault(symbol, OrderBook(self.depth)).apply(data, snapshot)
+            if superseded:
+                self.coalesced += 1
+            self._dirty[key] = None
+        if self._wake is not None:
+            self._wake.set()
+
+    def _take(self) -> Tuple[List[Tuple[str, str, Optional[Dict]]], Dict[str, List[List[float]]]]:
+        # Serialised on the event loop: the socket keeps mutating state while a flush runs.
+        updates, bars = [], {}
+        for channel, symbol in self._dirty:
+            if channel == 'ticker':
+                ticker = self.tickers[symbol]
+                updates.append((f'kraken:{symbol}', json.dumps(ticker), {'symbol': symbol, 'ticker': ticker}))
+            elif channel == 'ohlc':
+                bars[symbol] = [bar for _, bar in sorted(self.bars.pop(symbol).items())]
+            else:
+                updates.append((f'kraken:book:{symbol}', json.dumps(self.books[symbol].snapshot()), None))
+        self._dirty = {}
+        return updates, bars
+
+    def _flush(self, pending: Tuple[List[Tuple[str, str, Optional[Dict]]], Dict[str, List[List[float]]]]) -> None:
+        updates, bars = pending
+        pipe = self.r.pipeline(transaction=False)
+        for key, value, event in updates:
+            pipe.set(key, value)
+            if event is not None:
+                publish(pipe, MARKET_STREAM, 'ticker', event)
+        if self.store is not None:
+            for symbol, rows in bars.items():
+                self.store.append(symbol, '1m', rows, pipe=pipe)
+        pipe.execute()
+        self.published += len(updates) + sum(map(len, bars.values()))
+
+    async def _publisher(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self._flush, self._take())
+            except Exception:
+                # Keep publishing; a dead publisher would leave Redis silently stale.
+                logger.exception("Publishing Kraken state failed")
+            await asyncio.sleep(self.flush_interval)
+
+    def _subscriptions(self) -> List[Dict]:
+        return [
+            {'method': 'subscribe', 'params': {'channel': 'ticker', 'symbol': self.symbols}},
+            {'method': 'subscribe', 'params': {'channel': 'book', 'symbol': self.symbols, 'depth': self.depth}},
+        ] + ([{'method': 'subscribe', 'params': {'channel': 'ohlc', 'symbol': self.symbols, 'interval': 1}}]
+             if self.store is not None else [])
+
+    async def _live(self) -> AsyncIterator[str]:
+        """Raw messages from the socket, reconnecting with backoff until cancelled."""
+        backoff = 1.0
+        while True:
+            try:
+                session = await get_http_client().session()
+                async with session.ws_connect(self.url, heartbeat=30) as ws:
+                    for subscription in self._subscriptions():
+                        await ws.send_json(subscription)
+                    logger.info("Kraken feed connected for %s", ', '.join(self.symbols))
+                    backoff = 1.0
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            yield msg.data
+                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                logger.warning("Kraken feed disconnected")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error("Kraken feed connection failed: %s", e)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    @staticmethod
+    async def _replay(path: str, speed: float) -> AsyncIterator[str]:
+        """Recorded messages; ``speed`` 1.0 keeps the original pacing, 0 replays as fast as possible."""
+        previous = None
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if speed and previous is not None:
+                    await asyncio.sleep(max(entry['t'] - previous, 0) / speed)
+                previous = entry['t']
+                yield entry['msg']
+                if not speed:
+                    # Let the publisher run between messages.
+                    await asyncio.sleep(0)
+
+    async def run(self, replay: Optional[str] = None, speed: float = 1.0) -> None:
+        """Consume the live feed (or ``replay`` a recording) until cancelled or the recording ends."""
+        self._wake = asyncio.Event()
+        publisher = asyncio.create_task(self._publisher())
+        recording = open(self.record, 'a') if self.record else None
+        try:
+            source = self._replay(replay, speed) if replay else self._live()
+            async for raw in source:
+                if recording is not None:
+                    recording.write(json.dumps({'t': time.time(), 'msg': raw}) + '\n')
+                try:
+                    self.handle(raw)
+                except (ValueError, KeyError) as e:
+                    logger.warning("Skipping malformed Kraken message: %s", e)
+            # Write whatever the last messages changed before returning.
+            if self._dirty:
+                await asyncio.to_thread(self._flush, self._take())
+        finally:
+            publisher.cancel()
+            await asyncio.gather(publisher, return_exceptions=True)
+            if recording is not None:
+                recording.close()
+            logger.info(
+                "Kraken feed stopped: %d messages, %d writes, %d updates coalesced",
+                self.messages, self.published, self.coalesced,
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Stream Kraken tickers and order books into Redis.")
+    parser.add_argument('symbols', nargs='*', default=['BTC/USD'])
+    parser.add_argument('--redis-host', default='localhost')
+    parser.add_argument('--redis-port', type=int, default=6379)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--record', help="append raw messages to this JSON-lines file")
+    parser.add_argument('--replay', help="feed a recorded JSON-lines file instead of the live socket")
+    parser.add_argument('--market-data', help="also store 1-minute bars under this directory")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay pacing; 0 replays as fast as possible")
+    args = parser.parse_args()
+    r = redis.Redis(host=args.redis_host, port=args.redis_port)
+    store = OHLCVStore(args.market_data, r) if args.market_data else None
+    feed = KrakenFeed(r, args.symbols, args.depth, record=args.record, store=store)
+    asyncio.run(feed.run(args.replay, args.speed))
@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import redis
+
+from shared.timeseries import OHLCVStore
+
+logger = logging.getLogger(__name__)
+
+# Kraken's public Ticker endpoint takes many pairs per call; keep URLs a sane length.
+_TICKER_CHUNK = 200
+
+
+class MarketSnapshot:
+    """Periodic REST snapshot of tickers and OHLCV for a wide Kraken universe.
+
+    One ``ccxt`` client lives for the whole process, created on the first
+    cycle because importing ccxt takes about a second, and its market
+    metadata is cached in ``markets_path`` for ``markets_ttl`` seconds so a
+    restart does not reload it.  Tickers come from bulk ``fetch_tickers``
+    calls of up to 200 pairs.  Kraken has no multi-pair OHLCV endpoint, so
+    candles are fetched per pair, concurrently under the client's rate
+    limiter and incrementally from the last stored candle, rotating through
+    the universe ``ohlcv_per_cycle`` pairs at a time to stay inside the
+    public rate limit.  Each cycle writes everything to Redis in one
+    pipelined round trip.
+
+    Candles are appended to ``store``.  Symbols streamed by the WebSocket
+    feed are listed in ``exclude`` so the snapshot never overwrites their
+    fresher ``kraken:{symbol}`` tickers.
+    """
+
+    def __init__(self, r: redis.Redis, store: OHLCVStore, markets_path: str, universe: Sequence[str] = (), quote: str = 'USD',
+                 exclude: Iterable[str] = (), timeframe: str = '1h', ohlcv_limit: int = 48,
+                 ohlcv_per_cycle: int = 60, concurrency: int = 4, markets_ttl: float = 24 * 3600) -> None:
+        self.r = r
+        self.store = store
+        self.markets_path = markets_path
+        self.universe = [s.strip() for s in universe if s.strip()]
+        self.quote = quote
+        self.exclude = set(exclude)
+        self.timeframe = timeframe
+        self.ohlcv_limit = ohlcv_limit
+        self.ohlcv_per_cycle = ohlcv_per_cycle
+        self.concurrency = concurrency
+        self.markets_ttl = markets_ttl
+        self.exchange = None
+        self._ohlcv_cursor = 0
+        self._loaded = False
+
+    async def load_markets(self) -> None:
+        if self.exchange is None:
+            # Import in a worker thread so the WebSocket feed keeps streaming meanwhile.
+            ccxt = await asyncio.to_thread(importlib.import_module, 'ccxt.async_support')
+            # Kraken allows about one public call per second; ccxt's default spacing is 3s.
+            self.exchange = ccxt.kraken({'enableRateLimit': True, 'rateLimit': 1000})
+        try:
+            if time.time() - os.path.getmtime(self.markets_path) < self.markets_ttl:
+                with open(self.markets_path) as f:
+                    self.exchange.set_markets(json.load(f))
+                self._loaded = True
+                logger.info("Loaded %d Kraken markets from %s", len(self.exchange.markets), self.markets_path)
+                return
+        except (OSError, ValueError) as e:
+            logger.info("Kraken markets cache unavailable (%s); fetching", e)
+        markets = await self.exchange.load_markets()
+        tmp = f"{self.markets_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(markets, f)
+        os.replace(tmp, self.markets_path)
+        self._loaded = True
+
+    def symbols(self) -> List[str]:
+        """Configured universe, or every active spot pair quoted in ``quote``."""
+        if self.universe:
+            return [s for s in self.universe if s in self.exchange.markets]
+        return sorted(
+            symbol for symbol, market in self.exchange.markets.items()
+            if market.get('spot') and market.get('active', True) is not False and market.get('quote') == self.quote
+        )
+
+    async def fetch_tickers(self, symbols: Sequence[str]) -> Dict[str, Dict]:
+        chunks = [symbols[i:i + _TICKER_CHUNK] for i in range(0, len(symbols), _TICKER_CHUNK)]
+        tickers: Dict[str, Dict] = {}
+        for result in await asyncio.gather(*(self.exchange.fetch_tickers(list(c)) for c in chunks), return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error("Kraken fetch_tickers failed: %s", result)
+            else:
+                tickers.update(result)
+        return tickers
+
+    async def _ohlcv(self, symbol: str, gate: asyncio.Semaphore) -> Optional[List[List[float]]]:
+        # Start from the last stored candle; it was probably still open.
+        since = await asyncio.to_thread(self.store.last_ts, symbol, self.timeframe)
+        async with gate:
+            try:
+                return await self.exchange.fetch_ohlcv(symbol, self.timeframe, since=since, limit=self.ohlcv_limit)
+            except Exception as e:
+                logger.error("Kraken OHLCV fetch failed for %s: %s", symbol, e)
+                return None
+
+    async def fetch_ohlcv(self, symbols: Sequence[str]) -> Dict[str, List[List[float]]]:
+        gate = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._ohlcv(s, gate) for s in symbols))
+        return {s: candles for s, candles in zip(symbols, results) if candles}
+
+    def _write(self, tickers: Dict[str, Dict], candles: Dict[str, List[List[float]]]) -> None:
+        pipe = self.r.pipeline(transaction=False)
+        for symbol, ticker in tickers.items():
+            if symbol not in self.exclude:
+                pipe.set(f'kraken:{symbol}', json.dumps(ticker))
+        for symbol, rows in candles.items():
+            self.store.append(symbol, self.timeframe, rows, pipe=pipe)
+        pipe.set('kraken:universe', json.dumps(sorted(tickers)))
+        pipe.execute()
+
+    def _ohlcv_batch(self, symbols: Sequence[str]) -> List[str]:
+        if len(symbols) <= self.ohlcv_per_cycle:
+            return list(symbols)
+        start = self._ohlcv_cursor % len(symbols)
+        self._ohlcv_cursor = start + self.ohlcv_per_cycle
+        return [symbols[(start + i) % len(symbols)] for i in range(self.ohlcv_per_cycle)]
+
+    async def run_once(self) -> Dict[str, int]:
+        """Fetch one snapshot of the universe and store it; returns counts for logging."""
+        if not self._loaded:
+            await self.load_markets()
+        symbols = self.symbols()
+        tickers, candles = await asyncio.gather(
+            self.fetch_tickers(symbols), self.fetch_ohlcv(self._ohlcv_batch(symbols)),
+        )
+        await asyncio.to_thread(self._write, tickers, candles)
+        return {'symbols': len(symbols), 'tickers': len(tickers), 'ohlcv': len(candles)}
+
+    async def close(self) -> None:
+        if self.exchange is not None:
+            await self.exchange.close()
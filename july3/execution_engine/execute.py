@@ -1,8 +1,11 @@
-import ccxt
 import sqlite3
 import redis
 import logging
+import time
 from config import *
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+from shared.lazy import preload
+from shared.streams import TRADE_STREAM, StreamConsumer
 
 logger = logging.getLogger(__name__)
 
@@ -10,14 +13,12 @@ conn = sqlite3.connect(DB_PATH)
 c = conn.cursor()
 r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
 
-c.execute('''CREATE TABLE IF NOT EXISTS trades
-(trade_id TEXT, cluster_id TEXT, pnl REAL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-c.execute('''CREATE TABLE IF NOT EXISTS cluster_limits
-(cluster_id TEXT PRIMARY KEY, max_exposure REAL)''')
+apply_migrations(conn, 'core', CORE_MIGRATIONS)
 
 def check_loss_limit():
     loss_limit = float(r.get('daily_loss_limit') or 0)
-    c.execute("SELECT SUM(pnl) FROM trades WHERE DATE(timestamp)=DATE('now')")
+    # Range on the raw column so idx_trades_timestamp answers it without a scan.
+    c.execute("SELECT SUM(pnl) FROM trades WHERE timestamp >= DATE('now') AND timestamp < DATE('now', '+1 day')")
     pnl_today = c.fetchone()[0] or 0
     return pnl_today < -loss_limit
 
@@ -41,6 +42,8 @@ def execute_trade(trade_id, cluster_id, action, symbol, amount, swing=False):
         return
 
     try:
+        import ccxt
+
         kraken = ccxt.krakenfutures() if swing else ccxt.kraken()
         kraken.apiKey = KRAKEN_API_KEY
         kraken.secret = KRAKEN_API_SECRET
@@ -61,3 +64,39 @@ def execute_trade(trade_id, cluster_id, action, symbol, amount, swing=False):
     conn.commit()
     logger.info("Executed %s %s swing=%s", action, symbol, swing)
 
+def handle_trade_event(event):
+    data = event.data
+    trade_id = data['trade_id']
+    # Entries are redelivered after a crash before ack; never place the same trade twice.
+    if not r.set(f'trade:{trade_id}:executed', event.id, nx=True):
+        logger.warning("Trade %s already handled, skipping redelivery", trade_id)
+        return
+    execute_trade(
+        trade_id, data.get('cluster_id'), data['action'], data['symbol'], float(data['amount']),
+        swing=bool(data.get('swing')),
+    )
+
+def main():
+    """Execute approved trades as they arrive on the trade stream."""
+    # ccxt takes about a second to import; load it while waiting for the first trade.
+    preload('ccxt')
+    consumer = StreamConsumer(r, 'execution', [TRADE_STREAM], count=10)
+    logger.info("Execution engine waiting for approved trades")
+    while True:
+        try:
+            events = consumer.read()
+        except redis.ConnectionError as e:
+            logger.error("Redis unavailable: %s", e)
+            time.sleep(1)
+            continue
+        for event in events:
+            if event.type != 'trade_approved':
+                continue
+            try:
+                handle_trade_event(event)
+            except Exception:
+                logger.exception("Trade event %s failed", event.id)
+        consumer.ack(events)
+
+if __name__ == "__main__":
+    main()
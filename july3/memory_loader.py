@@ -1,8 +1,7 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 import sqlite3
 import logging
 from config import *
+from shared.lazy import Lazy
 from shared.utils import retry
 
 logger = logging.getLogger(__name__)
@@ -11,14 +10,22 @@ conn = sqlite3.connect(DB_PATH)
 c = conn.cursor()
 
 SCOPES = ['https://www.googleapis.com/auth/drive']
-creds = service_account.Credentials.from_service_account_file(GOOGLE_SERVICE_ACCOUNT_JSON, scopes=SCOPES)
+
+def sheets_service():
+    """Google Sheets client; the Google libraries and credentials load on the first sync."""
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
+    creds = service_account.Credentials.from_service_account_file(GOOGLE_SERVICE_ACCOUNT_JSON, scopes=SCOPES)
+    return build('sheets', 'v4', credentials=creds)
+
+sheets = Lazy(sheets_service)
 
 @retry(max_attempts=3, delay=2.0)
 def sync_sheet() -> None:
     """Sync wallet labels and trust scores from Google Sheets."""
     try:
-        service = build('sheets', 'v4', credentials=creds)
-        result = service.spreadsheets().values().get(
+        result = sheets.spreadsheets().values().get(
             spreadsheetId=GOOGLE_SHEETS_ID, range="Sheet1").execute()
         rows = result.get('values', [])
 
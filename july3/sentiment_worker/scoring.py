@@ -0,0 +1,324 @@
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'distilbert-base-uncased-finetuned-sst-2-english'
+
+# Key prefix for cached scores in Redis, shared by every worker.
+CACHE_PREFIX = 'sentiment:cache:'
+
+_WHITESPACE = re.compile(r'\s+')
+_CASHTAG = re.compile(r'\$([A-Za-z][A-Za-z0-9]{1,9})\b')
+_WORD = re.compile(r'\b[A-Z][A-Z0-9]{1,9}\b')
+
+
+def normalize(text: str) -> str:
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def text_key(text: str) -> str:
+    """SHA-256 of the whitespace-normalised text; the cache key for its score."""
+    return hashlib.sha256(normalize(text).encode('utf-8')).hexdigest()
+
+
+def signed_score(result: Dict) -> float:
+    """Classifier output as a score in [-1, 1]: positive labels count up, negative down, neutral zero."""
+    label = str(result.get('label', '')).lower()
+    score = float(result.get('score', 0.0))
+    if label.startswith('pos'):
+        return score
+    if label.startswith('neg'):
+        return -score
+    return 0.0
+
+
+def mentioned_tokens(text: str, known: Iterable[str] = ()) -> List[str]:
+    """Tokens a text is about: ``$CASHTAGS`` plus upper-case mentions of ``known`` symbols."""
+    known = set(known)
+    tokens = [t.upper() for t in _CASHTAG.findall(text)]
+    tokens += [w for w in _WORD.findall(text) if w in known]
+    return list(dict.fromkeys(tokens))
+
+
+class LexiconBackend:
+    """Word-list classifier with no model download, for local runs and benchmarks.
+
+    ``latency`` seconds are slept per call (not per text) to imitate the
+    fixed cost of a model forward pass.
+    """
+
+    name = 'stub'
+    _POSITIVE = {'bull', 'bullish', 'gain', 'gains', 'good', 'great', 'high', 'moon', 'pump', 'rally', 'surge', 'up'}
+    _NEGATIVE = {'bad', 'bear', 'bearish', 'crash', 'down', 'dump', 'hack', 'loss', 'low', 'rug', 'scam', 'sell'}
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, texts: List[str]) -> List[float]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        scores = []
+        for text in texts:
+            words = re.findall(r'[a-z]+', text.lower())
+            hits = sum(w in self._POSITIVE for w in words) - sum(w in self._NEGATIVE for w in words)
+            scores.append(max(-1.0, min(1.0, hits / 2)))
+        return scores
+
+
+class PipelineBackend:
+    """A ``transformers`` text-classification pipeline scoring one micro-batch per call."""
+
+    def __init__(self, name: str, pipe) -> None:
+        self.name = name
+        self.pipe = pipe
+        self.calls = 0
+
+    def __call__(self, texts: List[str]) -> List[float]:
+        self.calls += 1
+        results = self.pipe(texts, batch_size=len(texts), truncation=True)
+        return [signed_score(result) for result in results]
+
+
+def _onnx_pipeline(model: str, model_dir: str, quantize: bool):
+    """ONNX Runtime pipeline for ``model``, exported (and int8-quantized) once into ``model_dir``."""
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise RuntimeError("The onnx sentiment backends need `pip install optimum[onnxruntime]`") from e
+    from transformers import AutoTokenizer, pipeline
+
+    export_dir = os.path.join(model_dir, model.replace('/', '--') + ('-int8' if quantize else ''))
+    file_name = 'model_quantized.onnx' if quantize else 'model.onnx'
+    if not os.path.exists(os.path.join(export_dir, file_name)):
+        logger.info("Exporting %s to ONNX in %s", model, export_dir)
+        exported = ORTModelForSequenceClassification.from_pretrained(model, export=True)
+        exported.save_pretrained(export_dir)
+        if quantize:
+            # Dynamic int8 quantization: weights are quantized ahead of time, activations per batch.
+            quantizer = ORTQuantizer.from_pretrained(exported)
+            quantizer.quantize(
+                save_dir=export_dir,
+                quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False),
+            )
+        AutoTokenizer.from_pretrained(model).save_pretrained(export_dir)
+    ort_model = ORTModelForSequenceClassification.from_pretrained(export_dir, file_name=file_name)
+    return pipeline('sentiment-analysis', model=ort_model, tokenizer=AutoTokenizer.from_pretrained(export_dir))
+
+
+def load_backend(name: str, model: str = DEFAULT_MODEL, model_dir: str = 'models') -> Callable[[List[str]], List[float]]:
+    """Scoring function for ``SENTIMENT_BACKEND``; model libraries are imported only here."""
+    if name == 'transformers':
+        from transformers import pipeline
+
+        return PipelineBackend(name, pipeline('sentiment-analysis', model=model))
+    if name in ('onnx', 'onnx-int8'):
+        return PipelineBackend(name, _onnx_pipeline(model, model_dir, quantize=name == 'onnx-int8'))
+    if name == 'stub':
+        return LexiconBackend()
+    raise ValueError(f"Unknown sentiment backend: {name}")
+
+
+class MicroBatcher:
+    """Collects single texts into batches for ``infer``.
+
+    A batch is sent as soon as it holds ``max_batch`` texts or
+    ``max_latency_ms`` after its first text arrived, whichever comes first,
+    so a burst fills the model's batch while a lone text waits at most the
+    latency budget.  ``infer`` runs in a worker thread, one batch at a time.
+    """
+
+    def __init__(self, infer: Callable[[List[str]], List[float]], max_batch: int = 32,
+                 max_latency_ms: float = 50) -> None:
+        self.infer = infer
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches = 0
+        self.texts = 0
+
+    def _ensure_runner(self) -> asyncio.Queue:
+        # Queues and tasks belong to one event loop.
+        loop = asyncio.get_running_loop()
+        if self._runner is None or self._loop is not loop or self._runner.done():
+            self._queue = asyncio.Queue()
+            self._runner = loop.create_task(self._run())
+            self._loop = loop
+        return self._queue
+
+    async def submit(self, text: str) -> float:
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_runner().put_nowait((text, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_latency
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            try:
+                scores = await asyncio.to_thread(self.infer, [text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, future), score in zip(batch, scores):
+                if not future.done():
+                    future.set_result(score)
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+
+class SentimentScorer:
+    """Signed sentiment per text, never scoring the same text twice.
+
+    Scores are cached by ``text_key`` in a bounded in-process LRU and, with
+    ``r``, in Redis for ``cache_ttl`` seconds, so repeated headlines and
+    retweets are free across cycles, sources and restarts.  Concurrent
+    requests for one text share a single inference, and cache misses go
+    through the ``MicroBatcher``.
+    """
+
+    def __init__(self, batcher: MicroBatcher, r=None, cache_size: int = 100_000,
+                 cache_ttl: int = 7 * 24 * 3600) -> None:
+        self.batcher = batcher
+        self.r = r
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: 'OrderedDict[str, float]' = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, score: float) -> None:
+        self._cache[key] = score
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _redis_lookup(self, keys: List[str]) -> Dict[str, float]:
+        values = self.r.mget([CACHE_PREFIX + k for k in keys])
+        return {k: float(v) for k, v in zip(keys, values) if v is not None}
+
+    def _redis_store(self, scores: Dict[str, float]) -> None:
+        pipe = self.r.pipeline(transaction=False)
+        for key, score in scores.items():
+            pipe.set(CACHE_PREFIX + key, repr(score), ex=self.cache_ttl)
+        pipe.execute()
+
+    async def _infer(self, text: str) -> float:
+        return await self.batcher.submit(normalize(text))
+
+    async def score(self, texts: Sequence[str]) -> List[float]:
+        keys = [text_key(t) for t in texts]
+        scores: Dict[str, float] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                scores[key] = self._cache[key]
+            elif key not in self._inflight:
+                missing.append(key)
+        if missing and self.r is not None:
+            stored = await asyncio.to_thread(self._redis_lookup, missing)
+            for key, score in stored.items():
+                self._remember(key, score)
+            scores.update(stored)
+            missing = [k for k in missing if k not in stored]
+        text_by_key = dict(zip(keys, texts))
+        for key in missing:
+            if key not in self._inflight:
+                self._inflight[key] = asyncio.ensure_future(self._infer(text_by_key[key]))
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+        pending = {k: self._inflight[k] for k in dict.fromkeys(keys) if k not in scores}
+        try:
+            results = await asyncio.gather(*pending.values())
+        finally:
+            for key in missing:
+                self._inflight.pop(key, None)
+        fresh = {}
+        for key, score in zip(pending, results):
+            scores[key] = score
+            if key in missing:
+                fresh[key] = score
+                self._remember(key, score)
+        if fresh and self.r is not None:
+            await asyncio.to_thread(self._redis_store, fresh)
+        return [scores[k] for k in keys]
+
+
+def aggregate(texts: Sequence[str], scores: Sequence[float], known: Iterable[str] = ()) -> Dict[str, Dict[str, float]]:
+    """Score sum and sample count per mentioned token."""
+    known = list(known)
+    by_token: Dict[str, Dict[str, float]] = {}
+    for text, score in zip(texts, scores):
+        for token in mentioned_tokens(text, known):
+            entry = by_token.setdefault(token, {'sum': 0.0, 'samples': 0})
+            entry['sum'] += score
+            entry['samples'] += 1
+    return by_token
+
+
+async def _bench(texts: int, distinct: int, latency: float, max_batch: int, max_latency_ms: float) -> None:
+    backend = LexiconBackend(latency)
+    batcher = MicroBatcher(backend, max_batch, max_latency_ms)
+    scorer = SentimentScorer(batcher)
+    words = ['BTC', 'SOL', 'rally', 'crash', 'bullish', 'dump', 'today', 'news', 'market', 'whales']
+    corpus = [' '.join(random.Random(i).choices(words, k=8)) for i in range(distinct)]
+    sample = [corpus[random.randrange(distinct)] for _ in range(texts)]
+    started = time.perf_counter()
+    # Arrive in small groups, as texts from separate sources would.
+    await asyncio.gather(*(scorer.score(sample[i:i + 5]) for i in range(0, texts, 5)))
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "%d texts in %.2fs (%.0f/s): %d model calls averaging %.1f texts, %d cache hits",
+        texts, elapsed, texts / elapsed, backend.calls, batcher.texts / max(batcher.batches, 1), scorer.hits,
+    )
+    await batcher.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched, cached sentiment scoring on the stub backend.")
+    parser.add_argument('--texts', type=int, default=2000)
+    parser.add_argument('--distinct', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds per model call")
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--max-latency-ms', type=float, default=50)
+    args = parser.parse_args()
+    asyncio.run(_bench(args.texts, args.distinct, args.latency, args.max_batch, args.max_latency_ms))
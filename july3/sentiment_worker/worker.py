@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import redis
+from config import *
+from sentiment_worker.scoring import MicroBatcher, SentimentScorer, aggregate, load_backend
+from shared.streams import SENTIMENT_STREAM, TEXT_STREAM, StreamConsumer, publish
+
+logger = logging.getLogger(__name__)
+
+r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+
+# Symbols worth matching without a cashtag.
+KNOWN_TOKENS = {t.strip().upper() for t in SIGNAL_TOKENS if t.strip()}
+KNOWN_TOKENS |= {s.split('/')[0].upper() for s in KRAKEN_SYMBOLS if s}
+
+# Latest batch per source: mean score, sample count and per-token score sums.
+sources = {}
+written_tokens = set()
+
+def summarize(source, texts, scores):
+    """Replace ``source``'s contribution with its latest batch of scored texts."""
+    sources[source] = {
+        'score': sum(scores) / len(scores) if scores else 0.0,
+        'samples': len(scores),
+        'tokens': aggregate(texts, scores, KNOWN_TOKENS),
+    }
+
+def combined():
+    """Overall, per-source and per-token signed scores, weighted by sample count."""
+    samples = sum(s['samples'] for s in sources.values())
+    overall = sum(s['score'] * s['samples'] for s in sources.values()) / samples if samples else 0.0
+    tokens = {}
+    for summary in sources.values():
+        for token, entry in summary['tokens'].items():
+            total = tokens.setdefault(token, {'sum': 0.0, 'samples': 0})
+            total['sum'] += entry['sum']
+            total['samples'] += entry['samples']
+    return {
+        'score': round(overall, 4),
+        'samples': samples,
+        'sources': {name: {'score': round(s['score'], 4), 'samples': s['samples']} for name, s in sources.items()},
+        'tokens': {t: {'score': round(e['sum'] / e['samples'], 4), 'samples': e['samples']} for t, e in tokens.items()},
+    }
+
+def store(result):
+    """Write scores to Redis and announce them on the sentiment stream in one round trip."""
+    global written_tokens
+    pipe = r.pipeline(transaction=False)
+    pipe.set('nlp_sentiment_score', result['score'])
+    for name, entry in result['sources'].items():
+        pipe.set(f'sentiment:source:{name}', entry['score'])
+    for token, entry in result['tokens'].items():
+        pipe.set(f'sentiment:token:{token}', entry['score'], ex=SENTIMENT_TOKEN_TTL)
+    stale = written_tokens - set(result['tokens'])
+    if stale:
+        pipe.delete(*(f'sentiment:token:{t}' for t in stale))
+    publish(pipe, SENTIMENT_STREAM, 'sentiment', result)
+    pipe.execute()
+    written_tokens = set(result['tokens'])
+
+async def score_event(scorer, event):
+    texts = [t for t in event.data.get('texts', []) if t and t.strip()]
+    scores = await scorer.score(texts)
+    summarize(event.data.get('source', 'unknown'), texts, scores)
+
+async def main():
+    """Score texts published by the ingestor and maintain per-source and per-token sentiment."""
+    backend = load_backend(SENTIMENT_BACKEND, SENTIMENT_MODEL, SENTIMENT_MODEL_DIR)
+    batcher = MicroBatcher(backend, SENTIMENT_MAX_BATCH, SENTIMENT_MAX_LATENCY_MS)
+    scorer = SentimentScorer(batcher, r, cache_ttl=SENTIMENT_CACHE_TTL)
+    consumer = StreamConsumer(r, 'sentiment_worker', [TEXT_STREAM])
+    logger.info("Sentiment worker ready (%s backend, %s)", SENTIMENT_BACKEND, SENTIMENT_MODEL)
+    while True:
+        try:
+            events = await asyncio.to_thread(consumer.read)
+            batches = [e for e in events if e.type == 'texts']
+            if not batches:
+                consumer.ack(events)
+                continue
+            hits, misses = scorer.hits, scorer.misses
+            # Events are scored together so their texts share micro-batches.
+            await asyncio.gather(*(score_event(scorer, e) for e in batches))
+            result = combined()
+            await asyncio.to_thread(store, result)
+            consumer.ack(events)
+            logger.info(
+                "Sentiment %.3f over %d texts from %d sources, %d tokens; %d scored, %d cached; "
+                "%.1f texts per model call",
+                result['score'], result['samples'], len(result['sources']), len(result['tokens']),
+                scorer.misses - misses, scorer.hits - hits, batcher.texts / max(batcher.batches, 1),
+            )
+        except Exception:
+            logger.exception("Sentiment scoring failed")
+            await asyncio.sleep(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,7 +1,7 @@
 import asyncio
 import logging
 from typing import Any
-import aiohttp
+from shared.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -32,9 +32,7 @@ def aretry(max_attempts: int = 3, delay: float = 1.0):
 
 @aretry(max_attempts=3, delay=2.0)
 async def safe_request_async(method: str, url: str, **kwargs: Any) -> str:
-    """Perform an async HTTP request with retries and timeout."""
-    timeout = aiohttp.ClientTimeout(total=kwargs.pop("timeout", 10))
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.request(method, url, **kwargs) as resp:
-            resp.raise_for_status()
-            return await resp.text()
+    """Perform an async HTTP request on the shared pool with retries and timeout."""
+    return await get_http_client().request(
+        method, url, timeout=kwargs.pop("timeout", 10), **kwargs
+    )
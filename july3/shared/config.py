@@ -1,5 +1,4 @@
 import os
-import sys
 import logging
 from typing import Optional
 
@@ -10,6 +9,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class ConfigError(RuntimeError):
+    """A setting the running service needs is missing or invalid."""
+
 class Config:
     """Configuration class with validation and defaults"""
     
@@ -32,6 +34,12 @@ class Config:
     LLM_PROVIDER: str = os.getenv('LLM_PROVIDER', 'openai')
     OPENAI_API_KEY: Optional[str] = os.getenv('OPENAI_API_KEY')
     ANTHROPIC_API_KEY: Optional[str] = os.getenv('ANTHROPIC_API_KEY')
+    LLM_CONCURRENCY: int = int(os.getenv('LLM_CONCURRENCY', '4'))
+    # Signals per cycle escalated to the LLM after the deterministic pre-filter
+    LLM_TOP_K: int = int(os.getenv('LLM_TOP_K', '5'))
+    PREFILTER_MIN_SCORE: float = float(os.getenv('PREFILTER_MIN_SCORE', '0.5'))
+    # Seconds before the same token can be escalated to the LLM again
+    LLM_ESCALATION_COOLDOWN: int = int(os.getenv('LLM_ESCALATION_COOLDOWN', '300'))
     
     # Telegram Bot
     TELEGRAM_BOT_TOKEN: Optional[str] = os.getenv('TELEGRAM_BOT_TOKEN')
@@ -58,6 +66,42 @@ class Config:
     # API Rate Limits
     INGEST_INTERVAL: int = int(os.getenv('INGEST_INTERVAL', '300'))  # 5 minutes
     WATCHER_INTERVAL: int = int(os.getenv('WATCHER_INTERVAL', '600'))  # 10 minutes
+    SIGNAL_INTERVAL: int = int(os.getenv('SIGNAL_INTERVAL', '60'))  # 1 minute
+
+    # Kraken WebSocket market data (tickers and order books), streamed continuously
+    KRAKEN_SYMBOLS = os.getenv('KRAKEN_SYMBOLS', 'BTC/USD,ETH/USD,SOL/USD').split(',')
+    KRAKEN_BOOK_DEPTH: int = int(os.getenv('KRAKEN_BOOK_DEPTH', '10'))
+    # Wider universe refreshed over REST every INGEST_INTERVAL (empty = every active pair quoted in KRAKEN_UNIVERSE_QUOTE)
+    KRAKEN_UNIVERSE = [s for s in os.getenv('KRAKEN_UNIVERSE', '').split(',') if s]
+    KRAKEN_UNIVERSE_QUOTE: str = os.getenv('KRAKEN_UNIVERSE_QUOTE', 'USD')
+    KRAKEN_OHLCV_TIMEFRAME: str = os.getenv('KRAKEN_OHLCV_TIMEFRAME', '1h')
+    KRAKEN_MARKETS_CACHE: str = os.getenv('KRAKEN_MARKETS_CACHE', 'kraken_markets.json')
+    # OHLCV history: memory-mapped bar files (share this directory with the signal engine)
+    # plus the newest OHLCV_HOT_BARS bars per series in Redis
+    MARKET_DATA_PATH: str = os.getenv('MARKET_DATA_PATH', 'market_data')
+    OHLCV_HOT_BARS: int = int(os.getenv('OHLCV_HOT_BARS', '1440'))
+    # Replay a file recorded with `python -m data_ingestor.kraken_feed --record` instead of connecting
+    KRAKEN_REPLAY_PATH: Optional[str] = os.getenv('KRAKEN_REPLAY_PATH') or None
+
+    # Sentiment worker: backend (transformers, onnx, onnx-int8 or stub), model and micro-batching
+    SENTIMENT_BACKEND: str = os.getenv('SENTIMENT_BACKEND', 'transformers')
+    SENTIMENT_MODEL: str = os.getenv('SENTIMENT_MODEL', 'distilbert-base-uncased-finetuned-sst-2-english')
+    SENTIMENT_MODEL_DIR: str = os.getenv('SENTIMENT_MODEL_DIR', 'models')  # ONNX exports
+    SENTIMENT_MAX_BATCH: int = int(os.getenv('SENTIMENT_MAX_BATCH', '32'))
+    SENTIMENT_MAX_LATENCY_MS: float = float(os.getenv('SENTIMENT_MAX_LATENCY_MS', '50'))
+    SENTIMENT_CACHE_TTL: int = int(os.getenv('SENTIMENT_CACHE_TTL', str(7 * 24 * 3600)))  # per text hash
+    SENTIMENT_TOKEN_TTL: int = int(os.getenv('SENTIMENT_TOKEN_TTL', '3600'))
+
+    # Tokens the signal engine evaluates every cycle, besides those wallets are accumulating
+    SIGNAL_TOKENS = os.getenv('SIGNAL_TOKENS', 'SOL').split(',')
+
+    # Wallet tracker database read by the signal engine's consensus index
+    TRACKER_DB_PATH: str = os.getenv('TRACKER_DB_PATH', 'advanced_wallet_tracker.db')
+    CONSENSUS_WINDOW_HOURS: int = int(os.getenv('CONSENSUS_WINDOW_HOURS', '24'))
+    CONSENSUS_MIN_WALLETS: int = int(os.getenv('CONSENSUS_MIN_WALLETS', '3'))
+
+    # Optional GEXF snapshot of the wallet graph written after each track_hops run
+    GRAPH_EXPORT_PATH: Optional[str] = os.getenv('GRAPH_EXPORT_PATH')
 
     # Additional RSS feeds for news ingestion (comma separated URLs)
     RSS_FEEDS = os.getenv(
@@ -66,24 +110,27 @@ class Config:
     ).split(',')
     
     @classmethod
-    def validate_required_config(cls) -> None:
-        """Validate that all required configuration is present"""
-        required_configs = {
-            'TELEGRAM_BOT_TOKEN': cls.TELEGRAM_BOT_TOKEN,
-            'TELEGRAM_CHAT_ID': cls.TELEGRAM_CHAT_ID,
-        }
+    def validate_required_config(cls, telegram: bool = True, llm: bool = True) -> None:
+        """Raise ConfigError unless the settings a service needs are present.
+
+        Services call this from ``main()`` for the parts they use, so importing
+        configuration never exits the process.
+        """
+        required_configs = {}
+        if telegram:
+            required_configs['TELEGRAM_BOT_TOKEN'] = cls.TELEGRAM_BOT_TOKEN
+            required_configs['TELEGRAM_CHAT_ID'] = cls.TELEGRAM_CHAT_ID
         
         # Check LLM configuration
-        if cls.LLM_PROVIDER == 'openai' and not cls.OPENAI_API_KEY:
+        if llm and cls.LLM_PROVIDER == 'openai' and not cls.OPENAI_API_KEY:
             required_configs['OPENAI_API_KEY'] = None
-        elif cls.LLM_PROVIDER == 'anthropic' and not cls.ANTHROPIC_API_KEY:
+        elif llm and cls.LLM_PROVIDER == 'anthropic' and not cls.ANTHROPIC_API_KEY:
             required_configs['ANTHROPIC_API_KEY'] = None
         
         missing_configs = [key for key, value in required_configs.items() if not value]
         
         if missing_configs:
-            logger.error(f"Missing required environment variables: {missing_configs}")
-            sys.exit(1)
+            raise ConfigError(f"Missing required environment variables: {missing_configs}")
     
     @classmethod
     def validate_optional_config(cls) -> None:
@@ -109,8 +156,7 @@ class Config:
 # Initialize configuration
 config = Config()
 
-# Validate configuration on import
-config.validate_required_config()
+# Required settings are checked by each service's main(); importing never exits.
 config.validate_optional_config()
 config.setup_logging()
 
@@ -129,3 +175,39 @@ OPENAI_API_KEY = config.OPENAI_API_KEY
 ANTHROPIC_API_KEY = config.ANTHROPIC_API_KEY
 TELEGRAM_BOT_TOKEN = config.TELEGRAM_BOT_TOKEN
 TELEGRAM_CHAT_ID = config.TELEGRAM_CHAT_ID
+GRAPH_EXPORT_PATH = config.GRAPH_EXPORT_PATH
+DEFAULT_TRUST_THRESHOLD = config.DEFAULT_TRUST_THRESHOLD
+TRACKER_DB_PATH = config.TRACKER_DB_PATH
+CONSENSUS_WINDOW_HOURS = config.CONSENSUS_WINDOW_HOURS
+CONSENSUS_MIN_WALLETS = config.CONSENSUS_MIN_WALLETS
+DB_PATH = config.DB_PATH
+BACKUP_DIR = config.BACKUP_DIR
+REDIS_HOST = config.REDIS_HOST
+REDIS_PORT = config.REDIS_PORT
+REDIS_DB = config.REDIS_DB
+DEFAULT_SENTIMENT_THRESHOLD = config.DEFAULT_SENTIMENT_THRESHOLD
+INGEST_INTERVAL = config.INGEST_INTERVAL
+WATCHER_INTERVAL = config.WATCHER_INTERVAL
+RSS_FEEDS = config.RSS_FEEDS
+LLM_CONCURRENCY = config.LLM_CONCURRENCY
+LLM_TOP_K = config.LLM_TOP_K
+PREFILTER_MIN_SCORE = config.PREFILTER_MIN_SCORE
+LLM_ESCALATION_COOLDOWN = config.LLM_ESCALATION_COOLDOWN
+SIGNAL_INTERVAL = config.SIGNAL_INTERVAL
+SIGNAL_TOKENS = config.SIGNAL_TOKENS
+KRAKEN_SYMBOLS = config.KRAKEN_SYMBOLS
+KRAKEN_BOOK_DEPTH = config.KRAKEN_BOOK_DEPTH
+KRAKEN_REPLAY_PATH = config.KRAKEN_REPLAY_PATH
+KRAKEN_UNIVERSE = config.KRAKEN_UNIVERSE
+KRAKEN_UNIVERSE_QUOTE = config.KRAKEN_UNIVERSE_QUOTE
+KRAKEN_OHLCV_TIMEFRAME = config.KRAKEN_OHLCV_TIMEFRAME
+KRAKEN_MARKETS_CACHE = config.KRAKEN_MARKETS_CACHE
+MARKET_DATA_PATH = config.MARKET_DATA_PATH
+OHLCV_HOT_BARS = config.OHLCV_HOT_BARS
+SENTIMENT_BACKEND = config.SENTIMENT_BACKEND
+SENTIMENT_MODEL = config.SENTIMENT_MODEL
+SENTIMENT_MODEL_DIR = config.SENTIMENT_MODEL_DIR
+SENTIMENT_MAX_BATCH = config.SENTIMENT_MAX_BATCH
+SENTIMENT_MAX_LATENCY_MS = config.SENTIMENT_MAX_LATENCY_MS
+SENTIMENT_CACHE_TTL = config.SENTIMENT_CACHE_TTL
+SENTIMENT_TOKEN_TTL = config.SENTIMENT_TOKEN_TTL
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class HttpClient:
+    """Long-lived pooled aiohttp session with keep-alive and per-host stats."""
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 10.0,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.headers = headers or {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = asyncio.Lock()
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {
+                'requests': 0,
+                'errors': 0,
+                'new_connections': 0,
+                'reused_connections': 0,
+                'total_latency': 0.0,
+                'max_latency': 0.0,
+            }
+        )
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params) -> None:
+            ctx.host = params.url.host or ''
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params) -> None:
+            self._record_latency(ctx.host, time.perf_counter() - ctx.start)
+
+        async def on_request_exception(session, ctx, params) -> None:
+            self._stats[ctx.host]['errors'] += 1
+            self._record_latency(ctx.host, time.perf_counter() - ctx.start)
+
+        async def on_connection_create_end(session, ctx, params) -> None:
+            self._stats[getattr(ctx, 'host', '')]['new_connections'] += 1
+
+        async def on_connection_reuseconn(session, ctx, params) -> None:
+            self._stats[getattr(ctx, 'host', '')]['reused_connections'] += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace
+
+    def _record_latency(self, host: str, elapsed: float) -> None:
+        stats = self._stats[host]
+        stats['requests'] += 1
+        stats['total_latency'] += elapsed
+        stats['max_latency'] = max(stats['max_latency'], elapsed)
+
+    async def start(self) -> aiohttp.ClientSession:
+        """Create the shared session for the running event loop."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            if self._session is not None and not self._session.closed and self._loop is loop:
+                return self._session
+            if self._session is not None and not self._session.closed:
+                # Sessions are bound to the loop that created them.
+                logger.warning("Discarding HTTP session from a previous event loop")
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers,
+                trace_configs=[self._trace_config()],
+            )
+            self._loop = loop
+            logger.info(
+                "HTTP pool started (limit=%s, per_host=%s, dns_ttl=%ss)",
+                self.limit, self.limit_per_host, self.dns_ttl,
+            )
+            return self._session
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Return the shared session, starting it on first use."""
+        if self._session is None or self._session.closed or self._loop is not asyncio.get_running_loop():
+            return await self.start()
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled session and release its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP pool closed")
+        self._session = None
+        self._loop = None
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs: Any) -> str:
+        """Perform a request on the pooled session and return the body text."""
+        session = await self.session()
+        if timeout is not None:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        async with session.request(method, url, **kwargs) as resp:
+            resp.raise_for_status()
+            return await resp.text()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-host request counts, latency and connection reuse."""
+        report = {}
+        for host, stats in self._stats.items():
+            requests = stats['requests']
+            report[host] = dict(
+                stats,
+                avg_latency=stats['total_latency'] / requests if requests else 0.0,
+            )
+        return report
+
+    def log_stats(self) -> None:
+        """Log a one-line summary per host."""
+        for host, stats in self.stats().items():
+            logger.info(
+                "HTTP %s: requests=%d errors=%d new_conn=%d reused=%d avg=%.3fs max=%.3fs",
+                host or '-', stats['requests'], stats['errors'],
+                stats['new_connections'], stats['reused_connections'],
+                stats['avg_latency'], stats['max_latency'],
+            )
+
+
+_client = HttpClient()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide pooled HTTP client."""
+    return _client
+
+
+async def startup_http_client() -> HttpClient:
+    """Open the shared pool; call once at service start."""
+    await _client.start()
+    return _client
+
+
+async def shutdown_http_client() -> None:
+    """Log pool statistics and close the shared session."""
+    _client.log_stats()
+    await _client.close()
@@ -0,0 +1,178 @@
+import argparse
+import importlib
+import importlib.util
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import types
+from typing import Callable, Dict, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class _LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access.
+
+    The import goes through the normal import system, whose per-module locks
+    make a first use from several threads at once safe (unlike
+    ``importlib.util.LazyLoader`` before Python 3.12).  The loaded module's
+    namespace is then copied in, so later lookups cost nothing extra.
+    """
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str):
+    """Module ``name``, executed only when one of its attributes is first used.
+
+    A missing module still fails here, at import time.  Parent packages of a
+    dotted name are imported eagerly, so prefer a function-level import for
+    submodules of heavy packages.  Safe to first use from several threads.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return _LazyModule(name)
+
+
+def preload(*names: str) -> threading.Thread:
+    """Import ``names`` in a daemon thread: the service is ready at once and the modules usually are by first use."""
+    def load() -> None:
+        for name in names:
+            started = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logger.warning("Preloading %s failed: %s", name, e)
+                continue
+            logger.debug("Preloaded %s in %.0fms", name, (time.perf_counter() - started) * 1000)
+
+    thread = threading.Thread(target=load, name='preload', daemon=True)
+    thread.start()
+    return thread
+
+
+class Lazy(Generic[T]):
+    """Object built by ``factory`` on first use, at most once even across threads.
+
+    Attribute access is forwarded, so a module-level client can be declared
+    as ``client = Lazy(make_client)`` and used unchanged; pass ``get()`` where
+    the real object is needed (``with`` blocks, isinstance checks).
+    """
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    started = time.perf_counter()
+                    self._value = self._factory()
+                    self._ready = True
+                    logger.debug("Initialised %s in %.0fms", getattr(self._factory, '__name__', 'lazy object'),
+                                 (time.perf_counter() - started) * 1000)
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def __getattr__(self, name: str):
+        return getattr(self.get(), name)
+
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+# Run a service's module-level code (imports and initialisation) without its __main__ block.
+_PROFILE_SNIPPET = (
+    "import runpy, sys, time; started = time.perf_counter(); "
+    "runpy.run_path(sys.argv[1], run_name='__startup_profile__'); "
+    "print('ready_ms=%.1f' % ((time.perf_counter() - started) * 1000))"
+)
+
+
+def profile_startup(script: str) -> Dict:
+    """Import-time profile of ``script`` up to the point its ``main()`` would start.
+
+    Runs the script's module-level code in a fresh interpreter under
+    ``python -X importtime`` with the repository root on ``sys.path``.
+    Returns the time to ready (module code finished) and the whole process
+    time, plus each imported module's own and cumulative import time, all
+    in milliseconds.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROFILE_SNIPPET, os.path.abspath(script)],
+        capture_output=True, text=True, env=env,
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    modules: List[Dict] = []
+    errors = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append({
+                'module': name, 'self_ms': int(own) / 1000, 'cumulative_ms': int(cumulative) / 1000,
+                'depth': (len(indent) - 1) // 2,
+            })
+        elif not line.startswith('import time:'):
+            errors.append(line)
+    ready = re.search(r'ready_ms=([\d.]+)', result.stdout)
+    return {
+        'script': script,
+        'ok': result.returncode == 0,
+        'ready_ms': float(ready.group(1)) if ready else None,
+        'process_ms': process_ms,
+        'modules': modules,
+        'errors': errors[-20:],
+    }
+
+
+def report(profile: Dict, top: int = 15) -> None:
+    """Log the slowest top-level imports and the slowest individual modules."""
+    if not profile['ok']:
+        logger.error("%s failed during startup:\n%s", profile['script'], '\n'.join(profile['errors']))
+    imports_ms = sum(m['self_ms'] for m in profile['modules'])
+    logger.info(
+        "%s: ready in %s (%.0fms including interpreter start), %.0fms of it importing %d modules",
+        profile['script'], f"{profile['ready_ms']:.0f}ms" if profile['ready_ms'] is not None else 'n/a',
+        profile['process_ms'], imports_ms, len(profile['modules']),
+    )
+    roots = sorted((m for m in profile['modules'] if m['depth'] == 0), key=lambda m: -m['cumulative_ms'])
+    logger.info("Top-level imports by cumulative time:")
+    for m in roots[:top]:
+        logger.info("  %8.1fms  %s", m['cumulative_ms'], m['module'])
+    logger.info("Modules by own import time:")
+    for m in sorted(profile['modules'], key=lambda m: -m['self_ms'])[:top]:
+        logger.info("  %8.1fms  %s", m['self_ms'], m['module'])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Report per-module import time until each service is ready.")
+    parser.add_argument('scripts', nargs='+', help="service entry points, e.g. data_ingestor/ingest.py")
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+    profiles = [profile_startup(script) for script in args.scripts]
+    for profile in profiles:
+        report(profile, args.top)
+    sys.exit(0 if all(p['ok'] for p in profiles) else 1)
@@ -0,0 +1,190 @@
+import argparse
+import logging
+import sqlite3
+import sys
+from typing import Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Migration = Tuple[int, Sequence[str]]
+
+# Schema of the shared DB_PATH database used by the tracker, signal engine,
+# execution engine and Telegram bot.  Append new versions; never edit old ones.
+CORE_MIGRATIONS: List[Migration] = [
+    (1, [
+        '''CREATE TABLE IF NOT EXISTS wallets
+        (wallet_id TEXT PRIMARY KEY,
+         cluster_id TEXT,
+         first_seen DATETIME,
+         parent_wallet TEXT,
+         avg_pnl REAL DEFAULT 0.0,
+         hop_depth INTEGER DEFAULT 0,
+         behavior_label TEXT DEFAULT '',
+         trust_score REAL DEFAULT 0.0)''',
+        '''CREATE TABLE IF NOT EXISTS trades
+        (trade_id TEXT, cluster_id TEXT, pnl REAL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+        '''CREATE TABLE IF NOT EXISTS cluster_limits
+        (cluster_id TEXT PRIMARY KEY, max_exposure REAL)''',
+        '''CREATE TABLE IF NOT EXISTS signals
+        (signal_id TEXT PRIMARY KEY, cluster_id TEXT, signal_json TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+    (2, [
+        # Timestamps are kept as 'YYYY-MM-DD HH:MM:SS' text so range predicates
+        # on the raw column can use an index instead of DATE(timestamp).
+        "UPDATE trades SET timestamp = datetime(timestamp) WHERE timestamp IS NOT NULL AND timestamp != datetime(timestamp)",
+        "UPDATE signals SET timestamp = datetime(timestamp) WHERE timestamp IS NOT NULL AND timestamp != datetime(timestamp)",
+        'CREATE INDEX IF NOT EXISTS idx_wallets_cluster ON wallets(cluster_id, trust_score)',
+        'CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp, pnl)',
+        'CREATE INDEX IF NOT EXISTS idx_signals_cluster ON signals(cluster_id, timestamp)',
+    ]),
+    (3, [
+        # Persistent funds-flow graph used by wallet_watcher.wallet_graph.
+        '''CREATE TABLE IF NOT EXISTS wallet_edges
+        (src TEXT NOT NULL,
+         dst TEXT NOT NULL,
+         tx_count INTEGER DEFAULT 1,
+         first_seen DATETIME,
+         last_seen DATETIME,
+         PRIMARY KEY (src, dst)) WITHOUT ROWID''',
+        'CREATE INDEX IF NOT EXISTS idx_wallet_edges_dst ON wallet_edges(dst, src)',
+        '''INSERT OR IGNORE INTO wallet_edges (src, dst, tx_count, first_seen, last_seen)
+        SELECT parent_wallet, wallet_id, 1, first_seen, first_seen FROM wallets
+        WHERE parent_wallet IS NOT NULL AND parent_wallet != '' AND parent_wallet != wallet_id''',
+    ]),
+    (4, [
+        # TTL cache for wallet_watcher.pnl_estimator; fetched_at is a Unix timestamp.
+        '''CREATE TABLE IF NOT EXISTS pnl_cache
+        (wallet_id TEXT PRIMARY KEY,
+         pnl REAL,
+         fetched_at REAL)''',
+    ]),
+    (5, [
+        # Cluster membership maintained by wallet_watcher.wallet_clusters; covers
+        # funders and other wallets that have no row in wallets.
+        '''CREATE TABLE IF NOT EXISTS wallet_clusters
+        (wallet_id TEXT PRIMARY KEY,
+         cluster_id TEXT NOT NULL)''',
+        'CREATE INDEX IF NOT EXISTS idx_wallet_clusters_cluster ON wallet_clusters(cluster_id)',
+        '''INSERT OR IGNORE INTO wallet_clusters (wallet_id, cluster_id)
+        SELECT wallet_id, COALESCE(NULLIF(cluster_id, ''), 'cl_' || wallet_id) FROM wallets''',
+        "UPDATE wallets SET cluster_id = 'cl_' || wallet_id WHERE cluster_id IS NULL OR cluster_id = ''",
+    ]),
+    (6, [
+        # Hourly net token flow per tracked wallet, maintained by signal_engine.consensus.
+        '''CREATE TABLE IF NOT EXISTS token_flow_buckets
+        (bucket INTEGER NOT NULL,
+         token TEXT NOT NULL,
+         wallet_id TEXT NOT NULL,
+         net_amount REAL NOT NULL,
+         PRIMARY KEY (bucket, token, wallet_id)) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS flow_cursors
+        (source TEXT PRIMARY KEY,
+         last_rowid INTEGER NOT NULL)''',
+    ]),
+    (7, [
+        # Content-addressed LLM decisions used by signal_engine.llm.DecisionCache.
+        '''CREATE TABLE IF NOT EXISTS llm_decisions
+        (payload_hash TEXT PRIMARY KEY,
+         provider TEXT,
+         decision TEXT NOT NULL,
+         created_at DATETIME DEFAULT CURRENT_TIMESTAMP)''',
+    ]),
+]
+
+# Queries on the hot path that must be answered from an index.
+CORE_HOT_QUERIES: Dict[str, str] = {
+    'check_loss_limit': "SELECT SUM(pnl) FROM trades WHERE timestamp >= DATE('now') AND timestamp < DATE('now', '+1 day')",
+    'recent_trades': 'SELECT * FROM trades ORDER BY timestamp DESC LIMIT 5',
+    'behavior_pattern_score': 'SELECT trust_score FROM wallets WHERE cluster_id=?',
+    'wallet_report': 'SELECT * FROM wallets WHERE cluster_id=?',
+    'get_parent_depth': 'SELECT hop_depth FROM wallets WHERE wallet_id=?',
+    'cluster_limit': 'SELECT max_exposure FROM cluster_limits WHERE cluster_id=?',
+    'graph_children': 'SELECT e.dst, w.hop_depth FROM wallet_edges e JOIN wallets w ON w.wallet_id = e.dst WHERE e.src=?',
+    'graph_parents': 'SELECT src FROM wallet_edges WHERE dst=?',
+    'cluster_of': 'SELECT cluster_id FROM wallet_clusters WHERE wallet_id=?',
+    'cluster_members': 'SELECT wallet_id FROM wallet_clusters WHERE cluster_id=?',
+    'flow_bucket': 'SELECT wallet_id, net_amount FROM token_flow_buckets WHERE bucket=? AND token=?',
+    'llm_decision': 'SELECT decision FROM llm_decisions WHERE payload_hash=?',
+    'flow_window': 'SELECT token, wallet_id, SUM(net_amount) FROM token_flow_buckets WHERE bucket > ? AND bucket <= ? GROUP BY token, wallet_id',
+}
+
+
+def apply_migrations(conn: sqlite3.Connection, component: str, migrations: Sequence[Migration]) -> int:
+    """Apply pending migrations for ``component``; each version commits atomically."""
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS schema_migrations (component TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+    )
+    conn.commit()
+    row = conn.execute('SELECT version FROM schema_migrations WHERE component=?', (component,)).fetchone()
+    current = row[0] if row else 0
+    for version, statements in migrations:
+        if version <= current:
+            continue
+        try:
+            conn.execute('BEGIN')
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                'INSERT OR REPLACE INTO schema_migrations (component, version) VALUES (?, ?)',
+                (component, version),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            logger.exception("Migration %s v%s failed", component, version)
+            raise
+        current = version
+        logger.info("Applied %s schema migration v%s", component, version)
+    return current
+
+
+def full_scans(conn: sqlite3.Connection, queries: Dict[str, str]) -> Dict[str, List[str]]:
+    """Return the query-plan steps that scan a whole table or index, keyed by query name.
+
+    An index scan is accepted only for ``ORDER BY ... LIMIT`` queries, where
+    SQLite walks the index in order and stops after LIMIT rows.
+    """
+    problems = {}
+    for name, sql in queries.items():
+        params = (None,) * sql.count('?')
+        plan = [row[-1] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+        bounded = ' LIMIT ' in sql.upper()
+        scans = [
+            step for step in plan
+            if step.startswith('SCAN ') and not (bounded and ' USING ' in step)
+        ]
+        if scans:
+            problems[name] = scans
+    return problems
+
+
+def check_schema(db_path: str = ':memory:') -> bool:
+    """Migrate ``db_path`` and verify no hot query falls back to a full scan."""
+    from wallet_watcher.tracker_store import TRACKER_HOT_QUERIES, TRACKER_MIGRATIONS
+
+    ok = True
+    for component, migrations, queries in (
+        ('core', CORE_MIGRATIONS, CORE_HOT_QUERIES),
+        ('tracker', TRACKER_MIGRATIONS, TRACKER_HOT_QUERIES),
+    ):
+        conn = sqlite3.connect(db_path)
+        try:
+            apply_migrations(conn, component, migrations)
+            for name, scans in full_scans(conn, queries).items():
+                ok = False
+                logger.error("%s query %s does a full scan: %s", component, name, '; '.join(scans))
+        finally:
+            conn.close()
+    return ok
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Apply schema migrations and check hot query plans.")
+    parser.add_argument('db_path', nargs='?', default=':memory:')
+    args = parser.parse_args()
+    if not check_schema(args.db_path):
+        sys.exit(1)
+    logger.info("All hot queries use indexes")
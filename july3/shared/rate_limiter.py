@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+KEY_SLOTS = ('primary', 'secondary')
+
+
+class QuotaExhausted(RuntimeError):
+    """Raised when every key of a provider has used up its daily/monthly quota."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until one token is available (0 when one is available now)."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    def drain(self) -> None:
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 0.0)
+
+
+@dataclass
+class KeyState:
+    provider: str
+    slot: str
+    key: Optional[str]
+    bucket: TokenBucket
+    base_rate: float
+    quota: Optional[int] = None
+    period: Optional[str] = None
+    calls_made: int = 0
+    period_start: str = ''
+    in_flight: int = 0
+    dirty: bool = False
+
+    def period_id(self, now: datetime) -> str:
+        if self.period == 'monthly':
+            return now.strftime('%Y-%m')
+        return now.strftime('%Y-%m-%d')
+
+    def has_quota(self) -> bool:
+        return self.quota is None or self.calls_made < self.quota
+
+
+@dataclass
+class Lease:
+    state: KeyState
+    throttled: bool = False
+
+    @property
+    def key(self) -> Optional[str]:
+        return self.state.key
+
+
+@dataclass
+class ProviderState:
+    bucket: TokenBucket
+    keys: List[KeyState] = field(default_factory=list)
+
+
+class ApiRateLimiter:
+    """Per-provider and per-key token buckets with quota tracking and key rotation.
+
+    Limits come from ``AdvancedWalletTracker.api_configs``: ``rate_limit`` is
+    requests per second per key, ``daily_limit``/``monthly_limit`` are per-key
+    quotas persisted to the ``api_usage`` table (created by the tracker
+    migrations).  Keys are picked least-loaded first and a key that gets
+    throttled has its rate halved, recovering gradually on success.  Usage is
+    written on a single background thread, so ``acquire`` never blocks the
+    event loop on SQLite and writes land in order.
+    """
+
+    min_rate_factor = 0.1
+    recovery_factor = 0.05
+
+    def __init__(self, api_configs: Dict, db_path: Optional[str] = None, flush_every: int = 50) -> None:
+        self.db_path = db_path
+        self.flush_every = flush_every
+        self._since_flush = 0
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._last_write: Optional[Future] = None
+        self.providers: Dict[str, ProviderState] = {}
+        for name, cfg in api_configs.items():
+            rate = float(cfg.get('rate_limit', 1))
+            if cfg.get('daily_limit') is not None:
+                period, quota = 'daily', int(cfg['daily_limit'])
+            elif cfg.get('monthly_limit') is not None:
+                period, quota = 'monthly', int(cfg['monthly_limit'])
+            else:
+                period, quota = None, None
+            slots = [(slot, cfg[slot]) for slot in KEY_SLOTS if cfg.get(slot)]
+            if not slots:
+                slots = [('anonymous', None)]
+            keys = [
+                KeyState(name, slot, key, TokenBucket(rate), rate, quota, period)
+                for slot, key in slots
+            ]
+            self.providers[name] = ProviderState(TokenBucket(rate * len(keys)), keys)
+        if self.db_path:
+            self._load_usage()
+
+    def _load_usage(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute('SELECT api_name, endpoint, calls_made, last_reset FROM api_usage').fetchall()
+        finally:
+            conn.close()
+        now = datetime.now()
+        for api_name, endpoint, calls_made, last_reset in rows:
+            provider = self.providers.get(api_name)
+            if provider is None:
+                continue
+            for state in provider.keys:
+                if state.slot == endpoint and state.period_id(now) == last_reset:
+                    state.calls_made = int(calls_made or 0)
+                    state.period_start = last_reset
+
+    def _write_usage(self, rows: List) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO api_usage (api_name, endpoint, calls_made, last_reset) VALUES (?, ?, ?, ?)',
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logger.error("Failed to persist API usage: %s", e)
+        finally:
+            conn.close()
+
+    def _flush_in_background(self) -> Optional[Future]:
+        # Counters are snapshotted here, on the caller's thread; only the write is deferred.
+        rows = []
+        for provider in self.providers.values():
+            for state in provider.keys:
+                if state.dirty:
+                    rows.append((state.provider, state.slot, state.calls_made, state.period_start))
+                    state.dirty = False
+        self._since_flush = 0
+        if not rows or not self.db_path:
+            return None
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='api-usage')
+        self._last_write = self._writer.submit(self._write_usage, rows)
+        return self._last_write
+
+    def flush(self) -> None:
+        """Write changed usage counters to ``api_usage`` and wait until every write has landed."""
+        self._flush_in_background()
+        if self._last_write is not None:
+            self._last_write.result()
+
+    def _roll_period(self, state: KeyState, now: datetime) -> None:
+        period = state.period_id(now)
+        if state.period_start != period:
+            state.period_start = period
+            state.calls_made = 0
+            state.dirty = True
+
+    async def acquire(self, provider: str) -> Lease:
+        """Wait for capacity on the least-loaded key of ``provider``."""
+        if provider not in self.providers:
+            raise ValueError(f"Unknown API provider: {provider}")
+        pstate = self.providers[provider]
+        while True:
+            now = datetime.now()
+            best: Optional[KeyState] = None
+            best_rank = None
+            for state in pstate.keys:
+                self._roll_period(state, now)
+                if not state.has_quota():
+                    continue
+                rank = (state.bucket.delay(), state.in_flight, state.calls_made)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = state, rank
+            if best is None:
+                raise QuotaExhausted(f"All {provider} API keys exhausted their quota")
+            wait = max(best_rank[0], pstate.bucket.delay())
+            if wait <= 0:
+                best.bucket.consume()
+                pstate.bucket.consume()
+                best.calls_made += 1
+                best.in_flight += 1
+                best.dirty = True
+                self._since_flush += 1
+                if self._since_flush >= self.flush_every:
+                    self._flush_in_background()
+                return Lease(best)
+            await asyncio.sleep(wait)
+
+    def release(self, lease: Lease) -> None:
+        """Return a lease, adapting the key's rate to the observed outcome."""
+        state = lease.state
+        state.in_flight = max(0, state.in_flight - 1)
+        bucket = state.bucket
+        if lease.throttled:
+            bucket.rate = max(state.base_rate * self.min_rate_factor, bucket.rate / 2)
+            bucket.drain()
+            logger.warning(
+                "%s key %s throttled, backing off to %.2f req/s",
+                state.provider, state.slot, bucket.rate,
+            )
+        elif bucket.rate < state.base_rate:
+            bucket.rate = min(state.base_rate, bucket.rate + state.base_rate * self.recovery_factor)
+
+    @asynccontextmanager
+    async def use(self, provider: str) -> AsyncIterator[Lease]:
+        """``async with limiter.use('etherscan') as lease:`` — set ``lease.throttled`` on 429s."""
+        lease = await self.acquire(provider)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def keys_for(self, provider: str) -> int:
+        return len(self.providers[provider].keys)
+
+    def usage(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Current calls, quota and effective rate per provider and key slot."""
+        return {
+            name: {
+                state.slot: {
+                    'calls_made': state.calls_made,
+                    'quota': state.quota,
+                    'rate': state.bucket.rate,
+                    'in_flight': state.in_flight,
+                }
+                for state in pstate.keys
+            }
+            for name, pstate in self.providers.items()
+        }
@@ -0,0 +1,160 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Event streams between services.  Every entry carries ``type``, ``ts`` (the
+# producer's Unix time) and ``data`` (a JSON object).
+MARKET_STREAM = 'events:market'        # ingest -> signal engine: ticker, order_book
+SENTIMENT_STREAM = 'events:sentiment'  # ingest, sentiment worker -> signal engine: news, sentiment
+TEXT_STREAM = 'events:texts'           # ingest -> sentiment worker: texts
+SIGNAL_STREAM = 'events:signals'       # signal engine -> Telegram/operators: signal
+TRADE_STREAM = 'events:trades'         # Telegram /approve -> execution: trade_approved
+
+# Streams are capped (approximately) so an idle consumer cannot grow Redis unbounded.
+DEFAULT_MAXLEN = 10000
+
+
+@dataclass(slots=True)
+class Event:
+    stream: str
+    id: str
+    type: str
+    ts: float
+    data: Dict
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def publish(r: redis.Redis, stream: str, event_type: str, data: Dict, maxlen: int = DEFAULT_MAXLEN) -> str:
+    """Append one typed event to ``stream``; returns its entry id."""
+    fields = {'type': event_type, 'ts': repr(time.time()), 'data': json.dumps(data, default=str)}
+    return _text(r.xadd(stream, fields, maxlen=maxlen, approximate=True))
+
+
+class StreamConsumer:
+    """Consumer-group reader over one or more streams.
+
+    Each service reads as a named group, so every group sees every event
+    while consumers inside a group share the work.  Entries stay pending
+    until ``ack``; on start a consumer first re-reads its own pending
+    entries (work interrupted by a crash), and entries left pending by a
+    dead consumer for ``claim_idle_ms`` are claimed.  Groups are created at
+    the end of the stream, so a new service does not replay history.
+    """
+
+    def __init__(self, r: redis.Redis, group: str, streams: Iterable[str], consumer: Optional[str] = None,
+                 count: int = 100, block_ms: int = 5000, claim_idle_ms: int = 60000) -> None:
+        self.r = r
+        self.group = group
+        self.streams = list(streams)
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.count = count
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self._recovering = True
+        self._last_claim = 0.0
+        self.ensure_groups()
+
+    def ensure_groups(self) -> None:
+        for stream in self.streams:
+            try:
+                self.r.xgroup_create(stream, self.group, id='$', mkstream=True)
+            except redis.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+
+    @staticmethod
+    def _event(stream, entry_id, fields) -> Event:
+        fields = {_text(k): _text(v) for k, v in fields.items()}
+        return Event(
+            stream=_text(stream),
+            id=_text(entry_id),
+            type=fields.get('type', ''),
+            ts=float(fields.get('ts') or 0),
+            data=json.loads(fields.get('data') or '{}'),
+        )
+
+    def _claim(self) -> List[Event]:
+        events = []
+        for stream in self.streams:
+            result = self.r.xautoclaim(stream, self.group, self.consumer, self.claim_idle_ms, '0-0', count=self.count)
+            events.extend(self._event(stream, entry_id, fields) for entry_id, fields in result[1] if fields)
+        return events
+
+    def read(self) -> List[Event]:
+        """Next batch of events; blocks up to ``block_ms`` when nothing is pending."""
+        if self._recovering:
+            response = self.r.xreadgroup(
+                self.group, self.consumer, {s: '0' for s in self.streams}, count=self.count,
+            )
+            events = [self._event(s, i, f) for s, entries in response for i, f in entries if f]
+            if events:
+                return events
+            self._recovering = False
+        now = time.monotonic()
+        if now - self._last_claim >= self.claim_idle_ms / 1000:
+            self._last_claim = now
+            claimed = self._claim()
+            if claimed:
+                return claimed
+        response = self.r.xreadgroup(
+            self.group, self.consumer, {s: '>' for s in self.streams}, count=self.count, block=self.block_ms,
+        )
+        return [self._event(s, i, f) for s, entries in response or [] for i, f in entries]
+
+    def ack(self, events: Iterable[Event]) -> None:
+        by_stream: Dict[str, List[str]] = {}
+        for event in events:
+            by_stream.setdefault(event.stream, []).append(event.id)
+        if not by_stream:
+            return
+        pipe = self.r.pipeline(transaction=False)
+        for stream, ids in by_stream.items():
+            pipe.xack(stream, self.group, *ids)
+        pipe.execute()
+
+
+def measure_latency(r: redis.Redis, events: int = 1000) -> Dict[str, float]:
+    """Round-trip publish -> consumer-group read latency in milliseconds on a scratch stream."""
+    stream = f'events:latency:{os.getpid()}'
+    consumer = StreamConsumer(r, 'latency', [stream], count=1, block_ms=1000)
+    samples = []
+    try:
+        for i in range(events):
+            started = time.perf_counter()
+            publish(r, stream, 'ping', {'seq': i})
+            batch = consumer.read()
+            samples.append((time.perf_counter() - started) * 1000)
+            consumer.ack(batch)
+    finally:
+        r.delete(stream)
+    samples.sort()
+    return {
+        'p50_ms': statistics.median(samples),
+        'p99_ms': samples[int(len(samples) * 0.99) - 1],
+        'max_ms': samples[-1],
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Measure event latency through Redis Streams consumer groups.")
+    parser.add_argument('--host', default=os.getenv('REDIS_HOST', 'localhost'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('REDIS_PORT', '6379')))
+    parser.add_argument('--events', type=int, default=1000)
+    args = parser.parse_args()
+    stats = measure_latency(redis.Redis(host=args.host, port=args.port), args.events)
+    logger.info("publish -> read latency: p50 %.2fms, p99 %.2fms, max %.2fms",
+                stats['p50_ms'], stats['p99_ms'], stats['max_ms'])
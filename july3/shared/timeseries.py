@@ -0,0 +1,256 @@
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# One bar as stored on disk: millisecond open time plus OHLCV, 48 bytes.
+BAR_DTYPE = np.dtype([
+    ('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'), ('volume', '<f8'),
+])
+
+TIMEFRAME_MS = {
+    '1m': 60_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000,
+}
+
+
+def to_bars(rows: Iterable[Sequence[float]]) -> np.ndarray:
+    """ccxt-style ``[ts, open, high, low, close, volume]`` rows as a bar array."""
+    rows = [tuple(row[:6]) for row in rows]
+    return np.array(rows, dtype=BAR_DTYPE) if rows else np.empty(0, dtype=BAR_DTYPE)
+
+
+class OHLCVStore:
+    """Bar history per (symbol, timeframe): memory-mapped files plus a Redis hot tier.
+
+    The cold tier is one grow-only file of ``BAR_DTYPE`` records per
+    series under ``root``; reads memory-map it and binary-search the time
+    range, so a window is a zero-copy slice.  The hot tier is a Redis
+    sorted set per series (score = open time) holding the last
+    ``hot_bars`` bars, so services without access to ``root`` still see
+    recent history.  Appending the bar that is still open replaces it.
+    """
+
+    def __init__(self, root: str, r=None, hot_bars: int = 1440) -> None:
+        self.root = root
+        self.r = r
+        self.hot_bars = hot_bars
+        self._maps: Dict[str, np.memmap] = {}
+        # The WebSocket feed and the REST snapshot append from worker threads.
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, symbol.replace('/', '-'), f'{timeframe}.bin')
+
+    @staticmethod
+    def _hot_key(symbol: str, timeframe: str) -> str:
+        return f'ohlcv:{symbol}:{timeframe}'
+
+    def _cold(self, symbol: str, timeframe: str) -> np.ndarray:
+        path = self._path(symbol, timeframe)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty(0, dtype=BAR_DTYPE)
+        count = size // BAR_DTYPE.itemsize
+        mapped = self._maps.get(path)
+        if mapped is None or len(mapped) != count:
+            # Remap after the writer appended; an empty file cannot be mapped.
+            mapped = np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(count,)) if count else np.empty(0, dtype=BAR_DTYPE)
+            self._maps[path] = mapped
+        return mapped
+
+    def append(self, symbol: str, timeframe: str, rows: Iterable[Sequence[float]], pipe=None) -> int:
+        """Store bars newer than (or replacing) the last stored one; returns bars written.
+
+        Hot-tier writes are queued on ``pipe`` when given, so a caller can
+        batch many series into one round trip.
+        """
+        bars = np.sort(to_bars(rows), order='ts')
+        if not len(bars):
+            return 0
+        path = self._path(symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Read/write rather than append mode, so the replaced open bar is overwritten in place.
+        with self._lock, os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            size -= size % BAR_DTYPE.itemsize  # ignore a torn trailing record
+            last_ts = None
+            if size:
+                f.seek(size - BAR_DTYPE.itemsize)
+                last_ts = int(np.frombuffer(f.read(BAR_DTYPE.itemsize), dtype=BAR_DTYPE)['ts'][0])
+            if last_ts is not None:
+                bars = bars[bars['ts'] >= last_ts]
+                if len(bars) and bars['ts'][0] == last_ts:
+                    size -= BAR_DTYPE.itemsize
+            # Keep one record per open time, the latest given.
+            keep = np.append(bars['ts'][1:] != bars['ts'][:-1], True) if len(bars) else np.empty(0, dtype=bool)
+            bars = bars[keep]
+            if len(bars):
+                # Never truncate: a reader's mapping past the new end would fault with SIGBUS.
+                f.seek(size)
+                f.write(bars.tobytes())
+        if self.r is not None and len(bars):
+            target = pipe if pipe is not None else self.r.pipeline(transaction=False)
+            key = self._hot_key(symbol, timeframe)
+            target.zremrangebyscore(key, int(bars['ts'][0]), int(bars['ts'][-1]))
+            target.zadd(key, {
+                ','.join(repr(float(v)) if i else str(int(v)) for i, v in enumerate(bar)): int(bar['ts'])
+                for bar in bars
+            })
+            target.zremrangebyrank(key, 0, -self.hot_bars - 1)
+            if pipe is None:
+                target.execute()
+        return len(bars)
+
+    def last_ts(self, symbol: str, timeframe: str) -> Optional[int]:
+        """Open time of the newest stored bar in either tier."""
+        series = self._cold(symbol, timeframe)
+        last = int(series['ts'][-1]) if len(series) else None
+        if self.r is not None:
+            newest = self.r.zrange(self._hot_key(symbol, timeframe), -1, -1, withscores=True)
+            if newest and (last is None or newest[0][1] > last):
+                last = int(newest[0][1])
+        return last
+
+    @staticmethod
+    def _parse_hot(members: List) -> np.ndarray:
+        rows = []
+        for member in members:
+            text = member.decode() if isinstance(member, bytes) else member
+            ts, *values = text.split(',')
+            rows.append((int(ts), *map(float, values)))
+        return np.array(rows, dtype=BAR_DTYPE) if rows else np.empty(0, dtype=BAR_DTYPE)
+
+    def windows(self, symbols: Sequence[str], timeframe: str, start: Optional[int] = None,
+                end: Optional[int] = None, bars: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Bars with ``start <= ts < end`` (ms), or the last ``bars`` bars, for each symbol.
+
+        Cold-tier results are read-only views of the mapped files.  Bars
+        newer than the cold tier come from Redis in one pipelined call for
+        all symbols.
+        """
+        cold = {}
+        for symbol in symbols:
+            series = self._cold(symbol, timeframe)
+            lo = 0 if start is None else int(np.searchsorted(series['ts'], start, 'left'))
+            hi = len(series) if end is None else int(np.searchsorted(series['ts'], end, 'left'))
+            cold[symbol] = series[lo:hi]
+        if self.r is not None:
+            pipe = self.r.pipeline(transaction=False)
+            for symbol in symbols:
+                series = self._cold(symbol, timeframe)
+                after = int(series['ts'][-1]) + 1 if len(series) else None
+                if start is not None:
+                    after = start if after is None else max(after, start)
+                after = '-inf' if after is None else after
+                pipe.zrangebyscore(self._hot_key(symbol, timeframe), after, f'({end}' if end is not None else '+inf')
+            for symbol, members in zip(symbols, pipe.execute()):
+                hot = self._parse_hot(members)
+                if len(hot):
+                    cold[symbol] = np.concatenate([cold[symbol], hot])
+        if bars is not None:
+            cold = {symbol: series[-bars:] for symbol, series in cold.items()}
+        return cold
+
+    def window(self, symbol: str, timeframe: str, start: Optional[int] = None, end: Optional[int] = None,
+               bars: Optional[int] = None) -> np.ndarray:
+        return self.windows([symbol], timeframe, start, end, bars)[symbol]
+
+
+def resample(bars: np.ndarray, timeframe: str) -> np.ndarray:
+    """Aggregate bars into ``timeframe`` buckets (first open, max high, min low, last close, summed volume)."""
+    if not len(bars):
+        return np.empty(0, dtype=BAR_DTYPE)
+    step = TIMEFRAME_MS[timeframe]
+    buckets = bars['ts'] // step
+    starts = np.flatnonzero(np.append(True, buckets[1:] != buckets[:-1]))
+    ends = np.append(starts[1:], len(bars)) - 1
+    out = np.empty(len(starts), dtype=BAR_DTYPE)
+    out['ts'] = buckets[starts] * step
+    out['open'] = bars['open'][starts]
+    out['high'] = np.maximum.reduceat(bars['high'], starts)
+    out['low'] = np.minimum.reduceat(bars['low'], starts)
+    out['close'] = bars['close'][ends]
+    out['volume'] = np.add.reduceat(bars['volume'], starts)
+    return out
+
+
+def rolling_mean(values: np.ndarray, n: int) -> np.ndarray:
+    """Simple moving average; the first ``n - 1`` entries are NaN."""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) >= n:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        out[n - 1:] = (sums[n:] - sums[:-n]) / n
+    return out
+
+
+def rolling_std(values: np.ndarray, n: int) -> np.ndarray:
+    """Rolling population standard deviation; the first ``n - 1`` entries are NaN."""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) >= n:
+        windows = np.lib.stride_tricks.sliding_window_view(values, n)
+        out[n - 1:] = windows.std(axis=1)
+    return out
+
+
+def momentum(close: np.ndarray, n: int) -> float:
+    """Fractional change over the last ``n`` bars, NaN without enough history."""
+    return float(close[-1] / close[-n - 1] - 1) if len(close) > n and close[-n - 1] else float('nan')
+
+
+def volatility(close: np.ndarray, n: int) -> float:
+    """Standard deviation of log returns over the last ``n`` bars."""
+    if len(close) <= n:
+        return float('nan')
+    returns = np.diff(np.log(np.asarray(close[-n - 1:], dtype=float)))
+    return float(returns.std())
+
+
+def rsi(close: np.ndarray, n: int = 14) -> np.ndarray:
+    """Relative strength index using simple averages of gains and losses."""
+    delta = np.diff(np.asarray(close, dtype=float), prepend=np.nan)
+    gains = rolling_mean(np.clip(np.nan_to_num(delta), 0, None), n)
+    losses = rolling_mean(np.clip(-np.nan_to_num(delta), 0, None), n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(losses == 0, 100.0, 100 - 100 / (1 + gains / losses))
+
+
+def _bench(symbols: int, days: int) -> None:
+    bars_per_symbol = days * 1440
+    with tempfile.TemporaryDirectory() as root:
+        store = OHLCVStore(root)
+        ts = np.arange(bars_per_symbol, dtype=np.int64) * 60_000
+        started = time.perf_counter()
+        names = [f'S{i}/USD' for i in range(symbols)]
+        for name in names:
+            close = 100 * np.exp(np.cumsum(np.random.standard_normal(bars_per_symbol) * 1e-3))
+            store.append(name, '1m', zip(ts, close, close + 1, close - 1, close, np.ones(bars_per_symbol)))
+        logger.info("Wrote %d x %d bars in %.2fs", symbols, bars_per_symbol, time.perf_counter() - started)
+        for attempt in ('cold', 'warm'):
+            started = time.perf_counter()
+            series = store.windows(names, '1m', start=int(ts[0]), end=int(ts[-1]) + 1)
+            vols = [volatility(s['close'], 1440) for s in series.values()]
+            elapsed = time.perf_counter() - started
+            logger.info(
+                "%s read of %d bars for %d symbols plus 24h volatility: %.1fms",
+                attempt, sum(len(s) for s in series.values()), len(vols), elapsed * 1000,
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark month-long 1-minute window reads from the OHLCV store.")
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+    _bench(args.symbols, args.days)
@@ -1,9 +1,17 @@
+import asyncio
 import redis
 import sqlite3
 import json
 import logging
-from openai import OpenAI
+import time
+import numpy as np
 from config import *
+from shared.lazy import Lazy
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+from signal_engine.consensus import ConsensusIndex
+from signal_engine.llm import DecisionCache, get_provider
+from shared.timeseries import OHLCVStore, momentum, volatility
+from shared.streams import MARKET_STREAM, SENTIMENT_STREAM, SIGNAL_STREAM, StreamConsumer, publish
 
 logger = logging.getLogger(__name__)
 
@@ -11,8 +19,13 @@ r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
 conn = sqlite3.connect(DB_PATH)
 
 c = conn.cursor()
-c.execute('''CREATE TABLE IF NOT EXISTS signals
-(signal_id TEXT PRIMARY KEY, cluster_id TEXT, signal_json TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
+apply_migrations(conn, 'core', CORE_MIGRATIONS)
+consensus = ConsensusIndex(
+    conn, TRACKER_DB_PATH, windows=(1, 6, 24, CONSENSUS_WINDOW_HOURS), min_trust=DEFAULT_TRUST_THRESHOLD,
+)
+ohlcv = OHLCVStore(MARKET_DATA_PATH, r, OHLCV_HOT_BARS)
+# The provider SDK is imported when the first signal is escalated, not at startup.
+decisions = Lazy(lambda: DecisionCache(conn, get_provider(LLM_PROVIDER, OPENAI_API_KEY, ANTHROPIC_API_KEY), LLM_CONCURRENCY))
 
 def behavior_pattern_score(cluster_id):
     c.execute("SELECT trust_score FROM wallets WHERE cluster_id=?", (cluster_id,))
@@ -26,54 +39,186 @@ def behavior_pattern_score(cluster_id):
     }
 
 def multi_wallet_check(token):
-    return True  # Pseudo: real version checks cluster alignments in your wallet graph.
+    """True when enough high-trust wallets in independent clusters are net accumulating ``token``."""
+    return consensus.multi_wallet_check(token, CONSENSUS_WINDOW_HOURS, CONSENSUS_MIN_WALLETS)
 
-def final_llm_check(signals, signal_id, cluster_id):
-    patterns = behavior_pattern_score(cluster_id)
-    multi_wallets = multi_wallet_check(signals.get('token'))
+# Star counts are published under the project name; other tokens use github_stars_<symbol>.
+GITHUB_STARS_KEYS = {'SOL': 'github_stars_solana'}
 
-    signals['patterns'] = patterns
-    signals['multi_wallet_consensus'] = multi_wallets
+def github_stars_key(token):
+    return GITHUB_STARS_KEYS.get(token, f'github_stars_{token.lower()}')
 
-    signals['swing_candidate'] = (
-        signals['nlp_sentiment'] > 0.85 and multi_wallets
-    )
+# Pre-filter weights for sentiment, cluster trust, wallet consensus and 24h price momentum.
+PREFILTER_WEIGHTS = np.array([0.4, 0.2, 0.3, 0.1])
 
-    try:
-        if LLM_PROVIDER == 'openai':
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Quant risk engine."},
-                    {"role": "user", "content": json.dumps(signals)},
-                ],
-            )
-            decision = response.choices[0].message
-        else:
-            decision = "Claude flow placeholder"
+def bar_stats(bars):
+    """1h momentum and 24h volatility in percent from 1-minute bars, None without enough history."""
+    close = bars['close']
+    stats = {'momentum_1h_pct': momentum(close, 60), 'volatility_24h_pct': volatility(close, 1440)}
+    return {name: None if np.isnan(value) else round(value * 100, 1) for name, value in stats.items()}
 
-        c.execute(
-            "INSERT INTO signals VALUES (?, ?, ?, datetime('now'))",
-            (signal_id, cluster_id, json.dumps(signals)),
-        )
-        conn.commit()
-        return decision
-    except Exception as e:
-        logger.error("LLM failed — fallback DRY_RUN: %s", e)
-        return "DRY_RUN"
-
-def main():
-    # Example signal
-    signals = {
-        "token": "SOL",
-        "nlp_sentiment": float(r.get('nlp_sentiment_score') or 0),
-        "github_stars": int(r.get('github_stars_solana') or 0)
+def build_signals(token, sentiment, github_stars, price_change, bars):
+    """Signal payload for ``token``; exactly what the LLM sees and the decision cache hashes."""
+    multi_wallets = multi_wallet_check(token)
+    cluster_id = consensus.lead_cluster(token, CONSENSUS_WINDOW_HOURS)
+    return {
+        "token": token,
+        "cluster_id": cluster_id,
+        "nlp_sentiment": sentiment,
+        "github_stars": github_stars,
+        "price_change_pct": round(price_change, 1),
+        **bar_stats(bars),
+        "accumulating_wallets": consensus.accumulators(token, CONSENSUS_WINDOW_HOURS),
+        "patterns": behavior_pattern_score(cluster_id),
+        "multi_wallet_consensus": multi_wallets,
+        "swing_candidate": sentiment > DEFAULT_SENTIMENT_THRESHOLD and multi_wallets,
     }
+
+def prefilter_scores(batch):
+    """Deterministic score in [0, 1] per signal, computed column-wise over the whole batch."""
+    features = np.array([
+        (s['nlp_sentiment'], s['patterns']['trust_score'], s['accumulating_wallets'], s['price_change_pct'])
+        for s in batch
+    ], dtype=float).reshape(-1, 4)
+    features[:, 2] /= max(CONSENSUS_MIN_WALLETS, 1)
+    features[:, 3] = features[:, 3] / 10 + 0.5  # -5%..+5% maps onto 0..1
+    return np.clip(features, 0, 1) @ PREFILTER_WEIGHTS
+
+def prefilter(batch, top_k=LLM_TOP_K, min_score=PREFILTER_MIN_SCORE, cooling=frozenset()):
+    """Indices of the signals worth an LLM call, best first, and how many each stage dropped.
+
+    Tokens in ``cooling`` were escalated recently and are skipped.  Swing
+    candidates always pass the score threshold; the rest need
+    ``min_score``.  Survivors are ranked swing candidates first, then by
+    score, and only the first ``top_k`` are escalated.
+    """
+    scores = prefilter_scores(batch)
+    swing = np.array([bool(s['swing_candidate']) for s in batch], dtype=bool)
+    cold = np.array([s['token'] not in cooling for s in batch], dtype=bool)
+    passed = ((scores >= min_score) | swing) & cold
+    order = np.lexsort((-scores, ~swing))
+    ranked = order[passed[order]]
+    escalated = ranked[:top_k].tolist()
+    stats = {
+        'candidates': len(batch),
+        'cooling_down': int((~cold).sum()),
+        'below_threshold': int((~passed & cold).sum()),
+        'over_top_k': len(ranked) - len(escalated),
+        'escalated': len(escalated),
+    }
+    return escalated, stats
+
+async def final_llm_check(signals):
+    decision = await decisions.decide(signals)
+    signal_id = f"{signals['token']}:{decisions.key(signals)[:16]}"
+    c.execute(
+        "INSERT OR REPLACE INTO signals VALUES (?, ?, ?, datetime('now'))",
+        (signal_id, signals['cluster_id'], json.dumps(signals)),
+    )
+    conn.commit()
+    publish(r, SIGNAL_STREAM, 'signal', {
+        'signal_id': signal_id,
+        'token': signals['token'],
+        'cluster_id': signals['cluster_id'],
+        'swing_candidate': signals['swing_candidate'],
+        'decision': decision,
+    })
+    return decision
+
+def cycle_tokens():
+    """Configured tokens plus those high-trust wallets are currently accumulating."""
+    tokens = [t.strip().upper() for t in SIGNAL_TOKENS if t.strip()]
+    tokens += [token for token, _ in consensus.top_tokens(CONSENSUS_WINDOW_HOURS, limit=20)]
+    return list(dict.fromkeys(tokens))
+
+# Monotonic time each token was last escalated; ticker events re-score a token
+# every few ticks and the rounded inputs keep changing its cache key.
+escalated_at = {}
+
+def cooling_tokens(now):
+    return {token for token, at in escalated_at.items() if now - at < LLM_ESCALATION_COOLDOWN}
+
+async def run_cycle(tokens=None):
+    """Score every token, then send the top ``LLM_TOP_K`` to the LLM concurrently.
+
+    A token is escalated at most once per ``LLM_ESCALATION_COOLDOWN`` seconds.
+    Returns the decisions for the escalated tokens and the per-stage counts.
+    """
     try:
-        final_llm_check(signals, "sig001", "cluster123")
-    except Exception:
-        logger.exception("Signal analysis failed")
+        consensus.refresh()
+    except sqlite3.Error:
+        # Score on the previous windows rather than skipping the cycle.
+        logger.exception("Consensus refresh failed")
+    tokens = tokens or cycle_tokens()
+    # One round trip for the whole cycle's Redis inputs.
+    keys = ['nlp_sentiment_score']
+    keys += [github_stars_key(t) for t in tokens]
+    keys += [f'kraken:{t}/USD' for t in tokens]
+    keys += [f'sentiment:token:{t}' for t in tokens]
+    sentiment, *rest = r.mget(keys)
+    n = len(tokens)
+    stars, tickers, token_sentiment = rest[:n], rest[n:2 * n], rest[2 * n:]
+    history = ohlcv.windows([f'{t}/USD' for t in tokens], '1m', bars=1441)
+    batch = [
+        build_signals(
+            # Signed sentiment of texts mentioning the token, else the market-wide score.
+            token, float(mentions if mentions is not None else sentiment or 0), int(star or 0),
+            float(json.loads(ticker or '{}').get('percentage') or 0), history[f'{token}/USD'],
+        )
+        for token, star, ticker, mentions in zip(tokens, stars, tickers, token_sentiment)
+    ]
+    now = time.monotonic()
+    escalated, stats = prefilter(batch, cooling=cooling_tokens(now))
+    escalated_at.update((tokens[i], now) for i in escalated)
+    results = await asyncio.gather(*(final_llm_check(batch[i]) for i in escalated))
+    return {tokens[i]: decision for i, decision in zip(escalated, results)}, stats
+
+def event_tokens(events):
+    """Tokens affected by ``events``; None when a market-wide input such as sentiment changed."""
+    tokens = []
+    for event in events:
+        if event.type == 'ticker':
+            tokens.append(event.data['symbol'].split('/')[0].upper())
+        elif event.type == 'sentiment':
+            return None
+    return list(dict.fromkeys(tokens))
+
+def decision_counts():
+    """LLM calls and cache hits so far, without building the cache (and importing the SDK) to read them."""
+    if not decisions.ready:
+        return 0, 0
+    return decisions.misses, decisions.hits
+
+async def main():
+    """Evaluate signals as market and sentiment events arrive, and every ``SIGNAL_INTERVAL`` seconds."""
+    config.validate_required_config(telegram=False)
+    consumer = StreamConsumer(
+        r, 'signal_engine', [MARKET_STREAM, SENTIMENT_STREAM], block_ms=min(SIGNAL_INTERVAL, 5) * 1000,
+    )
+    last_full = 0.0
+    while True:
+        try:
+            events = await asyncio.to_thread(consumer.read)
+            tokens = event_tokens(events)
+            if tokens is None or time.monotonic() - last_full >= SIGNAL_INTERVAL:
+                tokens, last_full = None, time.monotonic()
+            elif not tokens:
+                consumer.ack(events)
+                continue
+            calls = decision_counts()[0]
+            results, stats = await run_cycle(tokens)
+            consumer.ack(events)
+            misses, hits = decision_counts()
+            lag = max((time.time() - e.ts for e in events), default=0.0)
+            logger.info(
+                "Scored %d tokens: %d cooling down, %d below threshold, %d beyond top-%d, %d escalated; "
+                "%d LLM calls (%d decisions cached so far); %d events, oldest %.0fms",
+                stats['candidates'], stats['cooling_down'], stats['below_threshold'], stats['over_top_k'], LLM_TOP_K,
+                stats['escalated'], misses - calls, hits, len(events), lag * 1000,
+            )
+        except Exception:
+            logger.exception("Signal analysis failed")
+            await asyncio.sleep(1)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
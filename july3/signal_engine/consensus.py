@@ -0,0 +1,267 @@
+import logging
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDS = 3600
+
+
+def bucket_of(ts: str) -> int:
+    """Hour bucket of a stored ``YYYY-MM-DD HH:MM:SS[.ffffff]`` timestamp.
+
+    The tracker stores naive local times, so they are interpreted locally to
+    line up with ``time.time()``.
+    """
+    return int(datetime.fromisoformat(ts).timestamp()) // BUCKET_SECONDS
+
+
+def bucket_bounds(bucket: int) -> Tuple[str, str]:
+    start = datetime.fromtimestamp(bucket * BUCKET_SECONDS)
+    end = datetime.fromtimestamp((bucket + 1) * BUCKET_SECONDS)
+    return start.isoformat(' '), end.isoformat(' ')
+
+
+class FlowWindow:
+    """Net token flow per wallet over the last ``hours`` hour buckets.
+
+    Alongside the per-wallet sums it keeps, per token, how many high-trust
+    wallets and how many clusters are net accumulating, so consensus
+    queries are dictionary lookups.
+    """
+
+    def __init__(self, hours: int) -> None:
+        self.hours = hours
+        self.end: Optional[int] = None
+        self.net: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.cluster_net: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.accumulating: Dict[str, int] = defaultdict(int)
+        self.accumulating_clusters: Dict[str, int] = defaultdict(int)
+
+    def contains(self, bucket: int) -> bool:
+        return self.end is not None and self.end - self.hours < bucket <= self.end
+
+    def apply(self, token: str, wallet: str, delta: float, cluster: Optional[str], trusted: bool) -> None:
+        key = token.upper()
+        wallets = self.net[key]
+        before = wallets.get(wallet, 0.0)
+        after = before + delta
+        if abs(after) < 1e-12:
+            wallets.pop(wallet, None)
+            after = 0.0
+        else:
+            wallets[wallet] = after
+        if trusted:
+            self.accumulating[key] += (after > 0) - (before > 0)
+        if cluster is not None:
+            clusters = self.cluster_net[key]
+            c_before = clusters.get(cluster, 0.0)
+            c_after = c_before + delta
+            if abs(c_after) < 1e-12:
+                clusters.pop(cluster, None)
+                c_after = 0.0
+            else:
+                clusters[cluster] = c_after
+            self.accumulating_clusters[key] += (c_after > 0) - (c_before > 0)
+
+    def reset(self, end: int) -> None:
+        self.end = end
+        self.net.clear()
+        self.cluster_net.clear()
+        self.accumulating.clear()
+        self.accumulating_clusters.clear()
+
+
+class ConsensusIndex:
+    """Rolling cluster/token flow index fed incrementally from ``advanced_transactions``.
+
+    ``refresh`` reads transactions stored since the last call (by rowid),
+    re-aggregates only the (token, hour) buckets they touch into
+    ``token_flow_buckets`` and applies the differences to the in-memory
+    windows, then slides each window forward by whole buckets.  Re-stored
+    rows therefore never double count.  Only wallets known to the core
+    ``wallet_clusters``/``wallets`` tables are tracked.
+
+    The tracker database is opened read-only; until the tracker has created
+    it and its schema, there are simply no flows.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, tracker_db_path: str, windows: Iterable[int] = (1, 6, 24),
+                 min_trust: float = 0.7) -> None:
+        self.conn = conn
+        self.tracker_db_path = tracker_db_path
+        self.windows = {hours: FlowWindow(hours) for hours in windows}
+        self.min_trust = min_trust
+        self.clusters: Dict[str, str] = {}
+        self.trusted: Set[str] = set()
+        self.tracker_available: Optional[bool] = None
+
+    def _load_identities(self) -> Tuple[bool, Set[str]]:
+        """Reload wallet clusters and trust; returns (changed, newly tracked wallets)."""
+        clusters = {w.lower(): c for w, c in self.conn.execute('SELECT wallet_id, cluster_id FROM wallet_clusters')}
+        trusted = set()
+        for wallet, cluster_id, trust in self.conn.execute('SELECT wallet_id, cluster_id, trust_score FROM wallets'):
+            clusters.setdefault(wallet.lower(), cluster_id)
+            if (trust or 0) >= self.min_trust:
+                trusted.add(wallet.lower())
+        changed = clusters != self.clusters or trusted != self.trusted
+        added = set(clusters) - set(self.clusters)
+        self.clusters, self.trusted = clusters, trusted
+        return changed, added
+
+    def _cursor(self) -> int:
+        row = self.conn.execute("SELECT last_rowid FROM flow_cursors WHERE source='advanced_transactions'").fetchone()
+        return row[0] if row else 0
+
+    def _touched(self, tracker: sqlite3.Connection, added: Set[str]) -> Tuple[Set[Tuple[str, int]], int]:
+        cursor = self._cursor()
+        touched = set()
+        # Buckets aggregated before a wallet was tracked do not include it yet.
+        for wallet in added:
+            for token, ts in tracker.execute(
+                'SELECT token, timestamp FROM advanced_transactions WHERE from_address=? '
+                'UNION ALL SELECT token, timestamp FROM advanced_transactions WHERE to_address=?',
+                (wallet, wallet),
+            ):
+                if token and ts:
+                    touched.add((token, bucket_of(ts)))
+        while True:
+            rows = tracker.execute(
+                'SELECT rowid, token, timestamp FROM advanced_transactions WHERE rowid > ? ORDER BY rowid LIMIT 1000',
+                (cursor,),
+            ).fetchall()
+            if not rows:
+                return touched, cursor
+            for rowid, token, ts in rows:
+                if token and ts:
+                    touched.add((token, bucket_of(ts)))
+            cursor = rows[-1][0]
+
+    def _aggregate(self, tracker: sqlite3.Connection, token: str, bucket: int) -> Dict[str, float]:
+        start, end = bucket_bounds(bucket)
+        net: Dict[str, float] = defaultdict(float)
+        for sender, receiver, amount in tracker.execute(
+            'SELECT from_address, to_address, amount FROM advanced_transactions WHERE token=? AND timestamp >= ? AND timestamp < ?',
+            (token, start, end),
+        ):
+            if sender == receiver or not amount:
+                continue
+            if receiver in self.clusters:
+                net[receiver] += amount
+            if sender in self.clusters:
+                net[sender] -= amount
+        return net
+
+    def _apply(self, bucket: int, token: str, wallet: str, delta: float) -> None:
+        for window in self.windows.values():
+            if window.contains(bucket):
+                window.apply(token, wallet, delta, self.clusters.get(wallet), wallet in self.trusted)
+
+    def _open_tracker(self) -> Optional[sqlite3.Connection]:
+        # Read-only, so a missing database is reported rather than created empty.
+        uri = Path(self.tracker_db_path).absolute().as_uri() + '?mode=ro'
+        tracker = None
+        try:
+            tracker = sqlite3.connect(uri, uri=True)
+            tracker.execute('SELECT 1 FROM advanced_transactions LIMIT 1')
+        except sqlite3.OperationalError as e:
+            if tracker is not None:
+                tracker.close()
+            if self.tracker_available is not False:
+                logger.warning("No wallet flows yet, tracker database %s is not ready: %s", self.tracker_db_path, e)
+            self.tracker_available = False
+            return None
+        if self.tracker_available is False:
+            logger.info("Tracker database %s is ready, ingesting wallet flows", self.tracker_db_path)
+        self.tracker_available = True
+        return tracker
+
+    def _ingest(self, added: Set[str]) -> int:
+        tracker = self._open_tracker()
+        if tracker is None:
+            return 0
+        try:
+            touched, cursor = self._touched(tracker, added)
+            updates = []
+            for token, bucket in touched:
+                new = self._aggregate(tracker, token, bucket)
+                old = dict(self.conn.execute(
+                    'SELECT wallet_id, net_amount FROM token_flow_buckets WHERE bucket=? AND token=?', (bucket, token),
+                ))
+                for wallet in set(new) | set(old):
+                    delta = new.get(wallet, 0.0) - old.get(wallet, 0.0)
+                    if delta:
+                        self._apply(bucket, token, wallet, delta)
+                updates.append((bucket, token, new))
+        finally:
+            tracker.close()
+        with self.conn:
+            for bucket, token, net in updates:
+                self.conn.execute('DELETE FROM token_flow_buckets WHERE bucket=? AND token=?', (bucket, token))
+                self.conn.executemany(
+                    'INSERT INTO token_flow_buckets (bucket, token, wallet_id, net_amount) VALUES (?, ?, ?, ?)',
+                    [(bucket, token, wallet, amount) for wallet, amount in net.items() if amount],
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO flow_cursors (source, last_rowid) VALUES ('advanced_transactions', ?)", (cursor,),
+            )
+        return len(updates)
+
+    def _load_window(self, window: FlowWindow, end: int) -> None:
+        window.reset(end)
+        for token, wallet, amount in self.conn.execute(
+            'SELECT token, wallet_id, SUM(net_amount) FROM token_flow_buckets WHERE bucket > ? AND bucket <= ? GROUP BY token, wallet_id',
+            (end - window.hours, end),
+        ):
+            window.apply(token, wallet, amount, self.clusters.get(wallet), wallet in self.trusted)
+
+    def _slide(self, window: FlowWindow, end: int) -> None:
+        # Each step adds the entering bucket and removes the one leaving the window.
+        while window.end < end:
+            window.end += 1
+            for bucket, sign in ((window.end, 1.0), (window.end - window.hours, -1.0)):
+                for token, wallet, amount in self.conn.execute(
+                    'SELECT token, wallet_id, net_amount FROM token_flow_buckets WHERE bucket=?', (bucket,),
+                ):
+                    window.apply(token, wallet, sign * amount, self.clusters.get(wallet), wallet in self.trusted)
+
+    def refresh(self, now: Optional[float] = None) -> int:
+        """Ingest new transactions and advance every window to ``now``; returns buckets rebuilt."""
+        end = int(now if now is not None else time.time()) // BUCKET_SECONDS
+        identities_changed, added = self._load_identities()
+        for window in self.windows.values():
+            if window.end is None or identities_changed or end - window.end >= window.hours:
+                self._load_window(window, end)
+            else:
+                self._slide(window, end)
+        return self._ingest(added)
+
+    def accumulators(self, token: str, hours: int = 24) -> int:
+        """High-trust wallets with a positive net flow of ``token`` over the window."""
+        return self.windows[hours].accumulating.get(token.upper(), 0)
+
+    def accumulating_clusters(self, token: str, hours: int = 24) -> int:
+        return self.windows[hours].accumulating_clusters.get(token.upper(), 0)
+
+    def lead_cluster(self, token: str, hours: int = 24) -> Optional[str]:
+        """Cluster with the largest net inflow of ``token`` over the window, if any is accumulating."""
+        clusters = self.windows[hours].cluster_net.get(token.upper())
+        if not clusters:
+            return None
+        cluster, amount = max(clusters.items(), key=lambda item: item[1])
+        return cluster if amount > 0 else None
+
+    def top_tokens(self, hours: int = 24, limit: int = 10) -> List[Tuple[str, int]]:
+        counts = self.windows[hours].accumulating
+        return sorted(((t, n) for t, n in counts.items() if n > 0), key=lambda item: -item[1])[:limit]
+
+    def multi_wallet_check(self, token: str, hours: int = 24, min_wallets: int = 3, min_clusters: int = 2) -> bool:
+        """True when enough independent high-trust wallets are accumulating ``token``."""
+        return (
+            self.accumulators(token, hours) >= min_wallets
+            and self.accumulating_clusters(token, hours) >= min_clusters
+        )
@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "Quant risk engine."
+FALLBACK_DECISION = "DRY_RUN"
+
+
+def payload_hash(payload: Any) -> str:
+    """SHA-256 of the canonical JSON form of ``payload`` (sorted keys, no whitespace)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class StubProvider:
+    """Local provider returning a canned decision after ``latency`` seconds.
+
+    The decision depends only on the payload, so runs are reproducible; use
+    it for tests and to benchmark the engine without network calls.
+    """
+
+    name = 'stub'
+    model = 'stub'
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+
+    async def complete(self, system: str, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        signals = json.loads(prompt)
+        action = 'approve' if signals.get('swing_candidate') else 'hold'
+        return json.dumps({'action': action, 'token': signals.get('token')})
+
+
+class OpenAIProvider:
+    name = 'openai'
+
+    def __init__(self, api_key: Optional[str], model: str = 'gpt-4o') -> None:
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(api_key=api_key)
+        self.model = model
+
+    async def complete(self, system: str, prompt: str) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+        )
+        return response.choices[0].message.content or ''
+
+
+class AnthropicProvider:
+    name = 'anthropic'
+
+    def __init__(self, api_key: Optional[str], model: str = 'claude-3-5-sonnet-latest') -> None:
+        from anthropic import AsyncAnthropic
+
+        self.client = AsyncAnthropic(api_key=api_key)
+        self.model = model
+
+    async def complete(self, system: str, prompt: str) -> str:
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=1024,
+            system=system,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return ''.join(block.text for block in response.content if block.type == 'text')
+
+
+def get_provider(name: str, openai_api_key: Optional[str] = None, anthropic_api_key: Optional[str] = None):
+    """Long-lived provider client for ``LLM_PROVIDER``."""
+    if name == 'openai':
+        return OpenAIProvider(openai_api_key)
+    if name == 'anthropic':
+        return AnthropicProvider(anthropic_api_key)
+    if name == 'stub':
+        return StubProvider()
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+class DecisionCache:
+    """LLM decisions cached by a hash of the exact request, persisted in ``llm_decisions``.
+
+    The key covers the provider, model, system prompt and canonical payload,
+    so an unchanged signal never costs a second call while a changed input
+    or model always does.  At most ``concurrency`` calls are in flight, and
+    concurrent requests for the same payload share one call.  Failed calls
+    return ``FALLBACK_DECISION`` and are not cached.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, provider, concurrency: int = 4,
+                 system_prompt: str = SYSTEM_PROMPT) -> None:
+        self.conn = conn
+        self.provider = provider
+        self.concurrency = concurrency
+        self.system_prompt = system_prompt
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, payload: Dict) -> str:
+        return payload_hash({
+            'provider': self.provider.name,
+            'model': self.provider.model,
+            'system': self.system_prompt,
+            'payload': payload,
+        })
+
+    def _gate(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop.
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+            self._inflight.clear()
+        return self._semaphore
+
+    def lookup(self, key: str) -> Optional[str]:
+        row = self.conn.execute('SELECT decision FROM llm_decisions WHERE payload_hash=?', (key,)).fetchone()
+        return row[0] if row else None
+
+    async def _call(self, key: str, payload: Dict) -> str:
+        async with self._gate():
+            try:
+                decision = await self.provider.complete(self.system_prompt, json.dumps(payload))
+            except Exception as e:
+                logger.error("LLM failed — fallback %s: %s", FALLBACK_DECISION, e)
+                return FALLBACK_DECISION
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO llm_decisions (payload_hash, provider, decision, created_at) '
+                "VALUES (?, ?, ?, datetime('now'))",
+                (key, f"{self.provider.name}:{self.provider.model}", decision),
+            )
+        return decision
+
+    async def decide(self, payload: Dict) -> str:
+        key = self.key(payload)
+        self._gate()
+        if key in self._inflight:
+            self.hits += 1
+            return await self._inflight[key]
+        cached = self.lookup(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        future = self._inflight[key] = asyncio.ensure_future(self._call(key, payload))
+        try:
+            return await future
+        finally:
+            self._inflight.pop(key, None)
+
+    async def decide_many(self, payloads: List[Dict]) -> List[str]:
+        return list(await asyncio.gather(*(self.decide(p) for p in payloads)))
+
+
+async def _bench(signals: int, distinct: int, latency: float, concurrency: int) -> None:
+    conn = sqlite3.connect(':memory:')
+    apply_migrations(conn, 'core', CORE_MIGRATIONS)
+    provider = StubProvider(latency)
+    cache = DecisionCache(conn, provider, concurrency)
+    payloads = [
+        {'token': f'T{i % distinct}', 'nlp_sentiment': (i % distinct) / distinct, 'swing_candidate': i % 2 == 0}
+        for i in range(signals)
+    ]
+    random.shuffle(payloads)
+    started = time.perf_counter()
+    await cache.decide_many(payloads)
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "%d signals in %.2fs (%.0f/s): %d LLM calls, %d cache hits",
+        signals, elapsed, signals / elapsed, provider.calls, cache.hits,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark the decision cache against the stub provider.")
+    parser.add_argument('--signals', type=int, default=1000)
+    parser.add_argument('--distinct', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(_bench(args.signals, args.distinct, args.latency, args.concurrency))
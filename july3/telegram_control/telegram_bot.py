@@ -3,31 +3,63 @@ import redis
 import sqlite3
 import json
 import logging
-from telegram import Update, Bot
+from telegram import Update
 from telegram.ext import Updater, CommandHandler, CallbackContext
 from config import *
-from wallet_watcher.tracker import estimate_wallet_pnl
+from shared.lazy import Lazy
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+from wallet_watcher.wallet_clusters import WalletClusters
+from shared.streams import TRADE_STREAM, publish
 
 logger = logging.getLogger(__name__)
 
-# Connect to Redis & SQLite
+# Redis connects on first command; SQLite is opened and migrated on first use.
 r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-c = conn.cursor()
 
-# Setup Bot (token and chat ID provided by config)
-bot = Bot(TELEGRAM_BOT_TOKEN)
+def open_db():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    apply_migrations(conn, 'core', CORE_MIGRATIONS)
+    return conn
+
+conn = Lazy(open_db)
+clusters = Lazy(lambda: WalletClusters(conn.get()))
 
 # === Handlers ===
 
 # ✅ 1) Approve trade
 def approve(update: Update, context: CallbackContext):
-    if len(context.args) < 1:
-        update.message.reply_text("Usage: /approve TRADE_ID")
+    if len(context.args) not in (1, 3, 4):
+        update.message.reply_text("Usage: /approve TRADE_ID [long|short AMOUNT [swing]]")
         return
     trade_id = context.args[0]
+    if len(context.args) == 1:
+        r.set(f'trade:{trade_id}:approved', 'true')
+        update.message.reply_text(f"✅ Trade {trade_id} approved.")
+        return
+    # TRADE_ID is a signal_id emitted by the signal engine; queue the order for execution.
+    action = context.args[1].lower()
+    try:
+        amount = float(context.args[2])
+    except ValueError:
+        amount = 0.0
+    if action not in ('long', 'short') or amount <= 0:
+        update.message.reply_text("Usage: /approve TRADE_ID [long|short AMOUNT [swing]]")
+        return
+    row = conn.execute("SELECT cluster_id, signal_json FROM signals WHERE signal_id=?", (trade_id,)).fetchone()
+    if not row:
+        update.message.reply_text(f"⚠️ Unknown signal {trade_id}.")
+        return
+    token = json.loads(row[1])['token']
     r.set(f'trade:{trade_id}:approved', 'true')
-    update.message.reply_text(f"✅ Trade {trade_id} approved.")
+    publish(r, TRADE_STREAM, 'trade_approved', {
+        'trade_id': trade_id,
+        'cluster_id': row[0],
+        'action': action,
+        'symbol': f"{token}/USD",
+        'amount': amount,
+        'swing': len(context.args) == 4 and context.args[3].lower() == 'swing',
+    })
+    update.message.reply_text(f"✅ Trade {trade_id} approved: {action} {amount} {token}/USD queued.")
 
 # ✅ 2) Set exposure limit for cluster
 def set_limit(update: Update, context: CallbackContext):
@@ -36,7 +68,7 @@ def set_limit(update: Update, context: CallbackContext):
         return
     cluster_id, limit = context.args[0], context.args[1]
     try:
-        c.execute("INSERT OR REPLACE INTO cluster_limits VALUES (?, ?)", (cluster_id, limit))
+        conn.execute("INSERT OR REPLACE INTO cluster_limits VALUES (?, ?)", (cluster_id, limit))
         conn.commit()
         update.message.reply_text(f"✅ Limit for {cluster_id} set to {limit}.")
     except Exception as e:
@@ -54,9 +86,7 @@ def set_loss_limit(update: Update, context: CallbackContext):
 # ✅ 4) Show recent logs
 def logs(update: Update, context: CallbackContext):
     try:
-        c.execute('''CREATE TABLE IF NOT EXISTS trades
-                     (trade_id TEXT, cluster_id TEXT, pnl REAL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)''')
-        rows = c.execute('SELECT * FROM trades ORDER BY timestamp DESC LIMIT 5').fetchall()
+        rows = conn.execute('SELECT * FROM trades ORDER BY timestamp DESC LIMIT 5').fetchall()
         if not rows:
             update.message.reply_text("No trades logged yet.")
         for row in rows:
@@ -77,7 +107,7 @@ def label_wallet(update: Update, context: CallbackContext):
         return
     wallet_id, label = context.args[0], context.args[1]
     try:
-        c.execute("UPDATE wallets SET behavior_label=? WHERE wallet_id=?", (label, wallet_id))
+        conn.execute("UPDATE wallets SET behavior_label=? WHERE wallet_id=?", (label, wallet_id))
         conn.commit()
         update.message.reply_text(f"✅ Wallet {wallet_id} labeled: {label}")
     except Exception as e:
@@ -90,13 +120,17 @@ def add_wallet(update: Update, context: CallbackContext):
         return
     wallet_id, cluster_id = context.args[0], context.args[1]
     try:
+        # The tracker opens its own connections; only load it when a wallet is added.
+        from wallet_watcher.tracker import estimate_wallet_pnl
+
         avg_pnl = estimate_wallet_pnl(wallet_id)
         trust_score = max(0.0, min(avg_pnl / 10000, 1.0))
-        c.execute(
+        conn.execute(
             "INSERT OR IGNORE INTO wallets VALUES (?, ?, datetime('now'), ?, ?, ?, ?, ?)",
             (wallet_id, cluster_id, '', avg_pnl, 0, '', trust_score),
         )
         conn.commit()
+        clusters.assign(wallet_id, cluster_id)
         update.message.reply_text(
             f"✅ Wallet {wallet_id} added to {cluster_id}. PnL: {avg_pnl}"
         )
@@ -110,8 +144,7 @@ def wallet_report(update: Update, context: CallbackContext):
         return
     cluster_id = context.args[0]
     try:
-        c.execute("SELECT * FROM wallets WHERE cluster_id=?", (cluster_id,))
-        rows = c.fetchall()
+        rows = conn.execute("SELECT * FROM wallets WHERE cluster_id=?", (cluster_id,)).fetchall()
         if not rows:
             update.message.reply_text(f"No wallets found for cluster {cluster_id}.")
         for row in rows:
@@ -176,6 +209,7 @@ def news(update: Update, context: CallbackContext):
 # === Register handlers ===
 
 def main():
+    config.validate_required_config(llm=False)
     updater = Updater(TELEGRAM_BOT_TOKEN)
     dp = updater.dispatcher
 
@@ -194,7 +228,7 @@ def main():
 
     update_startup = (
         "✅ Bot online!\n"
-        "/approve TRADE_ID\n"
+        "/approve TRADE_ID [long|short AMOUNT [swing]]\n"
         "/set_limit CLUSTER_ID LIMIT\n"
         "/set_loss_limit PERCENT\n"
         "/logs\n"
@@ -207,7 +241,7 @@ def main():
         "/list_feeds\n"
         "/news"
     )
-    bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=update_startup)
+    updater.bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=update_startup)
     logger.info("Telegram bot started")
 
     updater.start_polling()
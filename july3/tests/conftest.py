@@ -0,0 +1,60 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# Services import their siblings as top-level packages (shared, wallet_watcher, ...).
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wallet_watcher.advanced_tracker import AdvancedWalletTracker  # noqa: E402
+from wallet_watcher.records import LiquidityPosition, PerpPosition  # noqa: E402
+
+COUNTERPARTY = '0x00000000000000000000000000000000000000bb'
+PRICES = {'ETH': 2000.0, 'USDC': 1.0}
+
+
+def explorer_rows(address, action, start_block):
+    """Two ETH transfers per wallet: 3 ETH in at block 100, 1 ETH out at block 105."""
+    if action != 'txlist':
+        return []
+    rows = [
+        {'hash': f'{address}-in', 'from': COUNTERPARTY, 'to': address, 'value': str(3 * 10**18),
+         'timeStamp': '1700000000', 'blockNumber': '100', 'input': '0x', 'gasUsed': '21000', 'gasPrice': '1000000000'},
+        {'hash': f'{address}-out', 'from': address, 'to': COUNTERPARTY, 'value': str(10**18),
+         'timeStamp': '1700003600', 'blockNumber': '105', 'input': '0x', 'gasUsed': '21000', 'gasPrice': '1000000000'},
+    ]
+    return [row for row in rows if int(row['blockNumber']) >= start_block]
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    """Tracker on a scratch database with explorer, price and position fetchers stubbed out."""
+    tracker = AdvancedWalletTracker(str(tmp_path / 'tracker.db'))
+
+    async def etherscan_request(address, action, start_block, chain='ethereum'):
+        return explorer_rows(address, action, start_block) if chain == 'ethereum' else []
+
+    async def get_prices(keys):
+        return {(token, day): PRICES.get(token, 0.0) for token, day in keys}
+
+    async def perps(address):
+        return [PerpPosition(address=address, exchange='gmx', symbol='ETH', side='long', size=10.0, entry_price=1900.0,
+                             current_price=2000.0, unrealized_pnl=50.0, realized_pnl=0.0, margin=500.0, leverage=4.0,
+                             liquidation_price=1500.0, timestamp=datetime(2024, 1, 1))]
+
+    async def pools(address):
+        return [LiquidityPosition(address=address, protocol='uniswap_v2', pair='ETH/USDC', token0='ETH', token1='USDC',
+                                  amount0=1.0, amount1=2000.0, shares=1.0, apr=0.0, fees_earned=0.0,
+                                  impermanent_loss=0.0, timestamp=datetime(2024, 1, 1))]
+
+    tracker._etherscan_request = etherscan_request
+    tracker.price_oracle.get_prices = get_prices
+    tracker.perp_providers.adapters.clear()
+    tracker.perp_providers.register('gmx', perps)
+    tracker.liquidity_providers.adapters.clear()
+    tracker.liquidity_providers.register('uniswap_v2', pools)
+    return tracker
+
+# 2 ETH held + (1 ETH + 2000 USDC) in the pool + 500 margin + 50 unrealized PnL.
+EXPECTED_TOTAL_VALUE = 2 * 2000.0 + 2000.0 + 2000.0 + 550.0
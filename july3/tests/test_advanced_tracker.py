@@ -0,0 +1,144 @@
+import asyncio
+import sqlite3
+import time
+from datetime import date, datetime
+
+import pytest
+
+from conftest import EXPECTED_TOTAL_VALUE
+
+WALLET = '0x00000000000000000000000000000000000000aa'
+
+
+def test_streaming_pass_stores_profile_and_advances_cursors(tracker):
+    async def run():
+        try:
+            return await tracker.track_wallet_streaming(WALLET, chains=['ethereum'])
+        finally:
+            await tracker.close()
+
+    profile = asyncio.run(run())
+
+    assert profile.total_trades == 2
+    assert profile.total_value_usd == EXPECTED_TOTAL_VALUE
+    assert not tracker.pending_cursors
+    conn = sqlite3.connect(tracker.db_path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM advanced_transactions').fetchone()[0] == 2
+        assert conn.execute(
+            "SELECT last_block FROM sync_cursors WHERE address=? AND chain='ethereum' AND action='txlist'", (WALLET,)
+        ).fetchone() == (105,)
+        assert conn.execute('SELECT total_value_usd FROM wallet_profiles WHERE address=?', (WALLET,)).fetchone() == (
+            profile.total_value_usd,)
+    finally:
+        conn.close()
+
+
+def test_prices_are_looked_up_by_utc_day(tracker, monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    requested = []
+
+    async def get_prices(keys):
+        keys = list(keys)
+        requested.extend(keys)
+        return {key: 1.0 for key in keys}
+
+    tracker.price_oracle.get_prices = get_prices
+    # 2023-11-15 02:00 UTC, still 2023-11-14 in New York.
+    row = {'hash': '0x1', 'from': WALLET, 'to': WALLET, 'value': '0', 'timeStamp': '1700013600', 'blockNumber': '1'}
+    try:
+        [tx] = asyncio.run(tracker._classify_batch([row], 'normal'))
+    finally:
+        monkeypatch.delenv('TZ')
+        time.tzset()
+    assert requested == [('ETH', date(2023, 11, 15))]
+    assert tx.timestamp == datetime(2023, 11, 14, 21, 0)
+
+
+def test_failed_run_does_not_leave_cursors_for_the_next_one(tracker):
+    prices = tracker.price_oracle.get_prices
+    stub_request = tracker._etherscan_request
+
+    async def broken_prices(keys):
+        raise RuntimeError("price feed down")
+
+    async def explorer_down(address, action, start_block, chain='ethereum'):
+        return None
+
+    def cursor():
+        conn = sqlite3.connect(tracker.db_path)
+        try:
+            return conn.execute(
+                "SELECT last_block FROM sync_cursors WHERE address=? AND action='txlist'", (WALLET,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    async def run():
+        try:
+            # Rows are fetched, then classification fails before anything is stored.
+            tracker.price_oracle.get_prices = broken_prices
+            with pytest.raises(RuntimeError):
+                await tracker.track_wallet_streaming(WALLET, chains=['ethereum'])
+            assert 'error' in await tracker.track_wallet_ultra_comprehensive(WALLET)
+            # The next runs fetch nothing; the first run's blocks must not be committed.
+            tracker.price_oracle.get_prices = prices
+            tracker._etherscan_request = explorer_down
+            await tracker.track_wallet_streaming(WALLET, chains=['ethereum'])
+            await tracker.track_wallet_ultra_comprehensive(WALLET)
+            assert cursor() is None
+            tracker._etherscan_request = stub_request
+            return await tracker.track_wallet_streaming(WALLET, chains=['ethereum'])
+        finally:
+            await tracker.close()
+
+    assert asyncio.run(run()).total_trades == 2
+    assert cursor() == (105,)
+
+
+
+def test_counterparty_does_not_count_shared_rows_twice(tracker):
+    from conftest import COUNTERPARTY, explorer_rows
+
+    async def etherscan_request(address, action, start_block, chain='ethereum'):
+        # The counterparty's explorer history is the same two transfers, seen from the other side.
+        return explorer_rows(WALLET, action, start_block) if chain == 'ethereum' else []
+
+    tracker._etherscan_request = etherscan_request
+
+    async def run():
+        try:
+            await tracker.track_wallet_streaming(WALLET, chains=['ethereum'])
+            return await tracker.track_wallet_streaming(COUNTERPARTY, chains=['ethereum'])
+        finally:
+            await tracker.close()
+
+    profile = asyncio.run(run())
+    assert profile.total_trades == 2
+    conn = sqlite3.connect(tracker.db_path)
+    assert conn.execute('SELECT COUNT(*) FROM advanced_transactions').fetchone()[0] == 2
+    conn.close()
+
+
+def test_position_fetch_failures_are_reported_per_provider(tmp_path):
+    from wallet_watcher.advanced_tracker import AdvancedWalletTracker
+
+    tracker = AdvancedWalletTracker(str(tmp_path / 'tracker.db'))
+
+    async def query_thegraph(subgraph, query, variables=None):
+        raise RuntimeError(f"{subgraph} unavailable")
+
+    tracker._query_thegraph = query_thegraph
+    for name in ('dydx', 'mux'):
+        tracker.perp_providers.unregister(name)
+
+    async def run():
+        try:
+            return await tracker.perp_providers.fetch_all(WALLET)
+        finally:
+            await tracker.close()
+
+    result = asyncio.run(run())
+    assert result.items == []
+    assert result.errors == {'gmx': 'gmx unavailable', 'perp_protocol': 'perp-protocol unavailable'}
@@ -0,0 +1,33 @@
+import asyncio
+import sqlite3
+
+from conftest import EXPECTED_TOTAL_VALUE
+from wallet_watcher.batch_scheduler import BatchWalletScheduler
+
+WALLETS = [f'0x{i:040x}' for i in range(1, 6)]
+
+
+def test_batch_tracks_every_wallet(tracker):
+    scheduler = BatchWalletScheduler(tracker, concurrency=2)
+
+    async def run():
+        try:
+            # Duplicates (in any case) are tracked once.
+            return [summary async for summary in scheduler.run(WALLETS + [WALLETS[0].upper()])]
+        finally:
+            await tracker.close()
+
+    summaries = asyncio.run(run())
+
+    assert [s for s in summaries if 'error' in s] == []
+    assert sorted(s['address'] for s in summaries) == WALLETS
+    assert (scheduler.completed, scheduler.failed) == (5, 0)
+    for summary in summaries:
+        assert summary['transactions']['total'] == 2
+        assert summary['profile'].total_value_usd == EXPECTED_TOTAL_VALUE
+    conn = sqlite3.connect(tracker.db_path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM wallet_profiles').fetchone()[0] == 5
+        assert conn.execute("SELECT COUNT(*) FROM sync_cursors WHERE last_block=105").fetchone()[0] == 5
+    finally:
+        conn.close()
@@ -0,0 +1,36 @@
+import sqlite3
+
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+from signal_engine.consensus import ConsensusIndex
+from wallet_watcher.tracker_store import TRACKER_MIGRATIONS
+
+WALLET = '0x00000000000000000000000000000000000000aa'
+
+
+def core_db():
+    conn = sqlite3.connect(':memory:')
+    apply_migrations(conn, 'core', CORE_MIGRATIONS)
+    conn.execute('INSERT INTO wallet_clusters (wallet_id, cluster_id) VALUES (?, ?)', (WALLET, 'c1'))
+    return conn
+
+
+def test_missing_tracker_database_means_no_flows(tmp_path):
+    path = tmp_path / 'tracker.db'
+    consensus = ConsensusIndex(core_db(), str(path))
+
+    assert consensus.refresh() == 0
+    assert not path.exists()
+
+    sqlite3.connect(path).close()
+    assert consensus.refresh() == 0
+
+    tracker = sqlite3.connect(path)
+    apply_migrations(tracker, 'tracker', TRACKER_MIGRATIONS)
+    with tracker:
+        tracker.execute(
+            "INSERT INTO advanced_transactions (hash, from_address, to_address, amount, token, timestamp) "
+            "VALUES ('0x1', '0xbb', ?, 5, 'SOL', datetime('now', 'localtime'))", (WALLET,),
+        )
+    tracker.close()
+    assert consensus.refresh() == 1
+    assert consensus.lead_cluster('SOL') == 'c1'
@@ -0,0 +1,27 @@
+import json
+
+import fakeredis
+
+from data_ingestor.kraken_feed import KrakenFeed
+from shared.timeseries import OHLCVStore
+
+
+def candle(minute, close):
+    return json.dumps({'channel': 'ohlc', 'type': 'update', 'data': [{
+        'symbol': 'ETH/USD', 'interval_begin': f'2024-01-01T00:0{minute}:00.000000000Z',
+        'open': 1.0, 'high': 3.0, 'low': 0.5, 'close': close, 'volume': 1.0,
+    }]})
+
+
+def test_candles_closed_between_flushes_are_all_stored(tmp_path):
+    r = fakeredis.FakeRedis()
+    store = OHLCVStore(str(tmp_path), r)
+    feed = KrakenFeed(r, ['ETH/USD'], store=store)
+
+    for raw in (candle(0, 1.5), candle(0, 1.6), candle(1, 2.0), candle(2, 2.5)):
+        feed.handle(raw)
+    feed._flush(feed._take())
+
+    assert feed.coalesced == 1
+    assert store.window('ETH/USD', '1m')['close'].tolist() == [1.6, 2.0, 2.5]
+    assert feed.bars == {}
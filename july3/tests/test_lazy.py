@@ -0,0 +1,28 @@
+import sys
+import threading
+
+from shared.lazy import lazy_import
+
+
+def test_first_use_from_many_threads(tmp_path, monkeypatch):
+    (tmp_path / 'slow_module.py').write_text('import time\ntime.sleep(0.2)\nVALUE = 42\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, 'slow_module', raising=False)
+    module = lazy_import('slow_module')
+    barrier = threading.Barrier(8)
+    results, errors = [], []
+
+    def use():
+        barrier.wait()
+        try:
+            results.append(module.VALUE)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert results == [42] * 8
@@ -0,0 +1,38 @@
+import asyncio
+import json
+import sqlite3
+
+from shared.http_client import HttpClient, get_http_client
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+from wallet_watcher.pnl_estimator import PnlEstimator
+
+
+def test_estimate_sync_uses_its_own_session(tmp_path, monkeypatch):
+    path = str(tmp_path / 'core.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, 'core', CORE_MIGRATIONS)
+    conn.close()
+    clients = []
+
+    async def request(self, method, url, timeout=None, **kwargs):
+        clients.append(self)
+        return json.dumps({'ETH': {'totalInUSD': 150, 'totalOutUSD': 50}})
+
+    async def close_shared():
+        raise AssertionError("estimate_sync closed the shared HTTP pool")
+
+    monkeypatch.setattr(HttpClient, 'request', request)
+    monkeypatch.setattr(get_http_client(), 'close', close_shared)
+    estimator = PnlEstimator(path, rate_limit=1000)
+    try:
+        assert estimator.estimate_sync(['0xa']) == {'0xa': 100.0}
+
+        async def from_running_loop():
+            return estimator.estimate_sync(['0xb', '0xa'])
+
+        # Handlers running inside an event loop can call it too.
+        assert asyncio.run(from_running_loop()) == {'0xb': 100.0, '0xa': 100.0}
+    finally:
+        estimator.close_sync()
+    assert len(clients) == 2
+    assert get_http_client() not in clients
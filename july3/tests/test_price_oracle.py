@@ -0,0 +1,65 @@
+import asyncio
+import sqlite3
+from datetime import date, datetime, timezone
+
+from shared.migrations import apply_migrations
+from wallet_watcher.price_oracle import PriceOracle
+from wallet_watcher.tracker_store import TRACKER_MIGRATIONS
+
+
+def make_oracle(tmp_path, spot):
+    path = str(tmp_path / 'tracker.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, 'tracker', TRACKER_MIGRATIONS)
+    conn.close()
+    oracle = PriceOracle(path, get_session=None)
+    calls = []
+
+    async def get_json(url, params):
+        calls.append(url)
+        if url.endswith('/simple/price'):
+            return {coin: {'usd': price} for coin, price in spot.items()}
+        if 'ethereum' in url:
+            start = params['from'] * 1000
+            return {'prices': [[start, 1800.0], [start + 86400 * 1000, 1900.0]]}
+        return {}
+
+    oracle._get_json = get_json
+    return oracle, calls
+
+
+def test_only_real_history_and_todays_spot_price_are_cached(tmp_path):
+    today = datetime.now(timezone.utc).date()
+    past = date(2024, 1, 1)
+    oracle, calls = make_oracle(tmp_path, {'chainlink': 15.0})
+
+    prices = asyncio.run(oracle.get_prices([('ETH', past), ('LINK', past), ('LINK', today), ('NOPE', past)]))
+
+    assert prices == {('ETH', past): 1800.0, ('LINK', past): 15.0, ('LINK', today): 15.0, ('NOPE', past): 0.0}
+    assert set(oracle._lru) >= {('ETH', past), ('LINK', today)}
+    assert ('LINK', past) not in oracle._lru
+    assert ('NOPE', past) not in oracle._lru
+
+    # History went to price_cache; a fresh oracle serves it from SQLite.
+    fresh, fresh_calls = make_oracle(tmp_path, {})
+    assert asyncio.run(fresh.get_price('ETH', past)) == 1800.0
+    assert fresh_calls == [] and fresh.stats['db_hits'] == 1
+
+
+def test_unknown_symbols_and_empty_history_are_not_refetched(tmp_path):
+    past = date(2024, 1, 1)
+    oracle, calls = make_oracle(tmp_path, {'chainlink': 15.0})
+
+    asyncio.run(oracle.get_prices([('LINK', past), ('NOPE', past)]))
+    assert sum('/coins/chainlink/' in url for url in calls) == 1
+    assert not any('nope' in url for url in calls)
+
+    # LINK's empty range is remembered; only the spot fallback is asked again.
+    calls.clear()
+    assert asyncio.run(oracle.get_prices([('LINK', past), ('NOPE', past)])) == {('LINK', past): 15.0, ('NOPE', past): 0.0}
+    assert calls == [oracle.base_url + '/simple/price']
+
+    oracle._no_history['LINK'] = 0.0
+    calls.clear()
+    asyncio.run(oracle.get_price('LINK', past))
+    assert sum('/coins/chainlink/' in url for url in calls) == 1
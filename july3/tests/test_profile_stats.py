@@ -0,0 +1,89 @@
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from shared.migrations import apply_migrations
+from wallet_watcher.profile_stats import ProfileAccumulator, profile_metrics, rescore_profiles, transactions_frame
+from wallet_watcher.records import AdvancedTransaction, PerpPosition, TransactionType
+from wallet_watcher.tracker_store import TRACKER_MIGRATIONS, TrackerStore
+
+NOW = datetime(2024, 6, 1)
+WALLETS = [f'0x{i:040x}' for i in range(1, 5)]
+NUMERIC = ('total_pnl', 'win_rate', 'total_trades', 'avg_trade_size', 'risk_score', 'activity_score')
+
+
+def history(n=500):
+    rng = random.Random(7)
+    txs = []
+    for i in range(n):
+        wallet, other = rng.choice(WALLETS), rng.choice(WALLETS + ['0xdead'])
+        sender, receiver = (wallet, other) if rng.random() < 0.5 else (other, wallet)
+        txs.append(AdvancedTransaction(
+            hash=f'0x{i}', from_address=sender, to_address=receiver, amount=rng.random() * 10,
+            token=rng.choice('ABCDEFG'), timestamp=NOW - timedelta(seconds=rng.randint(0, 30 * 86400)),
+            chain='ethereum', tx_type=TransactionType.SPOT_BUY, exchange=rng.choice(['', 'unknown', 'uni', 'sushi']),
+            price_usd=rng.random() * 100, profit_loss=rng.choice([0, 1, -1]), mev_detected=rng.random() < 0.1,
+        ))
+    return txs
+
+
+def test_accumulator_matches_profile_metrics():
+    perps = [PerpPosition(address=WALLETS[0], exchange='gmx', symbol='ETH', side='long', size=1, entry_price=1,
+                          current_price=1, unrealized_pnl=7, realized_pnl=0, margin=1, leverage=12,
+                          liquidation_price=0, timestamp=NOW)]
+    txs = history()
+    for wallet in WALLETS + ['0xempty']:
+        mine = [tx for tx in txs if wallet in (tx.from_address, tx.to_address)]
+        positions = perps if wallet == WALLETS[0] else []
+        stats = ProfileAccumulator(now=NOW)
+        stats.update(mine)
+        frame = profile_metrics(
+            transactions_frame(wallet, mine), wallets=[wallet], now=NOW,
+            leverage=pd.Series({wallet: 12.0}) if positions else None,
+            unrealized_pnl=pd.Series({wallet: 7.0}) if positions else None,
+        ).to_dict('records')[0]
+        streamed = stats.metrics(positions)
+        for field in NUMERIC:
+            assert abs(streamed[field] - frame[field]) < 1e-9, field
+        assert streamed['trading_pattern'] == frame['trading_pattern']
+        assert streamed['last_activity'] == frame['last_activity'] or not mine
+
+
+def test_rescore_is_independent_of_page_size(tmp_path):
+    path = str(tmp_path / 'tracker.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, 'tracker', TRACKER_MIGRATIONS)
+    conn.close()
+    store = TrackerStore(path)
+    rows = [(tx.hash, tx.from_address, tx.to_address, tx.amount, tx.token, tx.timestamp, tx.chain, tx.tx_type.value,
+             tx.exchange, tx.price_usd, tx.profit_loss, tx.mev_detected) for tx in history()]
+    store.execute_many(
+        'INSERT INTO advanced_transactions (hash, from_address, to_address, amount, token, timestamp, chain, tx_type, '
+        'exchange, price_usd, profit_loss, mev_detected) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows,
+    ).result()
+    for wallet in WALLETS:
+        store.execute(
+            'INSERT INTO wallet_profiles (address, total_value_usd, tags) VALUES (?, 0, ?)', (wallet, ''),
+        ).result()
+    store.close()
+
+    def scores():
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute(
+                'SELECT address, total_pnl, win_rate, total_trades, avg_trade_size, risk_score, trading_pattern '
+                'FROM wallet_profiles ORDER BY address'
+            ).fetchall()
+        finally:
+            conn.close()
+
+    assert rescore_profiles(path) == len(WALLETS)
+    whole = scores()
+    assert rescore_profiles(path, page_size=37) == len(WALLETS)
+    paged = scores()
+    for a, b in zip(whole, paged):
+        assert a[0] == b[0] and a[-1] == b[-1]
+        assert all(abs(x - y) < 1e-9 for x, y in zip(a[1:-1], b[1:-1]))
+    assert all(row[3] > 0 for row in whole)
@@ -0,0 +1,35 @@
+import asyncio
+
+from wallet_watcher.provider_registry import ProviderRegistry
+
+
+def test_timeout_cancels_every_attempt():
+    started, cancelled = [], []
+
+    async def hang(address):
+        started.append(address)
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(address)
+            raise
+
+    async def ok(address):
+        return [address]
+
+    registry = ProviderRegistry('perp')
+    registry.register('slow', hang, timeout=0.05, hedge_after=0.01)
+    registry.register('stuck', hang, timeout=0.005, hedge_after=1)
+    registry.register('fast', ok, timeout=1, hedge_after=0.5)
+
+    async def run():
+        result = await registry.fetch_all('0xaa')
+        await asyncio.sleep(0)
+        return result, [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    result, leftover = asyncio.run(run())
+    assert result.items == ['0xaa']
+    assert set(result.errors) == {'slow', 'stuck'}
+    # Hedged provider: both attempts; timed out before hedging: the first one.
+    assert len(started) == 3 and len(cancelled) == 3
+    assert leftover == []
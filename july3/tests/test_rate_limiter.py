@@ -0,0 +1,52 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from shared.migrations import apply_migrations
+from shared.rate_limiter import ApiRateLimiter, QuotaExhausted
+from wallet_watcher.tracker_store import TRACKER_MIGRATIONS
+
+CONFIGS = {'etherscan': {'primary': 'k1', 'secondary': 'k2', 'rate_limit': 1000, 'daily_limit': 2}}
+
+
+def tracker_db(tmp_path):
+    path = str(tmp_path / 'tracker.db')
+    conn = sqlite3.connect(path)
+    apply_migrations(conn, 'tracker', TRACKER_MIGRATIONS)
+    conn.close()
+    return path
+
+
+def test_usage_is_persisted_and_reloaded(tmp_path):
+    path = tracker_db(tmp_path)
+    limiter = ApiRateLimiter(CONFIGS, path, flush_every=1)
+
+    async def spend():
+        for _ in range(4):
+            async with limiter.use('etherscan'):
+                pass
+        with pytest.raises(QuotaExhausted):
+            await limiter.acquire('etherscan')
+
+    asyncio.run(spend())
+    limiter.flush()
+
+    reloaded = ApiRateLimiter(CONFIGS, path)
+    assert {slot: u['calls_made'] for slot, u in reloaded.usage()['etherscan'].items()} == {'primary': 2, 'secondary': 2}
+
+
+def test_exhausted_quota_skips_the_request(tmp_path):
+    from wallet_watcher.advanced_tracker import AdvancedWalletTracker
+
+    tracker = AdvancedWalletTracker(str(tmp_path / 'tracker.db'))
+    for state in tracker.rate_limiter.providers['etherscan'].keys:
+        state.quota = 0
+
+    async def run():
+        try:
+            return await tracker._etherscan_request('0xaa', 'txlist', 0)
+        finally:
+            await tracker.close()
+
+    assert asyncio.run(run()) is None
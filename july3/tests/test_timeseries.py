@@ -0,0 +1,20 @@
+import os
+
+import numpy as np
+
+from shared.timeseries import BAR_DTYPE, OHLCVStore
+
+
+def test_replacing_the_open_bar_overwrites_in_place(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    path = store._path('ETH/USD', '1m')
+    assert store.append('ETH/USD', '1m', [[0, 1, 2, 0.5, 1.5, 3], [60000, 1.5, 2, 1, 1.8, 1]]) == 2
+    reader = np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(2,))
+
+    assert store.append('ETH/USD', '1m', [[60000, 1.5, 3, 1, 2.5, 7]]) == 1
+
+    # The file never shrank, so the existing mapping stays valid and sees the update.
+    assert os.path.getsize(path) == 2 * BAR_DTYPE.itemsize
+    assert reader[-1].tolist() == (60000, 1.5, 3.0, 1.0, 2.5, 7.0)
+    assert store.append('ETH/USD', '1m', [[60000, 1.5, 3, 1, 2.6, 8], [120000, 2.6, 3, 2, 2.9, 2]]) == 2
+    assert store.window('ETH/USD', '1m')['close'].tolist() == [1.5, 2.6, 2.9]
@@ -0,0 +1,41 @@
+import sqlite3
+
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+from wallet_watcher.wallet_clusters import WalletClusters
+
+
+def core_db():
+    conn = sqlite3.connect(':memory:')
+    apply_migrations(conn, 'core', CORE_MIGRATIONS)
+    return conn
+
+
+def link(clusters, src, dst):
+    clusters.conn.execute('INSERT OR IGNORE INTO wallet_edges (src, dst) VALUES (?, ?)', (src, dst))
+    return clusters.add_edges([(src, dst)], funded=[dst])
+
+
+def test_union_keeps_hand_assigned_label():
+    clusters = WalletClusters(core_db())
+    # A larger generated cluster must not swallow the manual label.
+    link(clusters, '0xb1', '0xb2')
+    clusters.assign('0xa1', 'desk')
+
+    assert link(clusters, '0xa1', '0xb1') == 1
+    assert {clusters.cluster_of(w) for w in ('0xa1', '0xb1', '0xb2')} == {'desk'}
+
+
+def test_two_manual_clusters_are_not_merged():
+    conn = core_db()
+    conn.executemany('INSERT INTO cluster_limits VALUES (?, ?)', [('desk', 100.0), ('fund', 50.0)])
+    clusters = WalletClusters(conn)
+    clusters.assign('0xa1', 'desk')
+    clusters.assign('0xb1', 'fund')
+
+    assert link(clusters, '0xa1', '0xb1') == 0
+    assert clusters.cluster_of('0xa1') == 'desk'
+    assert clusters.cluster_of('0xb1') == 'fund'
+
+    link(clusters, '0xc1', '0xa1')
+    clusters.rebuild()
+    assert [clusters.cluster_of(w) for w in ('0xa1', '0xb1', '0xc1')] == ['desk', 'fund', 'desk']
@@ -0,0 +1,139 @@
+import csv
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+DEX = 'dex'
+PERP = 'perp'
+LENDING = 'lending'
+STAKING = 'staking'
+BRIDGE = 'bridge'
+CEX_HOT = 'cex_hot'
+CATEGORIES = (DEX, PERP, LENDING, STAKING, BRIDGE, CEX_HOT)
+
+# Category and exchange label for the names used in
+# AdvancedWalletTracker._load_contract_addresses.
+BUILTIN_LABELS = {
+    'uniswap_v2': (DEX, 'uniswap'),
+    'uniswap_v3': (DEX, 'uniswap'),
+    'sushiswap': (DEX, 'sushiswap'),
+    'pancakeswap': (DEX, 'pancakeswap'),
+    '1inch': (DEX, '1inch'),
+    'paraswap': (DEX, 'paraswap'),
+    'gmx': (PERP, ''),
+    'dydx': (PERP, ''),
+    'perp_protocol': (PERP, ''),
+    'mux': (PERP, ''),
+    'aave': (LENDING, ''),
+    'compound': (LENDING, ''),
+    'maker': (LENDING, ''),
+    'lido': (STAKING, ''),
+    'rocket_pool': (STAKING, ''),
+    'multichain': (BRIDGE, ''),
+    'hop': (BRIDGE, ''),
+    'celer': (BRIDGE, ''),
+    'synapse': (BRIDGE, ''),
+}
+
+
+@dataclass(frozen=True)
+class AddressLabel:
+    address: str
+    label: str
+    category: str
+    exchange: str = ''
+
+
+class AddressIndex:
+    """Immutable address -> label index with one lookup set per category.
+
+    Keys are lower-cased addresses, so lookups are case-insensitive and match
+    both checksummed and plain hex forms in O(1).
+    """
+
+    def __init__(self, entries: Iterable[AddressLabel]) -> None:
+        labels: Dict[str, AddressLabel] = {}
+        for entry in entries:
+            if entry.category not in CATEGORIES:
+                logger.warning("Unknown address category %s for %s", entry.category, entry.address)
+            labels[entry.address.lower()] = entry
+        self._labels: Mapping[str, AddressLabel] = MappingProxyType(labels)
+        by_category: Dict[str, set] = {category: set() for category in CATEGORIES}
+        for key, entry in labels.items():
+            by_category.setdefault(entry.category, set()).add(key)
+        self._categories: Mapping[str, FrozenSet[str]] = MappingProxyType(
+            {category: frozenset(keys) for category, keys in by_category.items()}
+        )
+        self.contracts: FrozenSet[str] = frozenset(
+            key for key, entry in labels.items() if entry.category != CEX_HOT
+        )
+        self.exchange_labels: Mapping[str, str] = MappingProxyType(
+            {key: entry.exchange for key, entry in labels.items() if entry.exchange}
+        )
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, address: str) -> bool:
+        return address.lower() in self._labels
+
+    def get(self, address: str) -> Optional[AddressLabel]:
+        return self._labels.get(address.lower())
+
+    def category(self, name: str) -> FrozenSet[str]:
+        return self._categories.get(name, frozenset())
+
+    def is_category(self, address: str, name: str) -> bool:
+        return address.lower() in self.category(name)
+
+    def exchange(self, address: str) -> str:
+        return self.exchange_labels.get(address.lower(), 'unknown')
+
+    @staticmethod
+    def entries_from_contracts(contracts: Mapping) -> List[AddressLabel]:
+        """Convert the tracker's built-in ``name -> address(es)`` mapping."""
+        entries = []
+        for name, value in contracts.items():
+            if name.endswith('_hot'):
+                category, exchange = CEX_HOT, name[:-len('_hot')]
+            else:
+                category, exchange = BUILTIN_LABELS.get(name, (DEX, ''))
+            for address in value if isinstance(value, list) else [value]:
+                entries.append(AddressLabel(address, name, category, exchange))
+        return entries
+
+    @staticmethod
+    def entries_from_file(path: str) -> List[AddressLabel]:
+        """Load labels from a JSON list or CSV with address,label,category[,exchange]."""
+        file_path = Path(path)
+        with file_path.open(newline='') as f:
+            if file_path.suffix.lower() == '.json':
+                rows = json.load(f)
+            else:
+                rows = list(csv.DictReader(f))
+        entries = []
+        for row in rows:
+            try:
+                entries.append(AddressLabel(
+                    address=row['address'].strip(),
+                    label=row.get('label', '').strip(),
+                    category=row['category'].strip(),
+                    exchange=(row.get('exchange') or '').strip(),
+                ))
+            except (KeyError, AttributeError) as e:
+                logger.warning("Skipping malformed address label %s: %s", row, e)
+        logger.info("Loaded %d address labels from %s", len(entries), path)
+        return entries
+
+    @classmethod
+    def build(cls, contracts: Mapping, labels_path: Optional[str] = None) -> 'AddressIndex':
+        """Index the built-in contracts, extended/overridden by ``labels_path``."""
+        entries = cls.entries_from_contracts(contracts)
+        if labels_path:
+            entries.extend(cls.entries_from_file(labels_path))
+        return cls(entries)
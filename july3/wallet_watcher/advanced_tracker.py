@@ -5,125 +5,58 @@ import time
 import sqlite3
 import hashlib
 import logging
-from datetime import datetime, timedelta
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any, Tuple
 from collections import defaultdict
+import heapq
 import numpy as np
-import pandas as pd
-from web3 import Web3
-import requests
 import re
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 import threading
-from enum import Enum
+from shared.lazy import lazy_import
+from shared.migrations import apply_migrations
+from shared.rate_limiter import ApiRateLimiter, QuotaExhausted
+from wallet_watcher.address_index import AddressIndex, CEX_HOT, LENDING, PERP
+from wallet_watcher.price_oracle import PriceOracle
+from wallet_watcher.profile_stats import ProfileAccumulator, net_balances, profile_metrics, transactions_frame
+from wallet_watcher.provider_registry import ProviderRegistry
+from wallet_watcher.records import (
+    AdvancedTransaction, LiquidityPosition, PerpPosition, TransactionType, WalletProfile,
+)
+from wallet_watcher.tracker_store import TRACKER_MIGRATIONS, TrackerStore
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-
-class TransactionType(Enum):
-    SPOT_BUY = "spot_buy"
-    SPOT_SELL = "spot_sell"
-    PERP_OPEN = "perp_open"
-    PERP_CLOSE = "perp_close"
-    LIQUIDITY_ADD = "liquidity_add"
-    LIQUIDITY_REMOVE = "liquidity_remove"
-    BRIDGE = "bridge"
-    STAKE = "stake"
-    UNSTAKE = "unstake"
-    LENDING = "lending"
-    BORROWING = "borrowing"
-    NFT_BUY = "nft_buy"
-    NFT_SELL = "nft_sell"
-    AIRDROP = "airdrop"
-    ARBITRAGE = "arbitrage"
-    MEV = "mev"
-    UNKNOWN = "unknown"
-
-
-@dataclass
-class AdvancedTransaction:
-    hash: str
-    from_address: str
-    to_address: str
-    amount: float
-    token: str
-    timestamp: datetime
-    chain: str
-    tx_type: TransactionType
-    gas_fee: float = 0.0
-    block_number: int = 0
-    exchange: str = ""
-    price_usd: float = 0.0
-    profit_loss: float = 0.0
-    slippage: float = 0.0
-    mev_detected: bool = False
-    arbitrage_detected: bool = False
-    tags: List[str] = field(default_factory=list)
-    raw_data: Dict = field(default_factory=dict)
-
-
-@dataclass
-class PerpPosition:
-    address: str
-    exchange: str
-    symbol: str
-    side: str
-    size: float
-    entry_price: float
-    current_price: float
-    unrealized_pnl: float
-    realized_pnl: float
-    margin: float
-    leverage: float
-    liquidation_price: float
-    timestamp: datetime
-    is_open: bool = True
-
-
-@dataclass
-class LiquidityPosition:
-    address: str
-    protocol: str
-    pair: str
-    token0: str
-    token1: str
-    amount0: float
-    amount1: float
-    shares: float
-    apr: float
-    fees_earned: float
-    impermanent_loss: float
-    timestamp: datetime
-
-
-@dataclass
-class WalletProfile:
-    address: str
-    total_value_usd: float
-    total_pnl: float
-    win_rate: float
-    total_trades: int
-    avg_trade_size: float
-    risk_score: float
-    activity_score: float
-    top_tokens: List[str]
-    preferred_dexes: List[str]
-    trading_pattern: str
-    last_activity: datetime
-    tags: List[str] = field(default_factory=list)
+pd = lazy_import('pandas')
 
 
 class AdvancedWalletTracker:
-    def __init__(self, db_path: str = "advanced_wallet_tracker.db"):
+    etherscan_page_size = 10000
+    # Etherscan-compatible explorers: chain -> (api_configs provider, endpoint, native token)
+    explorers = {
+        'ethereum': ('etherscan', 'https://api.etherscan.io/api', 'ETH'),
+        'bsc': ('bscscan', 'https://api.bscscan.com/api', 'BNB'),
+        'polygon': ('polygonscan', 'https://api.polygonscan.com/api', 'MATIC'),
+        'arbitrum': ('arbiscan', 'https://api.arbiscan.io/api', 'ETH'),
+        'optimism': ('optimism', 'https://api-optimistic.etherscan.io/api', 'ETH'),
+    }
+    explorer_actions = (('txlist', 'normal'), ('txlistinternal', 'internal'), ('tokentx', 'erc20'), ('tokennfttx', 'erc721'))
+    swap_functions = ('swapExactTokensForTokens', 'swapTokensForExactTokens', 'swapExactETHForTokens')
+
+    def __init__(self, db_path: str = "advanced_wallet_tracker.db", address_labels_path: Optional[str] = None):
         self.db_path = db_path
         self.session = None
+        self.pending_cursors: Dict[str, Dict[Tuple[str, str], int]] = defaultdict(dict)
         self.api_configs = self._setup_api_configs()
         self.contract_addresses = self._load_contract_addresses()
-        self.price_cache = {}
+        self.address_index = AddressIndex.build(self.contract_addresses, address_labels_path)
+        self._setup_position_providers()
         self.setup_advanced_database()
+        self.store = TrackerStore(self.db_path)
+        self.rate_limiter = ApiRateLimiter(self.api_configs, self.db_path)
+        self.price_oracle = PriceOracle(self.db_path, self.get_session, self.rate_limiter)
         self.executor = ThreadPoolExecutor(max_workers=10)
 
     def _setup_api_configs(self) -> Dict:
@@ -251,101 +184,10 @@ class AdvancedWalletTracker:
 
     def setup_advanced_database(self):
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS advanced_transactions (
-                hash TEXT PRIMARY KEY,
-                from_address TEXT,
-                to_address TEXT,
-                amount REAL,
-                token TEXT,
-                timestamp DATETIME,
-                chain TEXT,
-                tx_type TEXT,
-                gas_fee REAL,
-                block_number INTEGER,
-                exchange TEXT,
-                price_usd REAL,
-                profit_loss REAL,
-                slippage REAL,
-                mev_detected BOOLEAN,
-                arbitrage_detected BOOLEAN,
-                tags TEXT,
-                raw_data TEXT
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS perp_positions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                address TEXT,
-                exchange TEXT,
-                symbol TEXT,
-                side TEXT,
-                size REAL,
-                entry_price REAL,
-                current_price REAL,
-                unrealized_pnl REAL,
-                realized_pnl REAL,
-                margin REAL,
-                leverage REAL,
-                liquidation_price REAL,
-                timestamp DATETIME,
-                is_open BOOLEAN
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS liquidity_positions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                address TEXT,
-                protocol TEXT,
-                pair TEXT,
-                token0 TEXT,
-                token1 TEXT,
-                amount0 REAL,
-                amount1 REAL,
-                shares REAL,
-                apr REAL,
-                fees_earned REAL,
-                impermanent_loss REAL,
-                timestamp DATETIME
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS wallet_profiles (
-                address TEXT PRIMARY KEY,
-                total_value_usd REAL,
-                total_pnl REAL,
-                win_rate REAL,
-                total_trades INTEGER,
-                avg_trade_size REAL,
-                risk_score REAL,
-                activity_score REAL,
-                top_tokens TEXT,
-                preferred_dexes TEXT,
-                trading_pattern TEXT,
-                last_activity DATETIME,
-                tags TEXT
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS price_cache (
-                token TEXT,
-                price_usd REAL,
-                timestamp DATETIME,
-                PRIMARY KEY (token, timestamp)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS api_usage (
-                api_name TEXT,
-                endpoint TEXT,
-                calls_made INTEGER,
-                last_reset DATETIME,
-                PRIMARY KEY (api_name, endpoint)
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        try:
+            apply_migrations(conn, 'tracker', TRACKER_MIGRATIONS)
+        finally:
+            conn.close()
 
     async def get_session(self):
         if self.session is None:
@@ -354,186 +196,376 @@ class AdvancedWalletTracker:
             self.session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers={'User-Agent': 'Advanced-Wallet-Tracker/1.0'})
         return self.session
 
+    async def close(self):
+        await asyncio.to_thread(self.rate_limiter.flush)
+        await asyncio.to_thread(self.store.close)
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
     async def get_comprehensive_transactions(self, address: str, chains: List[str] | None = None) -> List[AdvancedTransaction]:
         if chains is None:
-            chains = ['ethereum', 'bsc', 'polygon', 'arbitrum', 'optimism', 'avalanche']
-        all_transactions = []
-        tasks = []
+            chains = list(self.explorers)
         for chain in chains:
-            if chain == 'ethereum':
-                tasks.append(self._get_ethereum_transactions(address))
-            elif chain == 'bsc':
-                tasks.append(self._get_bsc_transactions(address))
-            elif chain == 'polygon':
-                tasks.append(self._get_polygon_transactions(address))
-            elif chain == 'arbitrum':
-                tasks.append(self._get_arbitrum_transactions(address))
-            elif chain == 'optimism':
-                tasks.append(self._get_optimism_transactions(address))
-            elif chain == 'avalanche':
-                tasks.append(self._get_avalanche_transactions(address))
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        for result in results:
+            if chain not in self.explorers:
+                logger.warning(f"No explorer configured for {chain}, skipping")
+        chains = [chain for chain in chains if chain in self.explorers]
+        all_transactions = []
+        results = await asyncio.gather(*(self._get_chain_transactions(address, chain) for chain in chains),
+                                       return_exceptions=True)
+        for chain, result in zip(chains, results):
             if isinstance(result, Exception):
-                logger.error(f"Error fetching transactions: {result}")
+                logger.error(f"Error fetching {chain} transactions: {result}")
+                # Nothing from this chain will be stored, so its cursors must not advance.
+                self.discard_sync_cursors(address, chain)
                 continue
             all_transactions.extend(result)
         all_transactions.sort(key=lambda x: x.timestamp, reverse=True)
-        analyzed_transactions = await self._analyze_transactions(all_transactions)
-        return analyzed_transactions
+        return all_transactions
 
-    async def _get_ethereum_transactions(self, address: str) -> List[AdvancedTransaction]:
+    async def _get_chain_transactions(self, address: str, chain: str = 'ethereum') -> List[AdvancedTransaction]:
+        _, _, native_token = self.explorers[chain]
+        pages = await asyncio.gather(*(
+            self._fetch_etherscan_data(address, action, chain) for action, _ in self.explorer_actions
+        ))
         transactions = []
-        normal_txs = await self._fetch_etherscan_data(address, 'txlist')
-        internal_txs = await self._fetch_etherscan_data(address, 'txlistinternal')
-        erc20_txs = await self._fetch_etherscan_data(address, 'tokentx')
-        erc721_txs = await self._fetch_etherscan_data(address, 'tokennfttx')
-        for tx in normal_txs:
-            transactions.append(await self._parse_ethereum_transaction(tx, 'normal'))
-        for tx in internal_txs:
-            transactions.append(await self._parse_ethereum_transaction(tx, 'internal'))
-        for tx in erc20_txs:
-            transactions.append(await self._parse_ethereum_transaction(tx, 'erc20'))
-        for tx in erc721_txs:
-            transactions.append(await self._parse_ethereum_transaction(tx, 'erc721'))
+        for rows, (_, category) in zip(pages, self.explorer_actions):
+            transactions.extend(await self._classify_batch(rows, category, chain, native_token))
         return transactions
 
-    async def _fetch_etherscan_data(self, address: str, action: str) -> List[Dict]:
-        base_url = "https://api.etherscan.io/api"
-        for api_key in [self.api_configs['etherscan']['primary'], self.api_configs['etherscan']['secondary']]:
-            try:
-                params = {
-                    'module': 'account',
-                    'action': action,
-                    'address': address,
-                    'startblock': 0,
-                    'endblock': 99999999,
-                    'sort': 'desc',
-                    'apikey': api_key
-                }
-                session = await self.get_session()
-                async with session.get(base_url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('status') == '1':
-                            return data.get('result', [])
-            except Exception as e:
-                logger.warning(f"Etherscan API error with key {api_key[:10]}...: {e}")
-                continue
-        return []
+    def get_sync_cursor(self, address: str, chain: str, action: str) -> int:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT last_block FROM sync_cursors WHERE address=? AND chain=? AND action=?',
+                (address.lower(), chain, action)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else -1
 
-    async def _parse_ethereum_transaction(self, tx_data: Dict, tx_category: str) -> AdvancedTransaction:
-        tx = AdvancedTransaction(
-            hash=tx_data.get('hash', ''),
-            from_address=tx_data.get('from', ''),
-            to_address=tx_data.get('to', ''),
-            amount=float(tx_data.get('value', 0)) / 1e18,
-            token=tx_data.get('tokenSymbol', 'ETH'),
-            timestamp=datetime.fromtimestamp(int(tx_data.get('timeStamp', 0))),
-            chain='ethereum',
-            tx_type=TransactionType.UNKNOWN,
-            gas_fee=float(tx_data.get('gasUsed', 0)) * float(tx_data.get('gasPrice', 0)) / 1e18,
-            block_number=int(tx_data.get('blockNumber', 0)),
-            raw_data=tx_data
-        )
-        tx.tx_type = await self._categorize_transaction(tx)
-        tx.mev_detected = await self._detect_mev(tx)
-        tx.arbitrage_detected = await self._detect_arbitrage(tx)
-        tx.price_usd = await self._get_token_price(tx.token, tx.timestamp)
-        tx.exchange = self._detect_exchange(tx.to_address)
-        return tx
+    def commit_sync_cursors(self, address: str) -> Optional[Future]:
+        # Queued behind the transaction writes, so a cursor never gets ahead of stored rows.
+        pending = self.pending_cursors.pop(address.lower(), {})
+        if not pending:
+            return None
+        return self.store.execute_many('''
+            INSERT OR REPLACE INTO sync_cursors (address, chain, action, last_block, updated_at)
+            VALUES (?, ?, ?, ?, datetime('now'))
+        ''', [(address.lower(), chain, action, block) for (chain, action), block in pending.items()])
+
+    def discard_sync_cursors(self, address: str, chain: Optional[str] = None) -> None:
+        # Called at the start of a run and on every failure path: a cursor staged for
+        # rows that were never stored would otherwise be committed by a later run.
+        if chain is None:
+            self.pending_cursors.pop(address.lower(), None)
+            return
+        pending = self.pending_cursors.get(address.lower(), {})
+        for key in [key for key in pending if key[0] == chain]:
+            del pending[key]
 
-    async def _categorize_transaction(self, tx: AdvancedTransaction) -> TransactionType:
-        if tx.to_address.lower() in [addr.lower() for addr in self.contract_addresses.values() if isinstance(addr, str)]:
-            if tx.raw_data.get('input', '').startswith('0x7ff36ab5'):
-                return TransactionType.SPOT_BUY
-            elif tx.raw_data.get('input', '').startswith('0x18cbafe5'):
-                return TransactionType.SPOT_SELL
+    async def _fetch_etherscan_data(self, address: str, action: str, chain: str = 'ethereum') -> List[Dict]:
+        rows: List[Dict] = []
+        async for page in self._iter_etherscan_pages(address, action, chain):
+            rows.extend(page)
+        return rows
+
+    async def _iter_etherscan_pages(self, address: str, action: str, chain: str = 'ethereum') -> AsyncIterator[List[Dict]]:
+        # Only blocks after the stored cursor are requested; the cursor is
+        # advanced by commit_sync_cursors once the rows have been stored.
+        # Etherscan caps a query at 10k rows, so backfills walk forward by block.
+        last_block = self.get_sync_cursor(address, chain, action)
+        start_block = last_block + 1
+        pending = self.pending_cursors[address.lower()]
+        while True:
+            page = await self._etherscan_request(address, action, start_block, chain)
+            if not page:
+                break
+            done = len(page) < self.etherscan_page_size
+            first_block = int(page[0].get('blockNumber', 0))
+            last_page_block = int(page[-1].get('blockNumber', 0))
+            if not done and first_block != last_page_block:
+                # The last block may be split across pages; re-fetch it whole.
+                page = [tx for tx in page if int(tx.get('blockNumber', 0)) < last_page_block]
+                start_block = last_page_block
             else:
-                return TransactionType.SPOT_BUY if tx.amount > 0 else TransactionType.SPOT_SELL
-        cex_addresses = []
-        for cex, addresses in self.contract_addresses.items():
-            if cex.endswith('_hot') and isinstance(addresses, list):
-                cex_addresses.extend(addresses)
-        if tx.to_address.lower() in [addr.lower() for addr in cex_addresses]:
-            return TransactionType.SPOT_BUY
-        if tx.to_address.lower() == self.contract_addresses['gmx'].lower():
-            return TransactionType.PERP_OPEN
-        if tx.to_address.lower() in [self.contract_addresses['aave'].lower(), self.contract_addresses['compound'].lower()]:
-            return TransactionType.LENDING
-        if 'addLiquidity' in tx.raw_data.get('input', ''):
-            return TransactionType.LIQUIDITY_ADD
-        elif 'removeLiquidity' in tx.raw_data.get('input', ''):
-            return TransactionType.LIQUIDITY_REMOVE
-        return TransactionType.SPOT_BUY if tx.amount > 0 else TransactionType.SPOT_SELL
+                if not done:
+                    # The API cannot page within a block, so the rest of this one is out of reach.
+                    logger.warning(
+                        f"{chain} {action} for {address}: block {last_page_block} has more than "
+                        f"{self.etherscan_page_size} rows, the rest of it is skipped"
+                    )
+                start_block = last_page_block + 1
+            newest = max(int(tx.get('blockNumber', 0)) for tx in page)
+            pending[(chain, action)] = max(newest, last_block, pending.get((chain, action), -1))
+            yield page
+            if done:
+                break
 
-    async def _detect_mev(self, tx: AdvancedTransaction) -> bool:
-        if tx.gas_fee > 0.1:
-            return True
-        if tx.arbitrage_detected:
-            return True
-        if 'flashloan' in tx.raw_data.get('input', '').lower():
-            return True
-        return False
+    async def _etherscan_request(self, address: str, action: str, start_block: int, chain: str = 'ethereum') -> Optional[List[Dict]]:
+        provider, base_url, _ = self.explorers[chain]
+        try:
+            for _ in range(self.rate_limiter.keys_for(provider) + 1):
+                async with self.rate_limiter.use(provider) as lease:
+                    try:
+                        params = {
+                            'module': 'account',
+                            'action': action,
+                            'address': address,
+                            'startblock': start_block,
+                            'endblock': 99999999,
+                            'page': 1,
+                            'offset': self.etherscan_page_size,
+                            'sort': 'asc',
+                            'apikey': lease.key
+                        }
+                        session = await self.get_session()
+                        async with session.get(base_url, params=params) as response:
+                            if response.status == 429:
+                                lease.throttled = True
+                                continue
+                            if response.status == 200:
+                                data = await response.json()
+                                if data.get('status') == '1':
+                                    return data.get('result', [])
+                                if 'rate limit' in str(data.get('result', '')).lower():
+                                    lease.throttled = True
+                                    continue
+                                if data.get('message', '').startswith('No transactions found'):
+                                    return []
+                    except Exception as e:
+                        logger.warning(f"{provider} API error with key {lease.state.slot}: {e}")
+                        continue
+        except QuotaExhausted as e:
+            logger.warning(f"Skipping {chain} {action} for {address}: {e}")
+            return None
+        return None
 
-    async def _detect_arbitrage(self, tx: AdvancedTransaction) -> bool:
-        input_data = tx.raw_data.get('input', '')
-        swap_functions = ['swapExactTokensForTokens', 'swapTokensForExactTokens', 'swapExactETHForTokens']
-        swap_count = sum(1 for func in swap_functions if func in input_data)
-        if swap_count > 1:
-            return True
-        return False
+    async def _iter_classified_pages(self, address: str, chain: str, action: str, tx_category: str) -> AsyncIterator[List[AdvancedTransaction]]:
+        _, _, native_token = self.explorers[chain]
+        async for rows in self._iter_etherscan_pages(address, action, chain):
+            page = await self._classify_batch(rows, tx_category, chain, native_token)
+            page.sort(key=lambda tx: tx.timestamp)
+            yield page
 
-    async def _get_token_price(self, token: str, timestamp: datetime) -> float:
-        cache_key = f"{token}_{timestamp.date()}"
-        if cache_key in self.price_cache:
-            return self.price_cache[cache_key]
-        price = await self._fetch_historical_price(token, timestamp)
-        self.price_cache[cache_key] = price
-        return price
+    async def iter_transaction_pages(self, address: str, chains: Optional[List[str]] = None,
+                                     page_size: int = 1000) -> AsyncIterator[List[AdvancedTransaction]]:
+        """Yield classified transactions oldest first, ``page_size`` at a time.
+
+        Every (chain, action) explorer stream is ascending, so a k-way heap
+        merge keeps the output ordered while holding at most two pages per
+        stream: the one being merged and the next one, fetched ahead.
+        """
+        if chains is None:
+            chains = list(self.explorers)
+        for chain in chains:
+            if chain not in self.explorers:
+                logger.warning(f"No explorer configured for {chain}, skipping")
+        streams = [
+            self._iter_classified_pages(address, chain, action, tx_category)
+            for chain in chains if chain in self.explorers
+            for action, tx_category in self.explorer_actions
+        ]
+        buffers: List[Iterator[AdvancedTransaction]] = [iter(()) for _ in streams]
+        ahead: List[Optional[asyncio.Future]] = [asyncio.ensure_future(anext(s, None)) for s in streams]
+        heap: List[Tuple[datetime, int, AdvancedTransaction]] = []
+
+        async def advance(i: int) -> None:
+            # Push stream i's next transaction, pulling its read-ahead page when the buffer runs dry.
+            while True:
+                tx = next(buffers[i], None)
+                if tx is not None:
+                    heapq.heappush(heap, (tx.timestamp, i, tx))
+                    return
+                if ahead[i] is None:
+                    return
+                page = await ahead[i]
+                if page is None:
+                    ahead[i] = None
+                    return
+                buffers[i] = iter(page)
+                ahead[i] = asyncio.ensure_future(anext(streams[i], None))
 
-    async def _fetch_historical_price(self, token: str, timestamp: datetime) -> float:
         try:
-            price = await self._get_coingecko_historical_price(token, timestamp)
-            if price > 0:
-                return price
-        except Exception as e:
-            logger.warning(f"CoinGecko price fetch failed: {e}")
+            await asyncio.gather(*(advance(i) for i in range(len(streams))))
+            out: List[AdvancedTransaction] = []
+            while heap:
+                # One entry per stream is in the heap, so (timestamp, i) never ties.
+                _, i, tx = heapq.heappop(heap)
+                out.append(tx)
+                if len(out) >= page_size:
+                    yield out
+                    out = []
+                await advance(i)
+            if out:
+                yield out
+        finally:
+            pending = [task for task in ahead if task is not None]
+            for task in pending:
+                task.cancel()
+            # A generator cannot be closed while its read-ahead step is still running.
+            await asyncio.gather(*pending, return_exceptions=True)
+            for stream in streams:
+                await stream.aclose()
+
+    _stored_transactions_sql = '''
+        SELECT hash, from_address, to_address, amount, token, timestamp, chain, tx_type,
+               gas_fee, block_number, exchange, price_usd, profit_loss, slippage,
+               mev_detected, arbitrage_detected, tags, raw_data
+        FROM advanced_transactions
+        WHERE from_address=? OR to_address=?
+    '''
+
+    @staticmethod
+    def _row_to_transaction(row: Tuple) -> AdvancedTransaction:
+        return AdvancedTransaction(
+            hash=row[0], from_address=row[1], to_address=row[2], amount=row[3], token=row[4],
+            timestamp=datetime.fromisoformat(row[5]), chain=row[6], tx_type=TransactionType(row[7]),
+            gas_fee=row[8], block_number=row[9], exchange=row[10], price_usd=row[11],
+            profit_loss=row[12], slippage=row[13], mev_detected=bool(row[14]),
+            arbitrage_detected=bool(row[15]), tags=tuple(row[16].split(',')) if row[16] else (),
+            raw=row[17]
+        )
+
+    def load_stored_transactions(self, address: str) -> List[AdvancedTransaction]:
+        conn = sqlite3.connect(self.db_path)
         try:
-            price = await self._get_cmc_historical_price(token, timestamp)
-            if price > 0:
-                return price
-        except Exception as e:
-            logger.warning(f"CoinMarketCap price fetch failed: {e}")
+            rows = conn.execute(self._stored_transactions_sql, (address.lower(), address.lower())).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_transaction(row) for row in rows]
+
+    def _stored_hashes(self, address: str, hashes: List[str]) -> set:
+        # Chunked to stay under SQLite's host parameter limit on older builds.
+        stored = set()
+        conn = sqlite3.connect(self.db_path)
         try:
-            return await self._get_current_token_price(token)
-        except Exception as e:
-            logger.warning(f"Current price fetch failed: {e}")
-            return 0.0
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                stored.update(row[0] for row in conn.execute(
+                    f"SELECT hash FROM advanced_transactions WHERE hash IN ({','.join('?' * len(chunk))}) "
+                    "AND (from_address=? OR to_address=?)",
+                    (*chunk, address.lower(), address.lower())
+                ))
+        finally:
+            conn.close()
+        return stored
 
-    def _detect_exchange(self, to_address: str) -> str:
-        to_address = to_address.lower()
-        for exchange, addresses in self.contract_addresses.items():
-            if exchange.endswith('_hot') and isinstance(addresses, list):
-                if to_address in [addr.lower() for addr in addresses]:
-                    return exchange.replace('_hot', '')
-        dex_mapping = {
-            self.contract_addresses['uniswap_v2'].lower(): 'uniswap',
-            self.contract_addresses['uniswap_v3'].lower(): 'uniswap',
-            self.contract_addresses['sushiswap'].lower(): 'sushiswap',
-            self.contract_addresses['pancakeswap'].lower(): 'pancakeswap',
-            self.contract_addresses['1inch'].lower(): '1inch',
-            self.contract_addresses['paraswap'].lower(): 'paraswap'
-        }
-        return dex_mapping.get(to_address, 'unknown')
+    async def iter_stored_transactions(self, address: str, batch_size: int = 5000) -> AsyncIterator[List[AdvancedTransaction]]:
+        # Reads run off the event loop, one fetchmany batch at a time.
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            cursor = conn.execute(self._stored_transactions_sql, (address.lower(), address.lower()))
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                yield [self._row_to_transaction(row) for row in rows]
+        finally:
+            conn.close()
+
+    async def _classify_batch(self, rows: List[Dict], tx_category: str, chain: str = 'ethereum', native_token: str = 'ETH') -> List[AdvancedTransaction]:
+        # Classifies a whole page of explorer rows at once: router calls by selector, then known
+        # CEX/perp/lending counterparties and liquidity calls; high gas, repeated swaps or flash
+        # loans flag MEV.
+        if not rows:
+            return []
+        df = pd.DataFrame.from_records(rows)
+
+        def column(name: str, default: Any = '') -> pd.Series:
+            if name in df:
+                return df[name].fillna(default)
+            return pd.Series(default, index=df.index)
+
+        def numeric(name: str) -> np.ndarray:
+            return pd.to_numeric(column(name, 0), errors='coerce').fillna(0).to_numpy(dtype=float)
+
+        to_address = column('to').astype(str)
+        to_lc = to_address.str.lower()
+        input_data = column('input').astype(str)
+        amount = numeric('value') / 1e18
+        gas_fee = numeric('gasUsed') * numeric('gasPrice') / 1e18
+        timestamps = numeric('timeStamp').astype(np.int64)
+        blocks = numeric('blockNumber').astype(np.int64)
+        tokens = column('tokenSymbol', native_token).astype(str)
+
+        index = self.address_index
+        is_contract = to_lc.isin(index.contracts).to_numpy()
+        direction = np.where(amount > 0, TransactionType.SPOT_BUY.value, TransactionType.SPOT_SELL.value)
+        tx_types = np.select(
+            [
+                is_contract & input_data.str.startswith('0x7ff36ab5').to_numpy(),
+                is_contract & input_data.str.startswith('0x18cbafe5').to_numpy(),
+                is_contract,
+                to_lc.isin(index.category(CEX_HOT)).to_numpy(),
+                to_lc.isin(index.category(PERP)).to_numpy(),
+                to_lc.isin(index.category(LENDING)).to_numpy(),
+                input_data.str.contains('addLiquidity', regex=False).to_numpy(),
+                input_data.str.contains('removeLiquidity', regex=False).to_numpy(),
+            ],
+            [
+                TransactionType.SPOT_BUY.value,
+                TransactionType.SPOT_SELL.value,
+                direction,
+                TransactionType.SPOT_BUY.value,
+                TransactionType.PERP_OPEN.value,
+                TransactionType.LENDING.value,
+                TransactionType.LIQUIDITY_ADD.value,
+                TransactionType.LIQUIDITY_REMOVE.value,
+            ],
+            default=direction,
+        )
+        swap_count = sum(
+            input_data.str.contains(func, regex=False).to_numpy(dtype=int) for func in self.swap_functions
+        )
+        arbitrage = swap_count > 1
+        mev = (gas_fee > 0.1) | arbitrage | input_data.str.lower().str.contains('flashloan', regex=False).to_numpy()
+        exchanges = to_lc.map(index.exchange_labels).fillna('unknown')
+
+        # Timestamps stay naive local times like the rest of the tracker; prices are per UTC day.
+        dates = [datetime.fromtimestamp(ts) for ts in timestamps]
+        days = [datetime.fromtimestamp(ts, tz=timezone.utc).date() for ts in timestamps]
+        prices = await self.price_oracle.get_prices(zip(tokens, days))
+
+        by_value = TransactionType._value2member_map_
+        return [
+            AdvancedTransaction(
+                hash=tx_hash,
+                from_address=from_address,
+                to_address=to,
+                amount=float(value),
+                token=token,
+                timestamp=dt,
+                chain=chain,
+                tx_type=by_value[tx_type],
+                gas_fee=float(fee),
+                block_number=int(block),
+                exchange=exchange,
+                price_usd=prices[(token, day)],
+                mev_detected=bool(is_mev),
+                arbitrage_detected=bool(is_arb),
+                raw=raw
+            )
+            for tx_hash, from_address, to, value, token, dt, day, tx_type, fee, block, exchange, is_mev, is_arb, raw in zip(
+                column('hash').astype(str), column('from').astype(str), to_address, amount, tokens, dates, days,
+                tx_types, gas_fee, blocks, exchanges, mev, arbitrage, rows
+            )
+        ]
+
+    def _setup_position_providers(self):
+        # Providers run concurrently, so registering another one does not lengthen a refresh.
+        self.perp_providers = ProviderRegistry('perp')
+        self.perp_providers.register('gmx', self._get_gmx_positions, timeout=15, hedge_after=5)
+        self.perp_providers.register('dydx', self._get_dydx_positions, timeout=10, hedge_after=3)
+        self.perp_providers.register('perp_protocol', self._get_perp_protocol_positions, timeout=15, hedge_after=5)
+        self.perp_providers.register('mux', self._get_mux_positions, timeout=10, hedge_after=3)
+        self.liquidity_providers = ProviderRegistry('liquidity')
+        self.liquidity_providers.register('uniswap_v2', self._get_uniswap_v2_positions, timeout=15, hedge_after=5)
+        self.liquidity_providers.register('uniswap_v3', self._get_uniswap_v3_positions, timeout=15, hedge_after=5)
+        self.liquidity_providers.register('sushiswap', self._get_sushiswap_positions, timeout=15, hedge_after=5)
 
     async def track_perpetual_positions(self, address: str) -> List[PerpPosition]:
-        positions = []
-        positions.extend(await self._get_gmx_positions(address))
-        positions.extend(await self._get_dydx_positions(address))
-        positions.extend(await self._get_perp_protocol_positions(address))
-        positions.extend(await self._get_mux_positions(address))
-        return positions
+        return (await self.perp_providers.fetch_all(address)).items
 
     async def _get_gmx_positions(self, address: str) -> List[PerpPosition]:
         query = """
@@ -555,61 +587,56 @@ class AdvancedWalletTracker:
         }
         """
         variables = {"user": address.lower()}
-        try:
-            positions = []
-            response = await self._query_thegraph('gmx', query, variables)
-            for pos in response.get('data', {}).get('positions', []):
-                position = PerpPosition(
-                    address=address,
-                    exchange='gmx',
-                    symbol=pos.get('market', ''),
-                    side=pos.get('side', ''),
-                    size=float(pos.get('size', 0)),
-                    entry_price=float(pos.get('entryPrice', 0)),
-                    current_price=float(pos.get('markPrice', 0)),
-                    unrealized_pnl=float(pos.get('pnl', 0)),
-                    realized_pnl=0.0,
-                    margin=float(pos.get('collateral', 0)),
-                    leverage=float(pos.get('leverage', 0)),
-                    liquidation_price=0.0,
-                    timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
-                )
-                positions.append(position)
-            return positions
-        except Exception as e:
-            logger.error(f"Error fetching GMX positions: {e}")
-            return []
+        positions = []
+        response = await self._query_thegraph('gmx', query, variables)
+        for pos in response.get('data', {}).get('positions', []):
+            position = PerpPosition(
+                address=address,
+                exchange='gmx',
+                symbol=pos.get('market', ''),
+                side=pos.get('side', ''),
+                size=float(pos.get('size', 0)),
+                entry_price=float(pos.get('entryPrice', 0)),
+                current_price=float(pos.get('markPrice', 0)),
+                unrealized_pnl=float(pos.get('pnl', 0)),
+                realized_pnl=0.0,
+                margin=float(pos.get('collateral', 0)),
+                leverage=float(pos.get('leverage', 0)),
+                liquidation_price=0.0,
+                timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
+            )
+            positions.append(position)
+        return positions
 
     async def _get_dydx_positions(self, address: str) -> List[PerpPosition]:
         base_url = "https://indexer.dydx.trade/v4"
-        try:
-            session = await self.get_session()
-            async with session.get(f"{base_url}/addresses/{address}/positions") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    positions = []
-                    for pos in data.get('positions', []):
-                        if pos.get('status') == 'OPEN':
-                            position = PerpPosition(
-                                address=address,
-                                exchange='dydx',
-                                symbol=pos.get('market', ''),
-                                side=pos.get('side', ''),
-                                size=float(pos.get('size', 0)),
-                                entry_price=float(pos.get('entryPrice', 0)),
-                                current_price=float(pos.get('oraclePrice', 0)),
-                                unrealized_pnl=float(pos.get('unrealizedPnl', 0)),
-                                realized_pnl=float(pos.get('realizedPnl', 0)),
-                                margin=float(pos.get('margin', 0)),
-                                leverage=float(pos.get('leverage', 0)),
-                                liquidation_price=float(pos.get('liquidationPrice', 0)),
-                                timestamp=datetime.fromisoformat(pos.get('createdAt', '').replace('Z', '+00:00'))
-                            )
-                            positions.append(position)
-                    return positions
-        except Exception as e:
-            logger.error(f"Error fetching dYdX positions: {e}")
-            return []
+        session = await self.get_session()
+        async with session.get(f"{base_url}/addresses/{address}/positions") as response:
+            # The indexer answers 404 for addresses that never opened a subaccount.
+            if response.status == 404:
+                return []
+            response.raise_for_status()
+            data = await response.json()
+            positions = []
+            for pos in data.get('positions', []):
+                if pos.get('status') == 'OPEN':
+                    position = PerpPosition(
+                        address=address,
+                        exchange='dydx',
+                        symbol=pos.get('market', ''),
+                        side=pos.get('side', ''),
+                        size=float(pos.get('size', 0)),
+                        entry_price=float(pos.get('entryPrice', 0)),
+                        current_price=float(pos.get('oraclePrice', 0)),
+                        unrealized_pnl=float(pos.get('unrealizedPnl', 0)),
+                        realized_pnl=float(pos.get('realizedPnl', 0)),
+                        margin=float(pos.get('margin', 0)),
+                        leverage=float(pos.get('leverage', 0)),
+                        liquidation_price=float(pos.get('liquidationPrice', 0)),
+                        timestamp=datetime.fromisoformat(pos.get('createdAt', '').replace('Z', '+00:00'))
+                    )
+                    positions.append(position)
+            return positions
 
     async def _get_perp_protocol_positions(self, address: str) -> List[PerpPosition]:
         query = """
@@ -633,72 +660,64 @@ class AdvancedWalletTracker:
         }
         """
         variables = {"trader": address.lower()}
-        try:
-            positions = []
-            response = await self._query_thegraph('perp-protocol', query, variables)
-            for pos in response.get('data', {}).get('positions', []):
-                position = PerpPosition(
-                    address=address,
-                    exchange='perp_protocol',
-                    symbol=pos.get('baseToken', ''),
-                    side=pos.get('side', ''),
-                    size=float(pos.get('size', 0)),
-                    entry_price=float(pos.get('entryPrice', 0)),
-                    current_price=float(pos.get('markPrice', 0)),
-                    unrealized_pnl=float(pos.get('unrealizedPnl', 0)),
-                    realized_pnl=float(pos.get('realizedPnl', 0)),
-                    margin=float(pos.get('margin', 0)),
-                    leverage=float(pos.get('leverage', 0)),
-                    liquidation_price=float(pos.get('liquidationPrice', 0)),
-                    timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
-                )
-                positions.append(position)
-            return positions
-        except Exception as e:
-            logger.error(f"Error fetching Perp Protocol positions: {e}")
-            return []
+        positions = []
+        response = await self._query_thegraph('perp-protocol', query, variables)
+        for pos in response.get('data', {}).get('positions', []):
+            position = PerpPosition(
+                address=address,
+                exchange='perp_protocol',
+                symbol=pos.get('baseToken', ''),
+                side=pos.get('side', ''),
+                size=float(pos.get('size', 0)),
+                entry_price=float(pos.get('entryPrice', 0)),
+                current_price=float(pos.get('markPrice', 0)),
+                unrealized_pnl=float(pos.get('unrealizedPnl', 0)),
+                realized_pnl=float(pos.get('realizedPnl', 0)),
+                margin=float(pos.get('margin', 0)),
+                leverage=float(pos.get('leverage', 0)),
+                liquidation_price=float(pos.get('liquidationPrice', 0)),
+                timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
+            )
+            positions.append(position)
+        return positions
 
     async def _get_mux_positions(self, address: str) -> List[PerpPosition]:
         base_url = "https://api.mux.network/v1"
-        try:
-            session = await self.get_session()
-            async with session.get(f"{base_url}/positions/{address}") as response:
-                if response.status == 200:
-                    data = await response.json()
-                    positions = []
-                    for pos in data.get('positions', []):
-                        if pos.get('isOpen', False):
-                            position = PerpPosition(
-                                address=address,
-                                exchange='mux',
-                                symbol=pos.get('symbol', ''),
-                                side=pos.get('side', ''),
-                                size=float(pos.get('size', 0)),
-                                entry_price=float(pos.get('entryPrice', 0)),
-                                current_price=float(pos.get('markPrice', 0)),
-                                unrealized_pnl=float(pos.get('unrealizedPnl', 0)),
-                                realized_pnl=float(pos.get('realizedPnl', 0)),
-                                margin=float(pos.get('margin', 0)),
-                                leverage=float(pos.get('leverage', 0)),
-                                liquidation_price=float(pos.get('liquidationPrice', 0)),
-                                timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
-                            )
-                            positions.append(position)
-                    return positions
-        except Exception as e:
-            logger.error(f"Error fetching MUX positions: {e}")
-            return []
+        session = await self.get_session()
+        async with session.get(f"{base_url}/positions/{address}") as response:
+            response.raise_for_status()
+            data = await response.json()
+            positions = []
+            for pos in data.get('positions', []):
+                if pos.get('isOpen', False):
+                    position = PerpPosition(
+                        address=address,
+                        exchange='mux',
+                        symbol=pos.get('symbol', ''),
+                        side=pos.get('side', ''),
+                        size=float(pos.get('size', 0)),
+                        entry_price=float(pos.get('entryPrice', 0)),
+                        current_price=float(pos.get('markPrice', 0)),
+                        unrealized_pnl=float(pos.get('unrealizedPnl', 0)),
+                        realized_pnl=float(pos.get('realizedPnl', 0)),
+                        margin=float(pos.get('margin', 0)),
+                        leverage=float(pos.get('leverage', 0)),
+                        liquidation_price=float(pos.get('liquidationPrice', 0)),
+                        timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
+                    )
+                    positions.append(position)
+            return positions
 
     async def track_liquidity_positions(self, address: str) -> List[LiquidityPosition]:
-        positions = []
-        positions.extend(await self._get_uniswap_v2_positions(address))
-        positions.extend(await self._get_uniswap_v3_positions(address))
-        positions.extend(await self._get_sushiswap_positions(address))
-        positions.extend(await self._get_pancakeswap_positions(address))
-        positions.extend(await self._get_curve_positions(address))
-        return positions
+        return (await self.liquidity_providers.fetch_all(address)).items
 
     async def _get_uniswap_v2_positions(self, address: str) -> List[LiquidityPosition]:
+        return await self._get_v2_pair_positions(address, 'uniswap-v2', 'uniswap_v2')
+
+    async def _get_sushiswap_positions(self, address: str) -> List[LiquidityPosition]:
+        return await self._get_v2_pair_positions(address, 'sushiswap', 'sushiswap')
+
+    async def _get_v2_pair_positions(self, address: str, subgraph: str, protocol: str) -> List[LiquidityPosition]:
         query = """
         query getLiquidityPositions($user: String!) {
             liquidityPositions(where: {user: $user, liquidityTokenBalance_gt: "0"}) {
@@ -726,30 +745,26 @@ class AdvancedWalletTracker:
         }
         """
         variables = {"user": address.lower()}
-        try:
-            positions = []
-            response = await self._query_thegraph('uniswap-v2', query, variables)
-            for pos in response.get('data', {}).get('liquidityPositions', []):
-                pair = pos.get('pair', {})
-                position = LiquidityPosition(
-                    address=address,
-                    protocol='uniswap_v2',
-                    pair=f"{pair.get('token0', {}).get('symbol', '')}/{pair.get('token1', {}).get('symbol', '')}",
-                    token0=pair.get('token0', {}).get('symbol', ''),
-                    token1=pair.get('token1', {}).get('symbol', ''),
-                    amount0=float(pos.get('token0Deposited', 0)) - float(pos.get('token0Withdrawn', 0)),
-                    amount1=float(pos.get('token1Deposited', 0)) - float(pos.get('token1Withdrawn', 0)),
-                    shares=float(pos.get('liquidityTokenBalance', 0)),
-                    apr=0.0,
-                    fees_earned=0.0,
-                    impermanent_loss=0.0,
-                    timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
-                )
-                positions.append(position)
-            return positions
-        except Exception as e:
-            logger.error(f"Error fetching Uniswap V2 positions: {e}")
-            return []
+        positions = []
+        response = await self._query_thegraph(subgraph, query, variables)
+        for pos in response.get('data', {}).get('liquidityPositions', []):
+            pair = pos.get('pair', {})
+            position = LiquidityPosition(
+                address=address,
+                protocol=protocol,
+                pair=f"{pair.get('token0', {}).get('symbol', '')}/{pair.get('token1', {}).get('symbol', '')}",
+                token0=pair.get('token0', {}).get('symbol', ''),
+                token1=pair.get('token1', {}).get('symbol', ''),
+                amount0=float(pos.get('token0Deposited', 0)) - float(pos.get('token0Withdrawn', 0)),
+                amount1=float(pos.get('token1Deposited', 0)) - float(pos.get('token1Withdrawn', 0)),
+                shares=float(pos.get('liquidityTokenBalance', 0)),
+                apr=0.0,
+                fees_earned=0.0,
+                impermanent_loss=0.0,
+                timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
+            )
+            positions.append(position)
+        return positions
 
     async def _get_uniswap_v3_positions(self, address: str) -> List[LiquidityPosition]:
         query = """
@@ -784,124 +799,75 @@ class AdvancedWalletTracker:
         }
         """
         variables = {"owner": address.lower()}
-        try:
-            positions = []
-            response = await self._query_thegraph('uniswap-v3', query, variables)
-            for pos in response.get('data', {}).get('positions', []):
-                pool = pos.get('pool', {})
-                position = LiquidityPosition(
-                    address=address,
-                    protocol='uniswap_v3',
-                    pair=f"{pool.get('token0', {}).get('symbol', '')}/{pool.get('token1', {}).get('symbol', '')}",
-                    token0=pool.get('token0', {}).get('symbol', ''),
-                    token1=pool.get('token1', {}).get('symbol', ''),
-                    amount0=float(pos.get('depositedToken0', 0)) - float(pos.get('withdrawnToken0', 0)),
-                    amount1=float(pos.get('depositedToken1', 0)) - float(pos.get('withdrawnToken1', 0)),
-                    shares=float(pos.get('liquidity', 0)),
-                    apr=0.0,
-                    fees_earned=float(pos.get('collectedFeesToken0', 0)) + float(pos.get('collectedFeesToken1', 0)),
-                    impermanent_loss=0.0,
-                    timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
-                )
-                positions.append(position)
-            return positions
-        except Exception as e:
-            logger.error(f"Error fetching Uniswap V3 positions: {e}")
-            return []
-
-    async def analyze_wallet_profile(self, address: str) -> WalletProfile:
-        transactions = await self.get_comprehensive_transactions(address)
-        perp_positions = await self.track_perpetual_positions(address)
-        liquidity_positions = await self.track_liquidity_positions(address)
-        total_value_usd = await self._calculate_total_value(address, transactions, perp_positions, liquidity_positions)
-        total_pnl = self._calculate_total_pnl(transactions, perp_positions)
-        win_rate = self._calculate_win_rate(transactions)
-        total_trades = len(transactions)
-        avg_trade_size = sum(tx.amount * tx.price_usd for tx in transactions) / len(transactions) if transactions else 0
-        risk_score = self._calculate_risk_score(transactions, perp_positions)
-        activity_score = self._calculate_activity_score(transactions)
-        top_tokens = self._get_top_tokens(transactions)
-        preferred_dexes = self._get_preferred_dexes(transactions)
-        trading_pattern = self._analyze_trading_pattern(transactions)
-        profile = WalletProfile(
-            address=address,
-            total_value_usd=total_value_usd,
-            total_pnl=total_pnl,
-            win_rate=win_rate,
-            total_trades=total_trades,
-            avg_trade_size=avg_trade_size,
-            risk_score=risk_score,
-            activity_score=activity_score,
-            top_tokens=top_tokens,
-            preferred_dexes=preferred_dexes,
-            trading_pattern=trading_pattern,
-            last_activity=transactions[0].timestamp if transactions else datetime.now()
-        )
-        return profile
-
-    def _calculate_total_pnl(self, transactions: List[AdvancedTransaction], perp_positions: List[PerpPosition]) -> float:
-        realized_pnl = sum(tx.profit_loss for tx in transactions)
-        unrealized_pnl = sum(pos.unrealized_pnl for pos in perp_positions)
-        return realized_pnl + unrealized_pnl
-
-    def _calculate_win_rate(self, transactions: List[AdvancedTransaction]) -> float:
-        profitable_trades = sum(1 for tx in transactions if tx.profit_loss > 0)
-        total_trades = len([tx for tx in transactions if tx.profit_loss != 0])
-        return (profitable_trades / total_trades * 100) if total_trades > 0 else 0
+        positions = []
+        response = await self._query_thegraph('uniswap-v3', query, variables)
+        for pos in response.get('data', {}).get('positions', []):
+            pool = pos.get('pool', {})
+            position = LiquidityPosition(
+                address=address,
+                protocol='uniswap_v3',
+                pair=f"{pool.get('token0', {}).get('symbol', '')}/{pool.get('token1', {}).get('symbol', '')}",
+                token0=pool.get('token0', {}).get('symbol', ''),
+                token1=pool.get('token1', {}).get('symbol', ''),
+                amount0=float(pos.get('depositedToken0', 0)) - float(pos.get('withdrawnToken0', 0)),
+                amount1=float(pos.get('depositedToken1', 0)) - float(pos.get('withdrawnToken1', 0)),
+                shares=float(pos.get('liquidity', 0)),
+                apr=0.0,
+                fees_earned=float(pos.get('collectedFeesToken0', 0)) + float(pos.get('collectedFeesToken1', 0)),
+                impermanent_loss=0.0,
+                timestamp=datetime.fromtimestamp(int(pos.get('timestamp', 0)))
+            )
+            positions.append(position)
+        return positions
 
-    def _calculate_risk_score(self, transactions: List[AdvancedTransaction], perp_positions: List[PerpPosition]) -> float:
-        risk_factors = []
-        avg_leverage = sum(pos.leverage for pos in perp_positions) / len(perp_positions) if perp_positions else 1
-        risk_factors.append(min(avg_leverage / 10, 1) * 30)
-        mev_ratio = sum(1 for tx in transactions if tx.mev_detected) / len(transactions) if transactions else 0
-        risk_factors.append(mev_ratio * 25)
-        avg_position_size = sum(tx.amount * tx.price_usd for tx in transactions) / len(transactions) if transactions else 0
-        if avg_position_size > 100000:
-            risk_factors.append(25)
-        daily_trades = len(transactions) / 30 if transactions else 0
-        if daily_trades > 10:
-            risk_factors.append(20)
-        return min(sum(risk_factors), 100)
+    def with_stored_history(self, address: str, new_transactions: List[AdvancedTransaction]) -> List[AdvancedTransaction]:
+        # Fetches are incremental, so merge in the history stored on earlier runs.
+        seen = {tx.hash for tx in new_transactions}
+        transactions = new_transactions + [tx for tx in self.load_stored_transactions(address) if tx.hash not in seen]
+        transactions.sort(key=lambda x: x.timestamp, reverse=True)
+        return transactions
 
-    def _calculate_activity_score(self, transactions: List[AdvancedTransaction]) -> float:
-        if not transactions:
-            return 0
-        recent_txs = [tx for tx in transactions if tx.timestamp > datetime.now() - timedelta(days=7)]
-        recent_activity = len(recent_txs) / 7 * 10
-        unique_exchanges = len(set(tx.exchange for tx in transactions))
-        diversity_score = min(unique_exchanges * 5, 30)
-        total_volume = sum(tx.amount * tx.price_usd for tx in transactions)
-        volume_score = min(total_volume / 10000, 40)
-        return min(recent_activity + diversity_score + volume_score, 100)
+    async def analyze_wallet_profile(self, address: str, transactions: Optional[List[AdvancedTransaction]] = None,
+                                     perp_positions: Optional[List[PerpPosition]] = None,
+                                     liquidity_positions: Optional[List[LiquidityPosition]] = None) -> WalletProfile:
+        # Callers that already fetched the data sets pass them in to avoid a second fetch.
+        if transactions is None:
+            transactions = self.with_stored_history(address, await self.get_comprehensive_transactions(address))
+        if perp_positions is None:
+            perp_positions = await self.track_perpetual_positions(address)
+        if liquidity_positions is None:
+            liquidity_positions = await self.track_liquidity_positions(address)
+        total_value_usd = await self._calculate_total_value(
+            net_balances(address, transactions), perp_positions, liquidity_positions,
+        )
+        leverage = unrealized_pnl = None
+        if perp_positions:
+            leverage = pd.Series({address: np.mean([pos.leverage for pos in perp_positions])})
+            unrealized_pnl = pd.Series({address: sum(pos.unrealized_pnl for pos in perp_positions)})
+        metrics = profile_metrics(
+            transactions_frame(address, transactions), wallets=[address],
+            leverage=leverage, unrealized_pnl=unrealized_pnl,
+        )
+        return WalletProfile(address=address, total_value_usd=total_value_usd, **metrics.to_dict('records')[0])
 
-    def _get_top_tokens(self, transactions: List[AdvancedTransaction]) -> List[str]:
-        token_counts = defaultdict(int)
-        for tx in transactions:
-            token_counts[tx.token] += 1
-        return sorted(token_counts.keys(), key=lambda x: token_counts[x], reverse=True)[:10]
+    async def _calculate_total_value(self, balances: Dict[str, float], perp_positions: List[PerpPosition],
+                                     liquidity_positions: List[LiquidityPosition]) -> float:
+        # Held tokens and LP legs at today's price, plus collateral and open PnL of perp positions.
+        today = datetime.now(timezone.utc).date()
+        held = {token: amount for token, amount in balances.items() if amount > 0}
+        tokens = set(held)
+        for pos in liquidity_positions:
+            tokens.update((pos.token0, pos.token1))
+        tokens.discard('')
+        prices = await self.price_oracle.get_prices((token, today) for token in tokens)
 
-    def _get_preferred_dexes(self, transactions: List[AdvancedTransaction]) -> List[str]:
-        dex_counts = defaultdict(int)
-        for tx in transactions:
-            if tx.exchange and tx.exchange != 'unknown':
-                dex_counts[tx.exchange] += 1
-        return sorted(dex_counts.keys(), key=lambda x: dex_counts[x], reverse=True)[:5]
+        def value(token: str, amount: float) -> float:
+            return amount * prices.get((token, today), 0.0)
 
-    def _analyze_trading_pattern(self, transactions: List[AdvancedTransaction]) -> str:
-        if not transactions:
-            return "inactive"
-        if len(transactions) > 1:
-            time_diffs = [(transactions[i].timestamp - transactions[i+1].timestamp).total_seconds() for i in range(len(transactions)-1)]
-            avg_time_diff = sum(time_diffs) / len(time_diffs)
-            if avg_time_diff < 3600:
-                return "high_frequency"
-            elif avg_time_diff < 86400:
-                return "day_trader"
-            elif avg_time_diff < 604800:
-                return "active_trader"
-            else:
-                return "long_term_holder"
-        return "single_trade"
+        total = sum(value(token, amount) for token, amount in held.items())
+        total += sum(value(pos.token0, pos.amount0) + value(pos.token1, pos.amount1) for pos in liquidity_positions)
+        total += sum(pos.margin + pos.unrealized_pnl for pos in perp_positions if pos.is_open)
+        return total
 
     async def _query_thegraph(self, subgraph: str, query: str, variables: Dict | None = None) -> Dict:
         subgraph_urls = {
@@ -915,71 +881,36 @@ class AdvancedWalletTracker:
             raise ValueError(f"Unknown subgraph: {subgraph}")
         session = await self.get_session()
         payload = {'query': query, 'variables': variables or {}}
-        try:
+        # Failures propagate so ProviderRegistry reports them instead of an empty result.
+        async with self.rate_limiter.use('thegraph') as lease:
             async with session.post(subgraph_urls[subgraph], json=payload) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"GraphQL query failed with status {response.status}")
-                    return {}
-        except Exception as e:
-            logger.error(f"Error querying {subgraph}: {e}")
-            return {}
-
-    async def _get_coingecko_historical_price(self, token: str, timestamp: datetime) -> float:
-        date_str = timestamp.strftime('%d-%m-%Y')
-        token_mapping = {
-            'ETH': 'ethereum',
-            'BTC': 'bitcoin',
-            'USDT': 'tether',
-            'USDC': 'usd-coin',
-            'BNB': 'binancecoin',
-            'MATIC': 'matic-network',
-            'AVAX': 'avalanche-2',
-            'UNI': 'uniswap',
-            'LINK': 'chainlink',
-            'AAVE': 'aave'
-        }
-        coin_id = token_mapping.get(token.upper(), token.lower())
-        session = await self.get_session()
-        try:
-            url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/history"
-            params = {'date': date_str}
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get('market_data', {}).get('current_price', {}).get('usd', 0)
-        except Exception as e:
-            logger.error(f"Error fetching CoinGecko price for {token}: {e}")
-        return 0.0
-
-    async def _get_current_token_price(self, token: str) -> float:
-        session = await self.get_session()
-        try:
-            url = "https://api.coingecko.com/api/v3/simple/price"
-            params = {'ids': token.lower(), 'vs_currencies': 'usd'}
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return list(data.values())[0].get('usd', 0) if data else 0
-        except Exception as e:
-            logger.error(f"Error fetching current price for {token}: {e}")
-        return 0.0
+                lease.throttled = response.status == 429
+                response.raise_for_status()
+                data = await response.json()
+        if data.get('errors') and not data.get('data'):
+            raise RuntimeError(f"{subgraph} query failed: {data['errors'][0].get('message', data['errors'][0])}")
+        return data
 
     async def track_wallet_ultra_comprehensive(self, address: str) -> Dict:
         logger.info(f"Starting ultra comprehensive tracking for {address}")
+        self.discard_sync_cursors(address)
         tasks = [
             self.get_comprehensive_transactions(address),
             self.track_perpetual_positions(address),
-            self.track_liquidity_positions(address),
-            self.analyze_wallet_profile(address)
+            self.track_liquidity_positions(address)
         ]
         try:
-            transactions, perp_positions, liquidity_positions, profile = await asyncio.gather(*tasks)
-            self.store_advanced_transactions(transactions)
-            self.store_perp_positions(perp_positions)
-            self.store_liquidity_positions(liquidity_positions)
-            self.store_wallet_profile(profile)
+            new_transactions, perp_positions, liquidity_positions = await asyncio.gather(*tasks)
+            transactions = self.with_stored_history(address, new_transactions)
+            profile = await self.analyze_wallet_profile(address, transactions, perp_positions, liquidity_positions)
+            writes = [
+                self.store_advanced_transactions(new_transactions),
+                self.commit_sync_cursors(address),
+                self.store_perp_positions(perp_positions),
+                self.store_liquidity_positions(liquidity_positions),
+                self.store_wallet_profile(profile),
+            ]
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in writes if f is not None))
             summary = {
                 'address': address,
                 'profile': profile,
@@ -1004,8 +935,47 @@ class AdvancedWalletTracker:
             return summary
         except Exception as e:
             logger.error(f"Error in ultra comprehensive tracking: {e}")
+            self.discard_sync_cursors(address)
             return {'error': str(e)}
 
+    async def track_wallet_streaming(self, address: str, chains: Optional[List[str]] = None,
+                                     page_size: int = 1000) -> WalletProfile:
+        """Profile a wallet without materializing its history.
+
+        Stored history and newly fetched pages are folded into a
+        ``ProfileAccumulator`` as they arrive, and each new page is written
+        before the next is pulled, so memory stays bounded by the page size.
+        Fetched rows whose hash is already stored for the wallet are skipped.
+        """
+        self.discard_sync_cursors(address)
+        positions = asyncio.gather(self.track_perpetual_positions(address), self.track_liquidity_positions(address))
+        stats = ProfileAccumulator(address=address)
+        try:
+            async for batch in self.iter_stored_transactions(address):
+                stats.update(batch)
+            async for page in self.iter_transaction_pages(address, chains, page_size):
+                # Rows stored earlier (by this wallet or a counterparty) were already folded in above.
+                stored = await asyncio.to_thread(self._stored_hashes, address, [tx.hash for tx in page])
+                page = [tx for tx in page if tx.hash not in stored]
+                stats.update(page)
+                await asyncio.wrap_future(self.store_advanced_transactions(page))
+            perp_positions, liquidity_positions = await positions
+            total_value_usd = await self._calculate_total_value(stats.balances, perp_positions, liquidity_positions)
+            profile = WalletProfile(address=address, total_value_usd=total_value_usd, **stats.metrics(perp_positions))
+        except BaseException:
+            positions.cancel()
+            self.discard_sync_cursors(address)
+            raise
+        writes = [
+            self.commit_sync_cursors(address),
+            self.store_perp_positions(perp_positions),
+            self.store_liquidity_positions(liquidity_positions),
+            self.store_wallet_profile(profile),
+        ]
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in writes if f is not None))
+        logger.info(f"Streamed {stats.count} transactions for {address}")
+        return profile
+
     def _categorize_transactions_summary(self, transactions: List[AdvancedTransaction]) -> Dict:
         categories = defaultdict(int)
         for tx in transactions:
@@ -1045,63 +1015,56 @@ class AdvancedWalletTracker:
             insights.append(f"🪙 Prefers trading: {', '.join(profile.top_tokens[:3])}")
         return insights
 
-    def store_advanced_transactions(self, transactions: List[AdvancedTransaction]):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        for tx in transactions:
-            cursor.execute('''
-                INSERT OR REPLACE INTO advanced_transactions 
-                (hash, from_address, to_address, amount, token, timestamp, chain, tx_type, 
-                 gas_fee, block_number, exchange, price_usd, profit_loss, slippage, 
-                 mev_detected, arbitrage_detected, tags, raw_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                tx.hash, tx.from_address, tx.to_address, tx.amount, tx.token, tx.timestamp,
+    def store_advanced_transactions(self, transactions: List[AdvancedTransaction]) -> Future:
+        # Rows are built lazily on the writer thread, keeping json.dumps off the event loop.
+        return self.store.execute_many('''
+            INSERT OR REPLACE INTO advanced_transactions
+            (hash, from_address, to_address, amount, token, timestamp, chain, tx_type,
+             gas_fee, block_number, exchange, price_usd, profit_loss, slippage,
+             mev_detected, arbitrage_detected, tags, raw_data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (
+                tx.hash, tx.from_address.lower(), tx.to_address.lower(), tx.amount, tx.token, tx.timestamp,
                 tx.chain, tx.tx_type.value, tx.gas_fee, tx.block_number, tx.exchange,
                 tx.price_usd, tx.profit_loss, tx.slippage, tx.mev_detected, tx.arbitrage_detected,
-                ','.join(tx.tags), json.dumps(tx.raw_data)
-            ))
-        conn.commit()
-        conn.close()
+                ','.join(tx.tags), tx.raw_json()
+            )
+            for tx in transactions
+        ))
 
-    def store_perp_positions(self, positions: List[PerpPosition]):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        for pos in positions:
-            cursor.execute('''
-                INSERT OR REPLACE INTO perp_positions 
-                (address, exchange, symbol, side, size, entry_price, current_price, 
-                 unrealized_pnl, realized_pnl, margin, leverage, liquidation_price, 
-                 timestamp, is_open)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+    def store_perp_positions(self, positions: List[PerpPosition]) -> Future:
+        return self.store.execute_many('''
+            INSERT OR REPLACE INTO perp_positions
+            (address, exchange, symbol, side, size, entry_price, current_price,
+             unrealized_pnl, realized_pnl, margin, leverage, liquidation_price,
+             timestamp, is_open)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (
                 pos.address, pos.exchange, pos.symbol, pos.side, pos.size, pos.entry_price,
                 pos.current_price, pos.unrealized_pnl, pos.realized_pnl, pos.margin,
                 pos.leverage, pos.liquidation_price, pos.timestamp, pos.is_open
-            ))
-        conn.commit()
-        conn.close()
+            )
+            for pos in positions
+        ))
 
-    def store_liquidity_positions(self, positions: List[LiquidityPosition]):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        for pos in positions:
-            cursor.execute('''
-                INSERT OR REPLACE INTO liquidity_positions 
-                (address, protocol, pair, token0, token1, amount0, amount1, shares, apr, fees_earned, impermanent_loss, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+    def store_liquidity_positions(self, positions: List[LiquidityPosition]) -> Future:
+        return self.store.execute_many('''
+            INSERT OR REPLACE INTO liquidity_positions
+            (address, protocol, pair, token0, token1, amount0, amount1, shares, apr, fees_earned, impermanent_loss, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (
                 pos.address, pos.protocol, pos.pair, pos.token0, pos.token1, pos.amount0,
                 pos.amount1, pos.shares, pos.apr, pos.fees_earned, pos.impermanent_loss, pos.timestamp
-            ))
-        conn.commit()
-        conn.close()
+            )
+            for pos in positions
+        ))
 
-    def store_wallet_profile(self, profile: WalletProfile):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO wallet_profiles 
+    def store_wallet_profile(self, profile: WalletProfile) -> Future:
+        return self.store.execute('''
+            INSERT OR REPLACE INTO wallet_profiles
             (address, total_value_usd, total_pnl, win_rate, total_trades, avg_trade_size, risk_score, activity_score, top_tokens, preferred_dexes, trading_pattern, last_activity, tags)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
@@ -1110,5 +1073,3 @@ class AdvancedWalletTracker:
             ','.join(profile.top_tokens), ','.join(profile.preferred_dexes), profile.trading_pattern,
             profile.last_activity, ','.join(profile.tags)
         ))
-        conn.commit()
-        conn.close()
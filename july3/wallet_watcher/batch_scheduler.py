@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Dict, Iterable, Optional
+
+from wallet_watcher.advanced_tracker import AdvancedWalletTracker
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class BatchWalletScheduler:
+    """Track many wallets concurrently and stream summaries as they finish.
+
+    ``concurrency`` caps wallets in flight; the request rate is governed by the
+    tracker's shared ``ApiRateLimiter``, so adding workers never exceeds the
+    provider budgets.  Each wallet is fetched once via
+    ``track_wallet_ultra_comprehensive``.
+    """
+
+    def __init__(self, tracker: AdvancedWalletTracker, concurrency: int = 20, report_every: int = 100) -> None:
+        self.tracker = tracker
+        self.concurrency = concurrency
+        self.report_every = report_every
+        self.completed = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+
+    def throughput(self) -> float:
+        """Wallets finished per minute since the batch started."""
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.started_at
+        return (self.completed + self.failed) / elapsed * 60 if elapsed > 0 else 0.0
+
+    def _record(self, summary: Dict) -> None:
+        if 'error' in summary:
+            self.failed += 1
+        else:
+            self.completed += 1
+        done = self.completed + self.failed
+        if self.report_every and done % self.report_every == 0:
+            logger.info(
+                "Tracked %d wallets (%d failed) at %.1f wallets/min",
+                done, self.failed, self.throughput(),
+            )
+
+    async def _worker(self, addresses, results: asyncio.Queue) -> None:
+        for address in addresses:
+            try:
+                summary = await self.tracker.track_wallet_ultra_comprehensive(address)
+            except Exception as e:
+                logger.error("Tracking %s failed: %s", address, e)
+                summary = {'address': address, 'error': str(e)}
+            summary.setdefault('address', address)
+            await results.put(summary)
+
+    async def run(self, addresses: Iterable[str]) -> AsyncIterator[Dict]:
+        """Yield one summary per unique address, in completion order."""
+        self.completed = self.failed = 0
+        self.started_at = time.monotonic()
+        seen = set()
+        unique = (a for a in addresses if not (a.lower() in seen or seen.add(a.lower())))
+        # Workers share one iterator, so only ``concurrency`` wallets are ever pending.
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.ensure_future(self._worker(unique, results)) for _ in range(self.concurrency)]
+
+        async def close_when_done() -> None:
+            await asyncio.gather(*workers, return_exceptions=True)
+            await results.put(_DONE)
+
+        closer = asyncio.ensure_future(close_when_done())
+        try:
+            while True:
+                summary = await results.get()
+                if summary is _DONE:
+                    break
+                self._record(summary)
+                yield summary
+        finally:
+            for task in workers + [closer]:
+                task.cancel()
+            logger.info(
+                "Batch finished: %d tracked, %d failed, %.1f wallets/min",
+                self.completed, self.failed, self.throughput(),
+            )
+
+
+async def main(path: str, concurrency: int, db_path: str) -> None:
+    tracker = AdvancedWalletTracker(db_path)
+    scheduler = BatchWalletScheduler(tracker, concurrency=concurrency)
+    with open(path) as f:
+        addresses = [line.strip() for line in f if line.strip()]
+    try:
+        async for summary in scheduler.run(addresses):
+            if 'error' in summary:
+                logger.warning("%s: %s", summary['address'], summary['error'])
+    finally:
+        await tracker.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Track a file of wallet addresses concurrently.")
+    parser.add_argument('addresses', help="file with one address per line")
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--db', default=os.getenv('TRACKER_DB_PATH', 'advanced_wallet_tracker.db'))
+    args = parser.parse_args()
+    asyncio.run(main(args.addresses, args.concurrency, args.db))
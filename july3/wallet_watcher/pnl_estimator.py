@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from shared.http_client import HttpClient, get_http_client
+from shared.rate_limiter import ApiRateLimiter
+
+logger = logging.getLogger(__name__)
+
+ETHPLORER_URL = "https://api.ethplorer.io/getAddressInfo/{wallet}"
+
+# SQLite's default limit on host parameters is 999 on older builds.
+_CHUNK = 500
+
+
+def pnl_from_address_info(data: Dict) -> float:
+    """Net ETH flow in USD (falling back to ETH units) from an Ethplorer getAddressInfo payload."""
+    eth = data.get("ETH", {})
+    total_in = float(eth.get("totalInUSD") or eth.get("totalIn", 0))
+    total_out = float(eth.get("totalOutUSD") or eth.get("totalOut", 0))
+    return total_in - total_out
+
+
+class PnlEstimator:
+    """Concurrent Ethplorer PnL estimates behind a TTL cache persisted in ``pnl_cache``.
+
+    Concurrent requests for the same wallet share one HTTP call, at most
+    ``concurrency`` calls are in flight, and the request rate is held to
+    ``rate_limit`` per second through an ``ApiRateLimiter``.  Failed lookups
+    return 0.0 and are not cached, so they are retried on the next call.
+
+    Async callers share the process-wide HTTP pool.  ``estimate_sync`` runs
+    on the estimator's own long-lived background loop with its own session,
+    so it works from any thread and never touches the shared pool.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 6 * 3600, concurrency: int = 4,
+                 api_key: Optional[str] = None, rate_limit: float = 2.0) -> None:
+        self.db_path = db_path
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.api_key = api_key or os.getenv('ETHPLORER_API_KEY') or 'freekey'
+        self.rate_limiter = ApiRateLimiter({'ethplorer': {'primary': self.api_key, 'rate_limit': rate_limit}})
+        self._cache: Dict[str, Tuple[float, float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_client: Optional[HttpClient] = None
+        self._sync_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, wallet: str, now: float) -> Optional[float]:
+        entry = self._cache.get(wallet)
+        if entry is not None and now - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def _load(self, wallets: List[str]) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for i in range(0, len(wallets), _CHUNK):
+                chunk = wallets[i:i + _CHUNK]
+                marks = ','.join('?' * len(chunk))
+                for wallet, pnl, fetched_at in conn.execute(
+                    f'SELECT wallet_id, pnl, fetched_at FROM pnl_cache WHERE wallet_id IN ({marks})', chunk,
+                ):
+                    self._cache[wallet] = (pnl, fetched_at)
+        finally:
+            conn.close()
+
+    def _save(self, rows: List[Tuple[str, float, float]]) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO pnl_cache (wallet_id, pnl, fetched_at) VALUES (?, ?, ?)', rows,
+                )
+        except sqlite3.Error as e:
+            logger.error("Failed to persist PnL cache: %s", e)
+        finally:
+            conn.close()
+
+    def _gate(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; sync callers run on the background loop.
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+            self._inflight.clear()
+        return self._semaphore
+
+    def _client(self) -> HttpClient:
+        if self._sync_loop is not None and asyncio.get_running_loop() is self._sync_loop:
+            return self._sync_client
+        return get_http_client()
+
+    async def _fetch(self, wallet: str) -> Optional[float]:
+        async with self._gate():
+            async with self.rate_limiter.use('ethplorer') as lease:
+                try:
+                    text = await self._client().request(
+                        'GET', ETHPLORER_URL.format(wallet=wallet), timeout=10, params={'apiKey': lease.key},
+                    )
+                    return pnl_from_address_info(json.loads(text))
+                except aiohttp.ClientResponseError as e:
+                    lease.throttled = e.status == 429
+                    logger.error("estimate_wallet_pnl error for %s: %s", wallet, e)
+                except Exception as e:
+                    logger.error("estimate_wallet_pnl error for %s: %s", wallet, e)
+        return None
+
+    async def estimate_many(self, wallets: Iterable[str]) -> Dict[str, float]:
+        """PnL for each wallet; cache misses are fetched concurrently."""
+        wallets = list(dict.fromkeys(wallets))
+        self._gate()
+        now = time.time()
+        missing = [w for w in wallets if self._fresh(w, now) is None and w not in self._inflight]
+        if missing:
+            await asyncio.to_thread(self._load, missing)
+        results: Dict[str, float] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        started: List[str] = []
+        for wallet in wallets:
+            cached = self._fresh(wallet, now)
+            if cached is not None:
+                self.hits += 1
+                results[wallet] = cached
+                continue
+            if wallet not in self._inflight:
+                self.misses += 1
+                self._inflight[wallet] = asyncio.ensure_future(self._fetch(wallet))
+                started.append(wallet)
+            waiting[wallet] = self._inflight[wallet]
+        try:
+            fetched = await asyncio.gather(*waiting.values())
+        finally:
+            for wallet in started:
+                self._inflight.pop(wallet, None)
+        rows = []
+        fetched_at = time.time()
+        for wallet, pnl in zip(waiting, fetched):
+            results[wallet] = pnl if pnl is not None else 0.0
+            if pnl is not None and wallet in started:
+                self._cache[wallet] = (pnl, fetched_at)
+                rows.append((wallet, pnl, fetched_at))
+        if rows:
+            await asyncio.to_thread(self._save, rows)
+        return results
+
+    async def estimate(self, wallet: str) -> float:
+        return (await self.estimate_many([wallet]))[wallet]
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._sync_lock:
+            if self._sync_loop is None:
+                self._sync_client = HttpClient()
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='pnl-estimator', daemon=True).start()
+                self._sync_loop = loop
+            return self._sync_loop
+
+    def estimate_sync(self, wallets: Iterable[str]) -> Dict[str, float]:
+        """Blocking wrapper for synchronous callers such as the Telegram handlers."""
+        wallets = list(wallets)
+        return asyncio.run_coroutine_threadsafe(self.estimate_many(wallets), self._background_loop()).result()
+
+    def close_sync(self) -> None:
+        """Close the background loop's session and stop the loop."""
+        with self._sync_lock:
+            loop, self._sync_loop = self._sync_loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._sync_client.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import sqlite3
+import time as clock
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from shared.rate_limiter import ApiRateLimiter
+
+logger = logging.getLogger(__name__)
+
+PriceKey = Tuple[str, date]
+
+COINGECKO_IDS = {
+    'ETH': 'ethereum',
+    'WETH': 'weth',
+    'BTC': 'bitcoin',
+    'WBTC': 'wrapped-bitcoin',
+    'USDT': 'tether',
+    'USDC': 'usd-coin',
+    'DAI': 'dai',
+    'BNB': 'binancecoin',
+    'MATIC': 'matic-network',
+    'AVAX': 'avalanche-2',
+    'UNI': 'uniswap',
+    'LINK': 'chainlink',
+    'AAVE': 'aave'
+}
+
+
+class PriceOracle:
+    """Daily USD prices with an LRU in front of the SQLite ``price_cache`` table.
+
+    Misses for a batch are grouped per token and fetched with one
+    ``market_chart/range`` call per token (chunked at ``max_range_days``).
+    Concurrent batches asking for the same token share the in-flight fetch.
+    Prices that could not be resolved come back as 0.0 and are not cached.
+    Symbols missing from ``COINGECKO_IDS`` are never requested, and a token
+    whose range came back empty skips the range call for ``no_history_ttl``
+    seconds (in memory only).
+    """
+
+    base_url = "https://api.coingecko.com/api/v3"
+    max_range_days = 365
+    no_history_ttl = 900
+
+    def __init__(
+        self,
+        db_path: str,
+        get_session: Callable[[], Awaitable],
+        rate_limiter: Optional[ApiRateLimiter] = None,
+        lru_size: int = 50000,
+    ) -> None:
+        self.db_path = db_path
+        self.get_session = get_session
+        self.rate_limiter = rate_limiter
+        self.lru_size = lru_size
+        self._lru: 'OrderedDict[PriceKey, float]' = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # token -> monotonic time until which its range is known to be empty
+        self._no_history: Dict[str, float] = {}
+        self.stats = {'hits': 0, 'db_hits': 0, 'requests': 0}
+
+    def _remember(self, key: PriceKey, price: float) -> None:
+        self._lru[key] = price
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _from_lru(self, keys: Iterable[PriceKey], prices: Dict[PriceKey, float]) -> Set[PriceKey]:
+        missing = set()
+        for key in keys:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                prices[key] = self._lru[key]
+                self.stats['hits'] += 1
+            else:
+                missing.add(key)
+        return missing
+
+    def _read(self, missing: Set[PriceKey]) -> List[Tuple[str, str, float]]:
+        by_token = defaultdict(list)
+        for token, day in missing:
+            by_token[token].append(day)
+        rows = []
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for token, days in by_token.items():
+                rows.extend(
+                    (token, stamp, price) for stamp, price in conn.execute(
+                        'SELECT timestamp, price_usd FROM price_cache WHERE token=? AND timestamp BETWEEN ? AND ?',
+                        (token, min(days).isoformat(), max(days).isoformat())
+                    )
+                )
+        finally:
+            conn.close()
+        return rows
+
+    async def _load(self, missing: Set[PriceKey], prices: Dict[PriceKey, float]) -> Set[PriceKey]:
+        # SQLite runs in a worker thread; the LRU is only touched on the event loop.
+        for token, stamp, price in await asyncio.to_thread(self._read, missing):
+            key = (token, date.fromisoformat(stamp[:10]))
+            self._remember(key, price)
+            if key in missing:
+                prices[key] = price
+                self.stats['db_hits'] += 1
+        return {key for key in missing if key not in prices}
+
+    def _persist(self, token: str, series: Dict[date, float]) -> None:
+        if not series:
+            return
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO price_cache (token, price_usd, timestamp) VALUES (?, ?, ?)',
+                    [(token, price, day.isoformat()) for day, price in series.items()]
+                )
+        finally:
+            conn.close()
+
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        session = await self.get_session()
+        self.stats['requests'] += 1
+        if self.rate_limiter is None:
+            async with session.get(url, params=params) as response:
+                return await response.json() if response.status == 200 else {}
+        async with self.rate_limiter.use('coingecko') as lease:
+            async with session.get(url, params=params) as response:
+                lease.throttled = response.status == 429
+                return await response.json() if response.status == 200 else {}
+
+    async def _fetch_range(self, token: str, start: date, end: date) -> Dict[date, float]:
+        coin_id = COINGECKO_IDS[token.upper()]
+        series: Dict[date, float] = {}
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + timedelta(days=self.max_range_days - 1))
+            params = {
+                'vs_currency': 'usd',
+                'from': int(datetime.combine(chunk_start, time.min, timezone.utc).timestamp()),
+                'to': int(datetime.combine(chunk_end + timedelta(days=1), time.min, timezone.utc).timestamp()),
+            }
+            try:
+                data = await self._get_json(f"{self.base_url}/coins/{coin_id}/market_chart/range", params)
+            except Exception as e:
+                logger.warning("CoinGecko range fetch failed for %s: %s", token, e)
+                data = {}
+            # Keep the first sample of each UTC day, matching /history's 00:00 price.
+            for stamp_ms, price in data.get('prices', []):
+                day = datetime.fromtimestamp(stamp_ms / 1000, timezone.utc).date()
+                series.setdefault(day, float(price))
+            chunk_start = chunk_end + timedelta(days=1)
+        if not series:
+            self._no_history[token] = clock.monotonic() + self.no_history_ttl
+        await asyncio.to_thread(self._persist, token, series)
+        for day, price in series.items():
+            self._remember((token, day), price)
+        return series
+
+    async def _fetch_current(self, tokens: Iterable[str]) -> Dict[str, float]:
+        ids = {COINGECKO_IDS[token.upper()]: token for token in tokens}
+        if not ids:
+            return {}
+        try:
+            data = await self._get_json(
+                f"{self.base_url}/simple/price", {'ids': ','.join(ids), 'vs_currencies': 'usd'}
+            )
+        except Exception as e:
+            logger.warning("CoinGecko current price fetch failed: %s", e)
+            return {}
+        return {ids[coin_id]: float(quote.get('usd', 0)) for coin_id, quote in data.items() if coin_id in ids}
+
+    async def _token_range(self, token: str, days: List[date]) -> None:
+        existing = self._inflight.get(token)
+        if existing is not None:
+            await existing
+            if all((token, day) in self._lru for day in days):
+                return
+        task = asyncio.ensure_future(self._fetch_range(token, min(days), max(days)))
+        self._inflight[token] = task
+        try:
+            await task
+        finally:
+            if self._inflight.get(token) is task:
+                del self._inflight[token]
+
+    def _has_history(self, token: str) -> bool:
+        until = self._no_history.get(token)
+        if until is None:
+            return True
+        if until <= clock.monotonic():
+            del self._no_history[token]
+            return True
+        return False
+
+    async def get_prices(self, keys: Iterable[PriceKey]) -> Dict[PriceKey, float]:
+        """Resolve all (token, day) pairs, hitting the network once per missing token."""
+        prices: Dict[PriceKey, float] = {}
+        missing = self._from_lru(set(keys), prices)
+        if missing:
+            missing = await self._load(missing, prices)
+        unknown = {key for key in missing if key[0].upper() not in COINGECKO_IDS}
+        prices.update(dict.fromkeys(unknown, 0.0))
+        missing -= unknown
+        if missing:
+            by_token = defaultdict(list)
+            for token, day in missing:
+                if self._has_history(token):
+                    by_token[token].append(day)
+            await asyncio.gather(*(self._token_range(token, days) for token, days in by_token.items()))
+            missing = self._from_lru(missing, prices)
+        if missing:
+            # No history for these tokens; fall back to one bulk spot-price call.  Only
+            # today's spot price is cached, and failures (0.0) are retried next time.
+            current = await self._fetch_current({token for token, _ in missing})
+            today = datetime.now(timezone.utc).date()
+            for key in missing:
+                prices[key] = current.get(key[0], 0.0)
+                if key[1] == today and prices[key] > 0:
+                    self._remember(key, prices[key])
+        return prices
+
+    async def get_price(self, token: str, day: date) -> float:
+        return (await self.get_prices([(token, day)]))[(token, day)]
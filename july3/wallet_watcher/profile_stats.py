@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from shared.lazy import lazy_import
+from shared.migrations import apply_migrations
+from wallet_watcher.records import TransactionBatch
+from wallet_watcher.tracker_store import TRACKER_MIGRATIONS
+
+logger = logging.getLogger(__name__)
+
+pd = lazy_import('pandas')
+
+
+def _scores(n, volume, realized, wins, decided, mev, recent, exchanges, span_seconds,
+            leverage, unrealized_pnl) -> Dict[str, np.ndarray]:
+    """Numeric profile metrics from per-wallet aggregates, one array element per wallet.
+
+    The one definition of the scoring formulas: ``ProfileAccumulator`` calls
+    it with a single wallet's running totals, ``profile_metrics`` with grouped
+    columns.  ``leverage`` is the average perp leverage (1 without positions)
+    and ``span_seconds`` the time between the first and last trade.
+    """
+    n, volume, realized, wins, decided, mev, recent, exchanges, span, leverage, unrealized_pnl = (
+        np.atleast_1d(np.asarray(v, dtype=float))
+        for v in (n, volume, realized, wins, decided, mev, recent, exchanges, span_seconds, leverage, unrealized_pnl)
+    )
+    has_trades = n > 0
+    per_trade = np.divide(1.0, n, out=np.zeros_like(n), where=has_trades)
+    avg_size = volume * per_trade
+    risk = (
+        np.minimum(leverage / 10, 1) * 30
+        + mev * per_trade * 25
+        + np.where(avg_size > 100000, 25, 0)
+        + np.where(n / 30 > 10, 20, 0)
+    )
+    activity = np.where(
+        has_trades,
+        recent / 7 * 10 + np.minimum(exchanges * 5, 30) + np.minimum(volume / 10000, 40),
+        0,
+    )
+    avg_gap = np.divide(span, n - 1, out=np.zeros_like(n), where=n > 1)
+    pattern = np.select(
+        [n == 0, n == 1, avg_gap < 3600, avg_gap < 86400, avg_gap < 604800],
+        ['inactive', 'single_trade', 'high_frequency', 'day_trader', 'active_trader'],
+        default='long_term_holder',
+    )
+    return {
+        'total_pnl': realized + unrealized_pnl,
+        'win_rate': np.divide(wins, decided, out=np.zeros_like(decided), where=decided > 0) * 100,
+        'total_trades': n.astype(int),
+        'avg_trade_size': avg_size,
+        'risk_score': np.minimum(risk, 100),
+        'activity_score': np.minimum(activity, 100),
+        'trading_pattern': pattern,
+    }
+
+
+class ProfileAccumulator:
+    """Running wallet-profile aggregates, fed one page of transactions at a time.
+
+    Produces the same metrics as ``profile_metrics`` without holding the
+    transaction history in memory.  The average gap between trades is
+    ``(last - first) / (n - 1)``, which equals the mean of consecutive
+    differences of the sorted history, so pages may arrive in any order.
+    Given ``address``, it also keeps the wallet's net token balances.
+    """
+
+    def __init__(self, now: Optional[datetime] = None, address: Optional[str] = None) -> None:
+        self.now = now or datetime.now()
+        self.address = address.lower() if address else None
+        self.balances: Dict[str, float] = defaultdict(float)
+        self.recent_cutoff = self.now - timedelta(days=7)
+        self.count = 0
+        self.volume = 0.0
+        self.realized_pnl = 0.0
+        self.wins = 0
+        self.decided = 0
+        self.mev = 0
+        self.recent = 0
+        self.first: Optional[datetime] = None
+        self.last: Optional[datetime] = None
+        self.exchanges: set = set()
+        self.token_counts: Counter = Counter()
+        self.dex_counts: Counter = Counter()
+        self.type_counts: Counter = Counter()
+
+    def update(self, transactions: Iterable) -> None:
+        for tx in transactions:
+            self.count += 1
+            self.volume += tx.amount * tx.price_usd
+            self.realized_pnl += tx.profit_loss
+            if tx.profit_loss != 0:
+                self.decided += 1
+                if tx.profit_loss > 0:
+                    self.wins += 1
+            if tx.mev_detected:
+                self.mev += 1
+            if tx.timestamp > self.recent_cutoff:
+                self.recent += 1
+            if self.first is None or tx.timestamp < self.first:
+                self.first = tx.timestamp
+            if self.last is None or tx.timestamp > self.last:
+                self.last = tx.timestamp
+            self.exchanges.add(tx.exchange)
+            self.token_counts[tx.token] += 1
+            if tx.exchange and tx.exchange != 'unknown':
+                self.dex_counts[tx.exchange] += 1
+            self.type_counts[tx.tx_type.value] += 1
+            if self.address is not None:
+                _apply_balance(self.balances, self.address, tx)
+
+    def metrics(self, perp_positions: List) -> Dict:
+        """Profile fields other than ``address`` and ``total_value_usd``."""
+        scores = _scores(
+            self.count, self.volume, self.realized_pnl, self.wins, self.decided, self.mev, self.recent,
+            len(self.exchanges), (self.last - self.first).total_seconds() if self.count else 0.0,
+            sum(pos.leverage for pos in perp_positions) / len(perp_positions) if perp_positions else 1.0,
+            sum(pos.unrealized_pnl for pos in perp_positions),
+        )
+        metrics = {name: values[0].item() for name, values in scores.items()}
+        metrics['top_tokens'] = [token for token, _ in self.token_counts.most_common(10)]
+        metrics['preferred_dexes'] = [dex for dex, _ in self.dex_counts.most_common(5)]
+        metrics['last_activity'] = self.last or self.now
+        return metrics
+
+
+def _apply_balance(balances: Dict[str, float], address: str, tx) -> None:
+    if tx.to_address.lower() == address:
+        balances[tx.token] += tx.amount
+    if tx.from_address.lower() == address:
+        balances[tx.token] -= tx.amount
+
+
+def net_balances(address: str, transactions: Iterable) -> Dict[str, float]:
+    """Amount of each token received minus sent by ``address``; gas is not deducted."""
+    balances: Dict[str, float] = defaultdict(float)
+    address = address.lower()
+    for tx in transactions:
+        _apply_balance(balances, address, tx)
+    return dict(balances)
+
+
+PROFILE_COLUMNS = ('wallet', 'amount', 'price_usd', 'profit_loss', 'mev_detected', 'timestamp', 'exchange', 'token')
+
+_SUMS = ('n', 'volume', 'realized', 'wins', 'decided', 'mev', 'recent')
+
+# Per-wallet sums and first/last trade, plus (wallet, token) and (wallet, exchange) counts.
+Aggregates = Tuple['pd.DataFrame', 'pd.Series', 'pd.Series']
+
+
+def _aggregate(frame: pd.DataFrame, now: datetime) -> Aggregates:
+    """Partial profile aggregates of one page of ``PROFILE_COLUMNS`` rows."""
+    volume = frame['amount'].to_numpy(dtype=float) * frame['price_usd'].to_numpy(dtype=float)
+    pnl = frame['profit_loss'].to_numpy(dtype=float)
+    timestamps = pd.to_datetime(frame['timestamp'])
+    work = pd.DataFrame({
+        'wallet': frame['wallet'].to_numpy(),
+        'volume': volume,
+        'pnl': pnl,
+        'win': pnl > 0,
+        'decided': pnl != 0,
+        'mev': frame['mev_detected'].to_numpy(dtype=bool),
+        'recent': (timestamps > now - timedelta(days=7)).to_numpy(),
+        'ts': timestamps.to_numpy(),
+        'exchange': frame['exchange'].to_numpy(),
+        'token': frame['token'].to_numpy(),
+    })
+    stats = work.groupby('wallet', sort=False).agg(
+        n=('volume', 'size'), volume=('volume', 'sum'), realized=('pnl', 'sum'), wins=('win', 'sum'),
+        decided=('decided', 'sum'), mev=('mev', 'sum'), recent=('recent', 'sum'),
+        first=('ts', 'min'), last=('ts', 'max'),
+    )
+    tokens = work.groupby(['wallet', 'token'], sort=False).size()
+    exchanges = work.groupby(['wallet', 'exchange'], sort=False).size()
+    return stats, tokens, exchanges
+
+
+def _combine(a: Aggregates, b: Aggregates) -> Aggregates:
+    """Aggregates of two pages taken together; first-seen order is kept for top-k ties."""
+    stats = pd.concat([a[0], b[0]]).groupby(level=0, sort=False).agg(
+        {**{column: 'sum' for column in _SUMS}, 'first': 'min', 'last': 'max'}
+    )
+    tokens = pd.concat([a[1], b[1]]).groupby(level=[0, 1], sort=False).sum()
+    exchanges = pd.concat([a[2], b[2]]).groupby(level=[0, 1], sort=False).sum()
+    return stats, tokens, exchanges
+
+
+def _top_k(counts: pd.Series, k: int) -> pd.Series:
+    # Stable sort keeps first-seen order among ties, as Counter.most_common does.
+    top = counts.sort_values(ascending=False, kind='stable').groupby(level=0, sort=False).head(k)
+    keys = pd.Series(top.index.get_level_values(1), index=top.index.get_level_values(0))
+    return keys.groupby(level=0, sort=False).agg(list)
+
+
+def _profiles(aggregates: Aggregates, wallets: Optional[Iterable[str]], leverage: Optional[pd.Series],
+              unrealized_pnl: Optional[pd.Series], now: datetime) -> pd.DataFrame:
+    stats, tokens, exchanges = aggregates
+    if wallets is not None:
+        stats = stats.reindex(pd.Index(list(wallets), name='wallet'))
+    for column in _SUMS:
+        stats[column] = stats[column].fillna(0)
+    distinct = exchanges.groupby(level=0, sort=False).size().reindex(stats.index).fillna(0)
+    scores = _scores(
+        stats['n'], stats['volume'], stats['realized'], stats['wins'], stats['decided'], stats['mev'],
+        stats['recent'], distinct, (stats['last'] - stats['first']).dt.total_seconds().fillna(0),
+        leverage.reindex(stats.index).fillna(1.0) if leverage is not None else np.ones(len(stats)),
+        unrealized_pnl.reindex(stats.index).fillna(0.0) if unrealized_pnl is not None else np.zeros(len(stats)),
+    )
+    venues = exchanges.index.get_level_values(1)
+    top_tokens = _top_k(tokens, 10).reindex(stats.index)
+    preferred = _top_k(exchanges[(venues != '') & (venues != 'unknown')], 5).reindex(stats.index)
+    return pd.DataFrame({
+        **{name: scores[name] for name in ('total_pnl', 'win_rate', 'total_trades', 'avg_trade_size',
+                                            'risk_score', 'activity_score')},
+        'top_tokens': [v if isinstance(v, list) else [] for v in top_tokens],
+        'preferred_dexes': [v if isinstance(v, list) else [] for v in preferred],
+        'trading_pattern': scores['trading_pattern'],
+        # Kept as datetime objects so rows bind directly as SQLite parameters.
+        'last_activity': pd.Series(
+            [ts.to_pydatetime() if not pd.isna(ts) else now for ts in stats['last']], index=stats.index, dtype=object,
+        ),
+    }, index=stats.index)
+
+
+def profile_metrics(frame: pd.DataFrame, wallets: Optional[Iterable[str]] = None,
+                    leverage: Optional[pd.Series] = None, unrealized_pnl: Optional[pd.Series] = None,
+                    now: Optional[datetime] = None) -> pd.DataFrame:
+    """Compute every profile metric for every wallet in one grouped pass.
+
+    ``frame`` has one row per (wallet, transaction) with ``PROFILE_COLUMNS``;
+    ``leverage`` and ``unrealized_pnl`` are per-wallet perp aggregates
+    (average leverage, summed unrealized PnL).  Returns one row per wallet,
+    indexed by wallet, with the ``WalletProfile`` field names.  Wallets
+    listed in ``wallets`` but absent from ``frame`` get the empty-history
+    defaults.
+    """
+    now = now or datetime.now()
+    return _profiles(_aggregate(frame, now), wallets, leverage, unrealized_pnl, now)
+
+
+def transactions_frame(wallet: str, transactions: Iterable) -> pd.DataFrame:
+    """Profile-engine input for a single wallet's transactions."""
+    batch = transactions if isinstance(transactions, TransactionBatch) else \
+        TransactionBatch.from_transactions(transactions, keep_raw=False)
+    frame = batch.to_frame(list(PROFILE_COLUMNS[1:]))
+    frame.insert(0, 'wallet', wallet)
+    return frame
+
+
+def rescore_profiles(db_path: str, addresses: Optional[List[str]] = None, page_size: int = 50000) -> int:
+    """Recompute stored wallet profiles from stored transactions and positions.
+
+    Transactions are read and aggregated ``page_size`` rows at a time, so
+    memory follows the number of wallets rather than the table size.
+    Balances are not refetched, so ``total_value_usd`` and tags are kept.
+    Perp risk uses the most recent stored snapshot of each open position.
+    Returns the number of profiles updated.
+    """
+    now = datetime.now()
+    conn = sqlite3.connect(db_path)
+    try:
+        apply_migrations(conn, 'tracker', TRACKER_MIGRATIONS)
+        profiles = pd.read_sql('SELECT address FROM wallet_profiles', conn)['address']
+        if addresses is not None:
+            wanted = {a.lower() for a in addresses}
+            profiles = profiles[profiles.str.lower().isin(wanted)]
+        if profiles.empty:
+            return 0
+        by_wallet = dict(zip(profiles.str.lower(), profiles))
+        aggregates = None
+        for txs in pd.read_sql(
+            'SELECT from_address, to_address, amount, price_usd, profit_loss, mev_detected, timestamp, exchange, token '
+            'FROM advanced_transactions', conn, chunksize=page_size,
+        ):
+            txs['timestamp'] = pd.to_datetime(txs['timestamp'], format='ISO8601')
+            tracked = txs['from_address'].isin(by_wallet.keys())
+            received = txs['to_address'].isin(by_wallet.keys()) & (txs['to_address'] != txs['from_address'])
+            frame = pd.concat([
+                txs[tracked].rename(columns={'from_address': 'wallet'}),
+                txs[received].rename(columns={'to_address': 'wallet'}),
+            ], ignore_index=True)
+            if frame.empty:
+                continue
+            page = _aggregate(frame, now)
+            aggregates = page if aggregates is None else _combine(aggregates, page)
+        if aggregates is None:
+            aggregates = _aggregate(pd.DataFrame({column: [] for column in PROFILE_COLUMNS}), now)
+        positions = pd.read_sql(
+            'SELECT address, exchange, symbol, side, leverage, unrealized_pnl FROM perp_positions '
+            'WHERE is_open=1 ORDER BY id', conn,
+        )
+        positions['address'] = positions['address'].str.lower()
+        positions = positions.drop_duplicates(['address', 'exchange', 'symbol', 'side'], keep='last')
+        perps = positions.groupby('address')
+        metrics = _profiles(
+            aggregates, list(by_wallet), perps['leverage'].mean(), perps['unrealized_pnl'].sum(), now,
+        )
+        rows = [
+            (m.total_pnl, m.win_rate, m.total_trades, m.avg_trade_size, m.risk_score, m.activity_score,
+             ','.join(m.top_tokens), ','.join(m.preferred_dexes), m.trading_pattern, m.last_activity,
+             by_wallet[wallet])
+            for wallet, m in zip(metrics.index, metrics.itertuples(index=False))
+        ]
+        with conn:
+            conn.executemany('''
+                UPDATE wallet_profiles SET total_pnl=?, win_rate=?, total_trades=?, avg_trade_size=?,
+                    risk_score=?, activity_score=?, top_tokens=?, preferred_dexes=?, trading_pattern=?,
+                    last_activity=?
+                WHERE address=?
+            ''', rows)
+        return len(rows)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Re-score stored wallet profiles from stored history.")
+    parser.add_argument('--db', default=os.getenv('TRACKER_DB_PATH', 'advanced_wallet_tracker.db'))
+    args = parser.parse_args()
+    started = time.perf_counter()
+    updated = rescore_profiles(args.db)
+    elapsed = time.perf_counter() - started
+    logger.info("Re-scored %d profiles in %.2fs (%.0f wallets/s)", updated, elapsed, updated / elapsed if elapsed else 0)
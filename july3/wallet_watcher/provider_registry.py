@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Fetch = Callable[[str], Awaitable[Optional[List[Any]]]]
+
+
+@dataclass
+class ProviderAdapter:
+    name: str
+    fetch: Fetch
+    timeout: float = 10.0
+    hedge_after: Optional[float] = None
+
+
+@dataclass
+class FanoutResult:
+    items: List[Any] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    latencies: Dict[str, float] = field(default_factory=dict)
+
+
+class ProviderRegistry:
+    """Runs every registered position provider concurrently for an address.
+
+    Each adapter gets its own timeout; if ``hedge_after`` is set and the first
+    attempt is still pending after that many seconds, a second attempt is
+    started and whichever finishes first wins.  A provider that fails or times
+    out contributes nothing and is reported in ``FanoutResult.errors``, so one
+    slow protocol never blocks or fails the others.
+    """
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self.adapters: Dict[str, ProviderAdapter] = {}
+
+    def register(self, name: str, fetch: Fetch, timeout: float = 10.0, hedge_after: Optional[float] = None) -> None:
+        self.adapters[name] = ProviderAdapter(name, fetch, timeout, hedge_after)
+
+    def unregister(self, name: str) -> None:
+        self.adapters.pop(name, None)
+
+    async def _hedged(self, adapter: ProviderAdapter, address: str) -> List[Any]:
+        pending = {asyncio.ensure_future(adapter.fetch(address))}
+        first = next(iter(pending))
+        try:
+            if adapter.hedge_after is None:
+                return await first or []
+            done, pending = await asyncio.wait(pending, timeout=adapter.hedge_after)
+            if done:
+                return first.result() or []
+            pending.add(asyncio.ensure_future(adapter.fetch(address)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result() or []
+            # Both attempts failed; surface the original error.
+            return first.result() or []
+        finally:
+            # Also reached when the caller's timeout cancels us mid-wait.
+            for task in pending:
+                task.cancel()
+
+    async def _run(self, adapter: ProviderAdapter, address: str, result: FanoutResult) -> None:
+        started = time.perf_counter()
+        try:
+            items = await asyncio.wait_for(self._hedged(adapter, address), timeout=adapter.timeout)
+            result.items.extend(items)
+        except asyncio.TimeoutError:
+            result.errors[adapter.name] = f"timed out after {adapter.timeout}s"
+        except Exception as e:
+            result.errors[adapter.name] = str(e) or type(e).__name__
+        finally:
+            result.latencies[adapter.name] = time.perf_counter() - started
+
+    async def fetch_all(self, address: str) -> FanoutResult:
+        result = FanoutResult()
+        await asyncio.gather(*(self._run(adapter, address, result) for adapter in self.adapters.values()))
+        if result.errors:
+            logger.warning("Partial %s results for %s: %s", self.kind, address, result.errors)
+        return result
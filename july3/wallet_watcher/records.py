@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from shared.lazy import lazy_import
+
+# pandas is only needed once a batch is built; keep it off the import path.
+pd = lazy_import('pandas')
+
+
+def _intern(value):
+    # Provider payloads occasionally carry None or numbers where strings are expected.
+    return sys.intern(value) if type(value) is str else value
+
+
+class TransactionType(Enum):
+    SPOT_BUY = "spot_buy"
+    SPOT_SELL = "spot_sell"
+    PERP_OPEN = "perp_open"
+    PERP_CLOSE = "perp_close"
+    LIQUIDITY_ADD = "liquidity_add"
+    LIQUIDITY_REMOVE = "liquidity_remove"
+    BRIDGE = "bridge"
+    STAKE = "stake"
+    UNSTAKE = "unstake"
+    LENDING = "lending"
+    BORROWING = "borrowing"
+    NFT_BUY = "nft_buy"
+    NFT_SELL = "nft_sell"
+    AIRDROP = "airdrop"
+    ARBITRAGE = "arbitrage"
+    MEV = "mev"
+    UNKNOWN = "unknown"
+
+
+@dataclass(slots=True)
+class AdvancedTransaction:
+    hash: str
+    from_address: str
+    to_address: str
+    amount: float
+    token: str
+    timestamp: datetime
+    chain: str
+    tx_type: TransactionType
+    gas_fee: float = 0.0
+    block_number: int = 0
+    exchange: str = ""
+    price_usd: float = 0.0
+    profit_loss: float = 0.0
+    slippage: float = 0.0
+    mev_detected: bool = False
+    arbitrage_detected: bool = False
+    tags: Tuple[str, ...] = ()
+    # Explorer payload: the source dict by reference, or the stored JSON text
+    # until raw_data is first read.
+    raw: Union[Dict, str, None] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Addresses, tokens, chains and venues repeat across rows; share one copy.
+        self.from_address = _intern(self.from_address)
+        self.to_address = _intern(self.to_address)
+        self.token = _intern(self.token)
+        self.chain = _intern(self.chain)
+        self.exchange = _intern(self.exchange)
+
+    @property
+    def raw_data(self) -> Dict:
+        if isinstance(self.raw, str):
+            self.raw = json.loads(self.raw) if self.raw else {}
+        return self.raw if self.raw is not None else {}
+
+    def raw_json(self) -> str:
+        """Payload as JSON, without a decode/encode round trip for stored rows."""
+        if isinstance(self.raw, str):
+            return self.raw or '{}'
+        return json.dumps(self.raw or {})
+
+
+@dataclass(slots=True)
+class PerpPosition:
+    address: str
+    exchange: str
+    symbol: str
+    side: str
+    size: float
+    entry_price: float
+    current_price: float
+    unrealized_pnl: float
+    realized_pnl: float
+    margin: float
+    leverage: float
+    liquidation_price: float
+    timestamp: datetime
+    is_open: bool = True
+
+    def __post_init__(self) -> None:
+        self.exchange = _intern(self.exchange)
+        self.symbol = _intern(self.symbol)
+        self.side = _intern(self.side)
+
+
+@dataclass(slots=True)
+class LiquidityPosition:
+    address: str
+    protocol: str
+    pair: str
+    token0: str
+    token1: str
+    amount0: float
+    amount1: float
+    shares: float
+    apr: float
+    fees_earned: float
+    impermanent_loss: float
+    timestamp: datetime
+
+    def __post_init__(self) -> None:
+        self.protocol = _intern(self.protocol)
+        self.pair = _intern(self.pair)
+        self.token0 = _intern(self.token0)
+        self.token1 = _intern(self.token1)
+
+
+@dataclass(slots=True)
+class WalletProfile:
+    address: str
+    total_value_usd: float
+    total_pnl: float
+    win_rate: float
+    total_trades: int
+    avg_trade_size: float
+    risk_score: float
+    activity_score: float
+    top_tokens: List[str]
+    preferred_dexes: List[str]
+    trading_pattern: str
+    last_activity: datetime
+    tags: List[str] = field(default_factory=list)
+
+
+_FLOAT_COLUMNS = ('amount', 'price_usd', 'gas_fee', 'profit_loss', 'slippage')
+_CATEGORY_COLUMNS = ('from_address', 'to_address', 'token', 'chain', 'exchange', 'tx_type')
+
+
+class TransactionBatch:
+    """Columnar (struct-of-arrays) container for many transactions.
+
+    Numeric fields are NumPy arrays, repeated strings are pandas
+    Categoricals (small integer codes plus one copy of each value) and
+    payloads are kept only by reference, so a batch costs a few dozen bytes
+    per row.  Iterating yields ``AdvancedTransaction`` rows, so list-based
+    consumers such as ``_generate_insights`` accept a batch unchanged.
+    """
+
+    __slots__ = ('hash', 'timestamp', 'block_number', 'mev_detected', 'arbitrage_detected', 'tags', 'raw') \
+        + _FLOAT_COLUMNS + _CATEGORY_COLUMNS
+
+    def __init__(self, columns: Dict[str, Union[np.ndarray, pd.Categorical, List]]) -> None:
+        for name in self.__slots__:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[AdvancedTransaction], keep_raw: bool = True) -> 'TransactionBatch':
+        txs = transactions if isinstance(transactions, list) else list(transactions)
+        columns: Dict = {
+            'hash': np.array([tx.hash for tx in txs], dtype=object),
+            'timestamp': np.array([tx.timestamp for tx in txs], dtype='datetime64[us]'),
+            'block_number': np.fromiter((tx.block_number for tx in txs), dtype=np.int64, count=len(txs)),
+            'mev_detected': np.fromiter((tx.mev_detected for tx in txs), dtype=bool, count=len(txs)),
+            'arbitrage_detected': np.fromiter((tx.arbitrage_detected for tx in txs), dtype=bool, count=len(txs)),
+            # Tags are almost always empty; keep only the rows that have them.
+            'tags': {i: tx.tags for i, tx in enumerate(txs) if tx.tags},
+            'raw': [tx.raw for tx in txs] if keep_raw else None,
+        }
+        for name in _FLOAT_COLUMNS:
+            columns[name] = np.fromiter((getattr(tx, name) for tx in txs), dtype=np.float64, count=len(txs))
+        for name in _CATEGORY_COLUMNS[:-1]:
+            columns[name] = pd.Categorical([getattr(tx, name) for tx in txs])
+        columns['tx_type'] = pd.Categorical(
+            [tx.tx_type.value for tx in txs], categories=[t.value for t in TransactionType]
+        )
+        return cls(columns)
+
+    @classmethod
+    def concat(cls, batches: List['TransactionBatch']) -> 'TransactionBatch':
+        if not batches:
+            return cls.from_transactions([])
+        columns: Dict = {}
+        for name in ('hash', 'timestamp', 'block_number', 'mev_detected', 'arbitrage_detected') + _FLOAT_COLUMNS:
+            columns[name] = np.concatenate([getattr(b, name) for b in batches])
+        for name in _CATEGORY_COLUMNS:
+            columns[name] = pd.api.types.union_categoricals([getattr(b, name) for b in batches])
+        tags, offset = {}, 0
+        for b in batches:
+            tags.update({i + offset: t for i, t in b.tags.items()})
+            offset += len(b)
+        columns['tags'] = tags
+        columns['raw'] = None if any(b.raw is None for b in batches) else [r for b in batches for r in b.raw]
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(self.hash)
+
+    @property
+    def volume_usd(self) -> np.ndarray:
+        return self.amount * self.price_usd
+
+    def row(self, i: int) -> AdvancedTransaction:
+        return AdvancedTransaction(
+            hash=self.hash[i],
+            from_address=self.from_address[i],
+            to_address=self.to_address[i],
+            amount=float(self.amount[i]),
+            token=self.token[i],
+            timestamp=self.timestamp[i].item(),
+            chain=self.chain[i],
+            tx_type=TransactionType(self.tx_type[i]),
+            gas_fee=float(self.gas_fee[i]),
+            block_number=int(self.block_number[i]),
+            exchange=self.exchange[i],
+            price_usd=float(self.price_usd[i]),
+            profit_loss=float(self.profit_loss[i]),
+            slippage=float(self.slippage[i]),
+            mev_detected=bool(self.mev_detected[i]),
+            arbitrage_detected=bool(self.arbitrage_detected[i]),
+            tags=self.tags.get(i, ()),
+            raw=self.raw[i] if self.raw is not None else None,
+        )
+
+    def __iter__(self) -> Iterator[AdvancedTransaction]:
+        return (self.row(i) for i in range(len(self)))
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """DataFrame view of the numeric and categorical columns."""
+        names = columns or ['hash', 'timestamp', 'block_number', 'mev_detected', 'arbitrage_detected',
+                            *_FLOAT_COLUMNS, *_CATEGORY_COLUMNS]
+        return pd.DataFrame({name: getattr(self, name) for name in names})
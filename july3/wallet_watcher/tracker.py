@@ -1,11 +1,11 @@
 import redis
 import sqlite3
-import networkx as nx
-import json
-import requests
 import logging
 from config import *
-from shared.utils import retry
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+from wallet_watcher.pnl_estimator import PnlEstimator
+from wallet_watcher.wallet_clusters import WalletClusters
+from wallet_watcher.wallet_graph import WalletGraph
 
 logger = logging.getLogger(__name__)
 
@@ -14,78 +14,62 @@ r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
 conn = sqlite3.connect(DB_PATH)
 c = conn.cursor()
 
-# Create table if needed
-c.execute('''CREATE TABLE IF NOT EXISTS wallets
-(wallet_id TEXT PRIMARY KEY,
- cluster_id TEXT,
- first_seen DATETIME,
- parent_wallet TEXT,
- avg_pnl REAL DEFAULT 0.0,
- hop_depth INTEGER DEFAULT 0,
- behavior_label TEXT DEFAULT '',
- trust_score REAL DEFAULT 0.0)''')
+# Create tables and indexes if needed
+apply_migrations(conn, 'core', CORE_MIGRATIONS)
+graph = WalletGraph(conn)
+clusters = WalletClusters(conn)
+pnl_estimator = PnlEstimator(DB_PATH)
 
 def estimate_wallet_pnl(wallet_id):
-    """Approximate wallet PnL using the free Ethplorer API."""
-    try:
-        url = f"https://api.ethplorer.io/getAddressInfo/{wallet_id}?apiKey=freekey"
-        data = requests.get(url, timeout=10).json()
-        eth = data.get("ETH", {})
-        total_in = float(eth.get("totalInUSD") or eth.get("totalIn", 0))
-        total_out = float(eth.get("totalOutUSD") or eth.get("totalOut", 0))
-        return total_in - total_out
-    except Exception as e:
-        logger.error("estimate_wallet_pnl error for %s: %s", wallet_id, e)
-        return 0.0
+    """Approximate wallet PnL using the free Ethplorer API (cached)."""
+    return pnl_estimator.estimate_sync([wallet_id])[wallet_id]
 
 def get_parent_depth(wallet_id):
     try:
-        c.execute("SELECT hop_depth FROM wallets WHERE wallet_id=?", (wallet_id,))
-        row = c.fetchone()
-        if row and row[0] is not None:
-            return row[0]
-        else:
-            return 0
+        return graph.depth(wallet_id)
     except Exception as e:
         logger.error("get_parent_depth error: %s", e)
         return 0
 
-def track_hops():
-    G = nx.DiGraph()
+def track_hops(tx_data=None):
     # Replace with your parsed Whale Alert or Etherscan data:
-    tx_data = [
-        {'from': 'walletA', 'to': 'walletB'},
-        {'from': 'walletB', 'to': 'walletC'}
-    ]
+    if tx_data is None:
+        tx_data = [
+            {'from': 'walletA', 'to': 'walletB'},
+            {'from': 'walletB', 'to': 'walletC'}
+        ]
 
-    for tx in tx_data:
-        from_wallet = tx['from']
-        to_wallet = tx['to']
+    edges = [(tx['from'], tx['to']) for tx in tx_data]
+    try:
+        new_wallets = graph.add_edges(edges)
+        clusters.add_edges(edges, funded=new_wallets)
+    except Exception as e:
+        logger.error("Graph update error: %s", e)
+        return
 
-        hop_depth = 1 + get_parent_depth(from_wallet)
-        avg_pnl = estimate_wallet_pnl(to_wallet)
+    # New wallets are estimated concurrently; cached ones cost no request.
+    pnls = pnl_estimator.estimate_sync(new_wallets)
+    updates = []
+    for wallet, hop_depth in new_wallets.items():
+        avg_pnl = pnls[wallet]
         trust_score = max(0.0, min(avg_pnl / 10000, 1.0))
+        updates.append((avg_pnl, trust_score, wallet))
+        logger.info(
+            "Added wallet %s: depth=%s, cluster=%s, pnl=%s, trust=%.2f",
+            wallet, hop_depth, clusters.cluster_of(wallet), avg_pnl, trust_score,
+        )
+    try:
+        with conn:
+            conn.executemany("UPDATE wallets SET avg_pnl=?, trust_score=? WHERE wallet_id=?", updates)
+    except Exception as e:
+        logger.error("DB insert error: %s", e)
 
+    if GRAPH_EXPORT_PATH:
         try:
-            c.execute(
-                "INSERT OR IGNORE INTO wallets VALUES (?, ?, datetime('now'), ?, ?, ?, ?, ?)",
-                (to_wallet, "cluster123", from_wallet, avg_pnl, hop_depth, '', trust_score),
-            )
-            conn.commit()
-            logger.info(
-                "Added wallet %s: depth=%s, pnl=%s, trust=%.2f",
-                to_wallet, hop_depth, avg_pnl, trust_score,
-            )
+            edges = graph.export_gexf(GRAPH_EXPORT_PATH)
+            logger.info("Wallet graph saved as GEXF (%d edges)", edges)
         except Exception as e:
-            logger.error("DB insert error: %s", e)
-
-        G.add_edge(from_wallet, to_wallet)
-
-    try:
-        nx.write_gexf(G, 'wallet_graph.gexf')
-        logger.info("Wallet graph saved as GEXF")
-    except Exception as e:
-        logger.error("Graph write error: %s", e)
+            logger.error("Graph write error: %s", e)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,202 @@
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+)
+
+# Schema of the AdvancedWalletTracker database, applied by
+# shared.migrations.apply_migrations under the 'tracker' component.
+TRACKER_MIGRATIONS = [
+    (1, [
+        '''CREATE TABLE IF NOT EXISTS advanced_transactions (
+            hash TEXT PRIMARY KEY,
+            from_address TEXT,
+            to_address TEXT,
+            amount REAL,
+            token TEXT,
+            timestamp DATETIME,
+            chain TEXT,
+            tx_type TEXT,
+            gas_fee REAL,
+            block_number INTEGER,
+            exchange TEXT,
+            price_usd REAL,
+            profit_loss REAL,
+            slippage REAL,
+            mev_detected BOOLEAN,
+            arbitrage_detected BOOLEAN,
+            tags TEXT,
+            raw_data TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS perp_positions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            address TEXT,
+            exchange TEXT,
+            symbol TEXT,
+            side TEXT,
+            size REAL,
+            entry_price REAL,
+            current_price REAL,
+            unrealized_pnl REAL,
+            realized_pnl REAL,
+            margin REAL,
+            leverage REAL,
+            liquidation_price REAL,
+            timestamp DATETIME,
+            is_open BOOLEAN
+        )''',
+        '''CREATE TABLE IF NOT EXISTS liquidity_positions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            address TEXT,
+            protocol TEXT,
+            pair TEXT,
+            token0 TEXT,
+            token1 TEXT,
+            amount0 REAL,
+            amount1 REAL,
+            shares REAL,
+            apr REAL,
+            fees_earned REAL,
+            impermanent_loss REAL,
+            timestamp DATETIME
+        )''',
+        '''CREATE TABLE IF NOT EXISTS wallet_profiles (
+            address TEXT PRIMARY KEY,
+            total_value_usd REAL,
+            total_pnl REAL,
+            win_rate REAL,
+            total_trades INTEGER,
+            avg_trade_size REAL,
+            risk_score REAL,
+            activity_score REAL,
+            top_tokens TEXT,
+            preferred_dexes TEXT,
+            trading_pattern TEXT,
+            last_activity DATETIME,
+            tags TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS price_cache (
+            token TEXT,
+            price_usd REAL,
+            timestamp DATETIME,
+            PRIMARY KEY (token, timestamp)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS sync_cursors (
+            address TEXT,
+            chain TEXT,
+            action TEXT,
+            last_block INTEGER,
+            updated_at DATETIME,
+            PRIMARY KEY (address, chain, action)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS api_usage (
+            api_name TEXT,
+            endpoint TEXT,
+            calls_made INTEGER,
+            last_reset DATETIME,
+            PRIMARY KEY (api_name, endpoint)
+        )''',
+    ]),
+    (2, [
+        # Addresses are stored lower-cased so lookups are plain index seeks.
+        'UPDATE advanced_transactions SET from_address = lower(from_address), to_address = lower(to_address)',
+        'CREATE INDEX IF NOT EXISTS idx_adv_tx_from ON advanced_transactions(from_address, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_adv_tx_to ON advanced_transactions(to_address, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_adv_tx_chain_block ON advanced_transactions(chain, block_number)',
+        'CREATE INDEX IF NOT EXISTS idx_adv_tx_timestamp ON advanced_transactions(timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_perp_positions_address ON perp_positions(address, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_liquidity_positions_address ON liquidity_positions(address, timestamp)',
+    ]),
+    (3, [
+        # Per-token time ranges are re-aggregated by signal_engine.consensus.
+        'CREATE INDEX IF NOT EXISTS idx_adv_tx_token_time ON advanced_transactions(token, timestamp)',
+    ]),
+]
+
+TRACKER_HOT_QUERIES = {
+    'load_stored_transactions': 'SELECT * FROM advanced_transactions WHERE from_address=? OR to_address=?',
+    'transactions_by_block': 'SELECT hash FROM advanced_transactions WHERE chain=? AND block_number > ?',
+    'transactions_since': 'SELECT token, amount FROM advanced_transactions WHERE timestamp >= ?',
+    'sync_cursor': 'SELECT last_block FROM sync_cursors WHERE address=? AND chain=? AND action=?',
+    'price_cache_range': 'SELECT timestamp, price_usd FROM price_cache WHERE token=? AND timestamp BETWEEN ? AND ?',
+    'perp_positions': 'SELECT * FROM perp_positions WHERE address=?',
+    'liquidity_positions': 'SELECT * FROM liquidity_positions WHERE address=?',
+    'token_flows': 'SELECT from_address, to_address, amount FROM advanced_transactions WHERE token=? AND timestamp >= ? AND timestamp < ?',
+    'new_transactions': 'SELECT rowid, token, timestamp FROM advanced_transactions WHERE rowid > ? ORDER BY rowid LIMIT 1000',
+}
+
+_STOP = object()
+
+
+class TrackerStore:
+    """Single WAL-mode SQLite connection owned by a dedicated writer thread.
+
+    Writes are queued and executed in order, each job in its own
+    transaction, so callers on the event loop never block on disk I/O.
+    Every submit returns a ``concurrent.futures.Future``; async code can
+    ``await asyncio.wrap_future(...)`` it.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._closed = False
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+        self._thread = threading.Thread(target=self._run, name='tracker-store-writer', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                break
+            func, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with self._conn:
+                    result = func(self._conn)
+                future.set_result(result)
+            except Exception as e:
+                logger.error("Tracker store write failed: %s", e)
+                future.set_exception(e)
+        self._conn.close()
+
+    def call(self, func: Callable[[sqlite3.Connection], Any]) -> Future:
+        """Run ``func(conn)`` on the writer thread inside one transaction."""
+        future: Future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("Tracker store is closed"))
+            return future
+        self._queue.put((func, future))
+        return future
+
+    def execute_many(self, sql: str, rows: Iterable[Sequence]) -> Future:
+        """Queue a batched write; ``rows`` may be a lazy generator, consumed on the writer thread."""
+        return self.call(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    def execute(self, sql: str, params: Sequence = ()) -> Future:
+        return self.call(lambda conn: conn.execute(sql, params).rowcount)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every write queued so far has been committed."""
+        self.call(lambda conn: None).result(timeout)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
@@ -0,0 +1,221 @@
+import argparse
+import logging
+import sqlite3
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from shared.migrations import CORE_MIGRATIONS, apply_migrations
+
+logger = logging.getLogger(__name__)
+
+Edge = Tuple[str, str]
+
+
+def singleton_cluster(wallet: str) -> str:
+    return f"cl_{wallet}"
+
+
+def is_singleton_label(cluster_id: str) -> bool:
+    """Labels of the form ``cl_<wallet>`` are generated; anything else was assigned by hand."""
+    return cluster_id.startswith('cl_')
+
+
+class WalletClusters:
+    """Union-find clustering of wallets over the stored transfer graph.
+
+    Membership lives in ``wallet_clusters`` (primary key on the wallet, index
+    on the cluster) and is mirrored into ``wallets.cluster_id``, so "which
+    cluster is this wallet in" is one primary-key lookup.  A union relabels
+    the smaller cluster into the larger one, so each wallet is relabelled at
+    most O(log n) times.  A hand-assigned label always survives a union, and
+    two hand-assigned clusters are never merged online, so the
+    ``cluster_limits`` row attached to each label keeps applying.
+
+    Heuristics, applied as edges arrive:
+
+    * common funder: a wallet first funded by ``src`` joins ``src``'s cluster,
+      unless ``src`` has funded more than ``max_funder_fanout`` wallets (an
+      exchange or faucet rather than an owner);
+    * co-spend: account chains have no multi-input spends, so the analogue is
+      a deposit-style address, which receives from at most
+      ``max_deposit_fanin`` senders; all of its senders are joined.
+
+    Unions are never undone online; ``rebuild`` recomputes every cluster from
+    the stored graph with the current thresholds, keeping hand-assigned
+    clusters (labels not of the form ``cl_<wallet>``) together.
+    """
+
+    max_funder_fanout = 20
+    max_deposit_fanin = 5
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def cluster_of(self, wallet: str) -> Optional[str]:
+        row = self.conn.execute('SELECT cluster_id FROM wallet_clusters WHERE wallet_id=?', (wallet,)).fetchone()
+        return row[0] if row else None
+
+    def members(self, cluster_id: str) -> List[str]:
+        return [w for (w,) in self.conn.execute('SELECT wallet_id FROM wallet_clusters WHERE cluster_id=?', (cluster_id,))]
+
+    def assign(self, wallet: str, cluster_id: str) -> None:
+        """Place ``wallet`` in ``cluster_id`` explicitly (manual labelling)."""
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO wallet_clusters (wallet_id, cluster_id) VALUES (?, ?)', (wallet, cluster_id),
+            )
+            self.conn.execute('UPDATE wallets SET cluster_id=? WHERE wallet_id=?', (cluster_id, wallet))
+
+    def _ensure(self, wallets: Iterable[str]) -> None:
+        rows = [(w, singleton_cluster(w)) for w in wallets]
+        self.conn.executemany('INSERT OR IGNORE INTO wallet_clusters (wallet_id, cluster_id) VALUES (?, ?)', rows)
+        # Wallet rows created by WalletGraph carry no cluster yet.
+        self.conn.executemany(
+            "UPDATE wallets SET cluster_id=(SELECT cluster_id FROM wallet_clusters WHERE wallet_id=?) "
+            "WHERE wallet_id=? AND (cluster_id IS NULL OR cluster_id = '')",
+            [(w, w) for w, _ in rows],
+        )
+
+    def _union(self, a: str, b: str) -> bool:
+        # Edges stored before clustering existed may reference wallets with no cluster yet.
+        self._ensure((a, b))
+        ca, cb = self.cluster_of(a), self.cluster_of(b)
+        if ca == cb:
+            return False
+        manual_a, manual_b = not is_singleton_label(ca), not is_singleton_label(cb)
+        if manual_a and manual_b:
+            # Two hand-assigned clusters each carry their own exposure limit; leave them apart.
+            logger.debug("Not merging manual clusters %s and %s", ca, cb)
+            return False
+        if manual_a != manual_b:
+            keep, absorb = (ca, cb) if manual_a else (cb, ca)
+        else:
+            size_a = self.conn.execute('SELECT COUNT(*) FROM wallet_clusters WHERE cluster_id=?', (ca,)).fetchone()[0]
+            size_b = self.conn.execute('SELECT COUNT(*) FROM wallet_clusters WHERE cluster_id=?', (cb,)).fetchone()[0]
+            keep, absorb = (ca, cb) if size_a >= size_b else (cb, ca)
+        self.conn.execute('UPDATE wallet_clusters SET cluster_id=? WHERE cluster_id=?', (keep, absorb))
+        self.conn.execute('UPDATE wallets SET cluster_id=? WHERE cluster_id=?', (keep, absorb))
+        return True
+
+    def _out_degree(self, wallet: str) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM wallet_edges WHERE src=?', (wallet,)).fetchone()[0]
+
+    def _senders(self, wallet: str, limit: int) -> List[str]:
+        return [s for (s,) in self.conn.execute('SELECT src FROM wallet_edges WHERE dst=? LIMIT ?', (wallet, limit))]
+
+    def add_edges(self, edges: Iterable[Edge], funded: Iterable[str] = ()) -> int:
+        """Update clusters for edges already stored by ``WalletGraph.add_edges``.
+
+        ``funded`` are the wallets that batch discovered, whose first funder
+        is the edge's source.  Returns the number of merges.
+        """
+        edges = [(src, dst) for src, dst in edges if src and dst and src != dst]
+        funded: Set[str] = set(funded)
+        merges = 0
+        with self.conn:
+            self._ensure({w for edge in edges for w in edge})
+            for src, dst in edges:
+                if dst in funded and self._out_degree(src) <= self.max_funder_fanout:
+                    merges += self._union(src, dst)
+                senders = self._senders(dst, self.max_deposit_fanin + 1)
+                if 1 < len(senders) <= self.max_deposit_fanin:
+                    other = next(s for s in senders if s != src)
+                    merges += self._union(src, other)
+        if merges:
+            logger.info("Merged %d wallet clusters", merges)
+        return merges
+
+    def rebuild(self) -> int:
+        """Recompute every cluster from the stored graph; returns the cluster count."""
+        parent: Dict[str, str] = {}
+
+        def find(x: str) -> str:
+            parent.setdefault(x, x)
+            root = x
+            while parent[root] != root:
+                root = parent[root]
+            while parent[x] != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        def union(a: str, b: str) -> None:
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[rb] = ra
+
+        out_degree = dict(self.conn.execute('SELECT src, COUNT(*) FROM wallet_edges GROUP BY src'))
+        for wallet, funder in self.conn.execute(
+            "SELECT wallet_id, parent_wallet FROM wallets WHERE parent_wallet IS NOT NULL AND parent_wallet != ''"
+        ):
+            find(wallet)
+            if out_degree.get(funder, 0) <= self.max_funder_fanout:
+                union(funder, wallet)
+        previous = None
+        senders: List[str] = []
+        for dst, src in self.conn.execute('SELECT dst, src FROM wallet_edges ORDER BY dst'):
+            if dst != previous:
+                self._join_senders(senders, union)
+                previous, senders = dst, []
+            senders.append(src)
+            find(src)
+            find(dst)
+        self._join_senders(senders, union)
+        # Labels not of the form cl_<wallet> were assigned by hand; keep those groups together.
+        current = dict(self.conn.execute(
+            "SELECT wallet_id, cluster_id FROM wallets WHERE cluster_id IS NOT NULL AND cluster_id != ''"
+        ))
+        current.update(self.conn.execute('SELECT wallet_id, cluster_id FROM wallet_clusters'))
+        manual: Dict[str, str] = {}
+        for wallet, cluster_id in current.items():
+            find(wallet)
+            if not is_singleton_label(cluster_id):
+                union(manual.setdefault(cluster_id, wallet), wallet)
+
+        # Keep an existing label where possible so exposure limits stay attached.
+        groups: Dict[str, List[str]] = {}
+        for wallet in parent:
+            groups.setdefault(find(wallet), []).append(wallet)
+        labels: Dict[str, str] = {}
+        taken: Set[str] = set()
+        for root, wallets in sorted(groups.items(), key=lambda item: -len(item[1])):
+            counts = Counter(sorted(current[w] for w in wallets if w in current))
+            # Prefer a hand-assigned label, then the most common one.
+            ranked = sorted(counts.most_common(), key=lambda item: is_singleton_label(item[0]))
+            label = next((c for c, _ in ranked if c not in taken), None)
+            if label is None:
+                label = base = singleton_cluster(min(wallets))
+                suffix = 1
+                while label in taken:
+                    label, suffix = f"{base}_{suffix}", suffix + 1
+            labels[root] = label
+            taken.add(labels[root])
+        with self.conn:
+            self.conn.execute('DELETE FROM wallet_clusters')
+            self.conn.executemany(
+                'INSERT INTO wallet_clusters (wallet_id, cluster_id) VALUES (?, ?)',
+                ((wallet, labels[find(wallet)]) for wallet in parent),
+            )
+            self.conn.execute(
+                'UPDATE wallets SET cluster_id=(SELECT cluster_id FROM wallet_clusters c WHERE c.wallet_id=wallets.wallet_id) '
+                'WHERE wallet_id IN (SELECT wallet_id FROM wallet_clusters)'
+            )
+        logger.info("Rebuilt %d wallet clusters over %d wallets", len(groups), len(parent))
+        return len(groups)
+
+    def _join_senders(self, senders: List[str], union) -> None:
+        if 1 < len(senders) <= self.max_deposit_fanin:
+            for other in senders[1:]:
+                union(senders[0], other)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Recompute wallet clusters from the stored transfer graph.")
+    parser.add_argument('db_path')
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.db_path)
+    try:
+        apply_migrations(conn, 'core', CORE_MIGRATIONS)
+        WalletClusters(conn).rebuild()
+    finally:
+        conn.close()
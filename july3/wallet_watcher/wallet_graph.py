@@ -0,0 +1,166 @@
+import logging
+import sqlite3
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on host parameters is 999 on older builds.
+_CHUNK = 500
+
+Edge = Tuple[str, str]
+
+
+def _chunks(items: Sequence[str]) -> Iterable[Sequence[str]]:
+    for i in range(0, len(items), _CHUNK):
+        yield items[i:i + _CHUNK]
+
+
+class WalletGraph:
+    """Funds-flow graph persisted as an adjacency list in the core database.
+
+    Edges live in ``wallet_edges`` (indexed both ways); hop depth lives in
+    ``wallets.hop_depth``.  A wallet with no row in ``wallets`` is an origin
+    at depth 0.  Depth is the shortest hop count from an origin seen so far:
+    inserting an edge that gives a wallet a shorter path lowers its depth
+    and walks only the descendants whose depth improves.  Depths are never
+    raised, so no insert touches more of the graph than it shortens.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def _depths(self, wallets: Sequence[str]) -> Dict[str, int]:
+        depths = {}
+        for chunk in _chunks(list(wallets)):
+            marks = ','.join('?' * len(chunk))
+            depths.update(self.conn.execute(
+                f'SELECT wallet_id, hop_depth FROM wallets WHERE wallet_id IN ({marks})', chunk,
+            ).fetchall())
+        return {wallet: depth or 0 for wallet, depth in depths.items()}
+
+    def depth(self, wallet: str) -> int:
+        return self._depths([wallet]).get(wallet, 0)
+
+    def add_edges(self, edges: Iterable[Edge], cluster_id: Optional[str] = None) -> Dict[str, int]:
+        """Record transfers and update hop depths; return new wallets and their depths.
+
+        New destination wallets get a ``wallets`` row carrying their depth and
+        parent; callers fill in PnL and trust afterwards.  Everything commits
+        in one transaction.
+        """
+        edges = [(src, dst) for src, dst in edges if src and dst and src != dst]
+        if not edges:
+            return {}
+        with self.conn:
+            # Edges go in first so propagation also follows edges from this batch.
+            self.conn.executemany('''
+                INSERT INTO wallet_edges (src, dst, tx_count, first_seen, last_seen)
+                VALUES (?, ?, 1, datetime('now'), datetime('now'))
+                ON CONFLICT(src, dst) DO UPDATE SET tx_count = tx_count + 1, last_seen = excluded.last_seen
+            ''', edges)
+            depths = self._depths(list({w for edge in edges for w in edge}))
+            new: Dict[str, Tuple[int, str]] = {}
+            lowered: Dict[str, Tuple[int, str]] = {}
+            for src, dst in edges:
+                candidate = depths.get(src, 0) + 1
+                if dst not in depths:
+                    depths[dst] = candidate
+                    new[dst] = (candidate, src)
+                elif candidate < depths[dst]:
+                    depths[dst] = candidate
+                    target = new if dst in new else lowered
+                    target[dst] = (candidate, src)
+                    self._propagate(dst, depths, lowered, new)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO wallets (wallet_id, cluster_id, first_seen, parent_wallet, hop_depth) "
+                "VALUES (?, ?, datetime('now'), ?, ?)",
+                [(wallet, cluster_id, parent, depth) for wallet, (depth, parent) in new.items()],
+            )
+            self.conn.executemany(
+                'UPDATE wallets SET hop_depth=?, parent_wallet=? WHERE wallet_id=?',
+                [(depth, parent, wallet) for wallet, (depth, parent) in lowered.items()],
+            )
+        if lowered:
+            logger.info("Lowered hop depth of %d existing wallets", len(lowered))
+        return {wallet: depth for wallet, (depth, _) in new.items()}
+
+    def _propagate(self, start: str, depths: Dict[str, int], lowered: Dict[str, Tuple[int, str]],
+                   new: Dict[str, Tuple[int, str]]) -> None:
+        # Breadth-first over stored children, stopping wherever depth does not improve.
+        frontier = deque([start])
+        while frontier:
+            level = list(frontier)
+            frontier.clear()
+            for chunk in _chunks(level):
+                marks = ','.join('?' * len(chunk))
+                rows = self.conn.execute(f'''
+                    SELECT e.src, e.dst, w.hop_depth FROM wallet_edges e
+                    LEFT JOIN wallets w ON w.wallet_id = e.dst
+                    WHERE e.src IN ({marks})
+                ''', chunk).fetchall()
+                for src, dst, stored in rows:
+                    if dst not in depths and stored is None:
+                        # Not yet reached by this batch; its own edge assigns it later.
+                        continue
+                    candidate = depths[src] + 1
+                    if candidate < depths.get(dst, stored or 0):
+                        depths[dst] = candidate
+                        target = new if dst in new else lowered
+                        target[dst] = (candidate, src)
+                        frontier.append(dst)
+
+    def neighborhood(self, wallet: str, k: int, direction: str = 'out') -> Dict[str, int]:
+        """Wallets within ``k`` hops of ``wallet`` mapped to their hop distance.
+
+        ``direction`` is ``'out'`` (where funds went), ``'in'`` (where they
+        came from) or ``'both'``.  Each level is one indexed query per 500
+        frontier wallets.
+        """
+        queries = {
+            'out': ['SELECT src, dst FROM wallet_edges WHERE src IN ({})'],
+            'in': ['SELECT dst, src FROM wallet_edges WHERE dst IN ({})'],
+        }
+        queries['both'] = queries['out'] + queries['in']
+        if direction not in queries:
+            raise ValueError(f"Unknown direction: {direction}")
+        seen = {wallet: 0}
+        frontier = [wallet]
+        for hop in range(1, k + 1):
+            if not frontier:
+                break
+            found = []
+            for chunk in _chunks(frontier):
+                marks = ','.join('?' * len(chunk))
+                for sql in queries[direction]:
+                    for _, other in self.conn.execute(sql.format(marks), chunk):
+                        if other not in seen:
+                            seen[other] = hop
+                            found.append(other)
+            frontier = found
+        return seen
+
+    def edges_within(self, wallets: Iterable[str]) -> List[Edge]:
+        """Stored edges whose endpoints are both in ``wallets``."""
+        members = set(wallets)
+        edges = []
+        for chunk in _chunks(list(members)):
+            marks = ','.join('?' * len(chunk))
+            edges.extend(
+                (src, dst) for src, dst in self.conn.execute(
+                    f'SELECT src, dst FROM wallet_edges WHERE src IN ({marks})', chunk,
+                ) if dst in members
+            )
+        return edges
+
+    def export_gexf(self, path: str, wallet: Optional[str] = None, k: int = 2) -> int:
+        """Write the whole graph, or ``wallet``'s k-hop neighborhood, as GEXF."""
+        import networkx as nx
+
+        G = nx.DiGraph()
+        if wallet is None:
+            G.add_edges_from(self.conn.execute('SELECT src, dst FROM wallet_edges'))
+        else:
+            G.add_edges_from(self.edges_within(self.neighborhood(wallet, k, 'both')))
+        nx.write_gexf(G, path)
+        return G.number_of_edges()
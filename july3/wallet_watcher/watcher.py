@@ -3,6 +3,7 @@ import asyncio
 import logging
 from config import *
 from shared.async_utils import safe_request_async
+from shared.http_client import startup_http_client, shutdown_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -29,16 +30,21 @@ async def wallet_labels():
         logger.error('Ethplorer fetch failed: %s', e)
 
 async def main():
-    while True:
-        try:
-            await asyncio.gather(
-                whale_alert_rss(),
-                wallet_labels(),
-            )
-            logger.info("Wallet watcher updated")
-        except Exception:
-            logger.exception("Watcher cycle failed")
-        await asyncio.sleep(WATCHER_INTERVAL)
+    http = await startup_http_client()
+    try:
+        while True:
+            try:
+                await asyncio.gather(
+                    whale_alert_rss(),
+                    wallet_labels(),
+                )
+                logger.info("Wallet watcher updated")
+                http.log_stats()
+            except Exception:
+                logger.exception("Watcher cycle failed")
+            await asyncio.sleep(WATCHER_INTERVAL)
+    finally:
+        await shutdown_http_client()
 
 if __name__ == "__main__":
     try: